@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+转换流程分阶段性能基准测试
+==========================
+
+生成指定点数的合成GPX文件，分别计时转换流程的各个阶段：
+    parse_gpx_file     正则扫描解析
+    load_track         convert实际使用的流式解析
+    calculate_metrics  距离、速度等指标计算
+    simulate_series    心率、步频、功率批量模拟
+    write_tcx          TCX序列化（写入丢弃输出的文件对象）
+
+结果保存为JSON，并与基线文件比较，任一阶段超过阈值即以退出码1结束。
+
+使用方法：
+    python3 benchmark_pipeline.py
+    python3 benchmark_pipeline.py --sizes 1000 10000 --repeat 5
+    python3 benchmark_pipeline.py --update-baseline
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from gpx_to_tcx import GPXToTCXConverter
+
+DEFAULT_SIZES = [1000, 10000, 100000, 1000000]
+DEFAULT_BASELINE = 'benchmark_baseline.json'
+DEFAULT_OUTPUT = 'benchmark_results.json'
+STAGES = ['parse_gpx_file', 'load_track', 'calculate_metrics', 'simulate_series', 'write_tcx']
+
+# 低于该时间差（秒）的变化视为噪声，不判定为性能退化
+NOISE_FLOOR_SECONDS = 0.005
+
+
+class NullWriter:
+    """只统计字符数、丢弃内容的文件对象，避免序列化计时受磁盘影响"""
+
+    def __init__(self):
+        self.size = 0
+
+    def write(self, chunk):
+        self.size += len(chunk)
+        return len(chunk)
+
+
+def write_synthetic_gpx(path, count):
+    """
+    生成合成GPX文件：约3 m/s的折线轨迹，带海拔和逐秒时间
+
+    Args:
+        path (str): 输出文件路径
+        count (int): 轨迹点数
+    """
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        f.write('<gpx version="1.1" creator="benchmark" xmlns="http://www.topografix.com/GPX/1/1">\n')
+        f.write('<trk><name>benchmark</name><trkseg>\n')
+        for i in range(count):
+            lat = 30.0 + (i % 2000) * 2.7e-5
+            lon = 120.0 + (i // 2000) * 2.7e-5
+            seconds = i % 86400
+            f.write(f'<trkpt lat="{lat:.7f}" lon="{lon:.7f}"><ele>{10 + (i % 100) * 0.1:.1f}</ele>'
+                    f'<time>2024-12-25T{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}Z</time></trkpt>\n')
+        f.write('</trkseg></trk>\n</gpx>\n')
+
+
+def _timed(func, *args):
+    """执行一次并返回(耗时秒数, 返回值)，屏蔽转换器的进度输出"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+    return elapsed, result
+
+
+def benchmark_size(gpx_path, count, repeat):
+    """
+    对单个文件计时所有阶段，每个阶段取repeat次中的最小值
+
+    Args:
+        gpx_path (str): GPX文件路径
+        count (int): 轨迹点数
+        repeat (int): 重复次数
+
+    Returns:
+        dict: 阶段名 -> 秒数，另含points和tcx_chars
+    """
+    best = {stage: float('inf') for stage in STAGES}
+    tcx_chars = 0
+
+    for _ in range(repeat):
+        converter = GPXToTCXConverter({'random_seed': 1})
+
+        elapsed, points = _timed(converter.parse_gpx_file, gpx_path)
+        best['parse_gpx_file'] = min(best['parse_gpx_file'], elapsed)
+        del points
+
+        elapsed, track = _timed(converter.load_track, gpx_path)
+        best['load_track'] = min(best['load_track'], elapsed)
+        assert len(track) == count, f"解析点数不符: {len(track)} != {count}"
+
+        elapsed, metrics = _timed(converter.calculate_metrics, track)
+        best['calculate_metrics'] = min(best['calculate_metrics'], elapsed)
+
+        elapsed, simulation = _timed(converter.simulate_series, metrics['speeds'])
+        best['simulate_series'] = min(best['simulate_series'], elapsed)
+
+        sink = NullWriter()
+        elapsed, _ = _timed(converter.write_tcx, track, metrics, sink, simulation)
+        best['write_tcx'] = min(best['write_tcx'], elapsed)
+        tcx_chars = sink.size
+
+    result = {stage: round(best[stage], 6) for stage in STAGES}
+    result['points'] = count
+    result['tcx_chars'] = tcx_chars
+    return result
+
+
+def run_benchmarks(sizes, repeat=3, workdir=None):
+    """
+    生成各规模的合成GPX并执行基准测试
+
+    Args:
+        sizes (list): 轨迹点数列表
+        repeat (int): 每个规模的重复次数
+        workdir (str): 存放合成GPX的目录，默认使用临时目录
+
+    Returns:
+        dict: 包含环境信息和各规模结果的报告
+    """
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'results': {}
+    }
+
+    with tempfile.TemporaryDirectory(dir=workdir) as tmpdir:
+        for count in sizes:
+            gpx_path = os.path.join(tmpdir, f'synthetic_{count}.gpx')
+            write_synthetic_gpx(gpx_path, count)
+            print(f"🔄 {count:>8} 个点 ({os.path.getsize(gpx_path) / 1024 / 1024:.1f} MB)...")
+
+            result = benchmark_size(gpx_path, count, repeat)
+            report['results'][str(count)] = result
+
+            os.remove(gpx_path)
+            stage_text = '  '.join(f"{stage}={result[stage] * 1000:.1f}ms" for stage in STAGES)
+            print(f"   {stage_text}")
+
+    return report
+
+
+def compare_reports(current, baseline, threshold):
+    """
+    与基线比较，返回超过阈值的阶段
+
+    Args:
+        current (dict): 本次报告
+        baseline (dict): 基线报告
+        threshold (float): 允许的相对增长，如0.25表示慢25%以内不算退化
+
+    Returns:
+        list: (规模, 阶段, 基线秒数, 当前秒数) 元组列表
+    """
+    regressions = []
+    for size, result in current['results'].items():
+        base = baseline.get('results', {}).get(size)
+        if not base:
+            continue
+        for stage in STAGES:
+            if stage not in base:
+                continue
+            before = base[stage]
+            after = result[stage]
+            if after > before * (1 + threshold) and after - before > NOISE_FLOOR_SECONDS:
+                regressions.append((size, stage, before, after))
+    return regressions
+
+
+def print_comparison(current, baseline):
+    """打印与基线的对比表"""
+    print("\n📊 与基线对比（毫秒）:")
+    for size, result in current['results'].items():
+        base = baseline.get('results', {}).get(size, {})
+        for stage in STAGES:
+            after = result[stage] * 1000
+            if stage in base:
+                before = base[stage] * 1000
+                change = (after - before) / before * 100 if before else 0.0
+                print(f"   {size:>8} {stage:<18} {before:>10.1f} -> {after:>10.1f}  ({change:+.0f}%)")
+            else:
+                print(f"   {size:>8} {stage:<18} {'-':>10} -> {after:>10.1f}")
+
+
+def main():
+    """
+    主函数：执行基准测试并与基线比较
+    """
+    parser = argparse.ArgumentParser(description='GPX转TCX转换流程分阶段性能基准测试')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='合成GPX的轨迹点数 (默认: 1000 10000 100000 1000000)')
+    parser.add_argument('--repeat', type=int, default=3, help='每个规模重复次数，取最小值 (默认: 3)')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help=f'结果JSON路径 (默认: {DEFAULT_OUTPUT})')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help=f'基线JSON路径 (默认: {DEFAULT_BASELINE})')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='允许的相对退化比例 (默认: 0.25，即慢25%%以内不算退化)')
+    parser.add_argument('--update-baseline', action='store_true', help='将本次结果写入基线文件')
+    args = parser.parse_args()
+
+    print("🚀 转换流程性能基准测试")
+    report = run_benchmarks(args.sizes, args.repeat)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"💾 结果已保存到: {args.output}")
+
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"✅ 基线已更新: {args.baseline}")
+        return True
+
+    if not os.path.exists(args.baseline):
+        print(f"⚠️ 未找到基线文件 {args.baseline}，使用 --update-baseline 创建")
+        return True
+
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+
+    print_comparison(report, baseline)
+    regressions = compare_reports(report, baseline, args.threshold)
+
+    if regressions:
+        print(f"\n❌ 发现 {len(regressions)} 项性能退化（阈值 {args.threshold:.0%}）:")
+        for size, stage, before, after in regressions:
+            print(f"   {size} 个点 {stage}: {before * 1000:.1f}ms -> {after * 1000:.1f}ms")
+        return False
+
+    print("\n✅ 没有阶段超过退化阈值")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
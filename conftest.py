@@ -0,0 +1,15 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+pytest公共配置：测试使用临时任务数据库，不写入工作目录下的tasks.db
+"""
+
+import atexit
+import os
+import shutil
+import tempfile
+
+_task_db_dir = tempfile.mkdtemp(prefix='gpx-test-tasks-')
+atexit.register(shutil.rmtree, _task_db_dir, ignore_errors=True)
+# 必须在导入web_app之前设置，APP_CONFIG在导入时读取环境变量
+os.environ['TASK_DB_PATH'] = os.path.join(_task_db_dir, 'tasks.db')
@@ -25,11 +25,460 @@ GPX转TCX工具
 
 import re
 import math
+import random
 import argparse
 import sys
+import io
+import gzip
+import time
+import tracemalloc
+import os
+import glob
+import heapq
+from contextlib import contextmanager, redirect_stdout
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from array import array
 from datetime import datetime, timedelta
 from xml.sax.saxutils import escape
 
+try:
+    from lxml import etree
+    _LXML_AVAILABLE = True
+except ImportError:
+    import xml.etree.ElementTree as etree
+    _LXML_AVAILABLE = False
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# 轨迹点扫描用的预编译正则：<trkpt .../> 或 <trkpt ...>...</trkpt>
+_TRKPT_RE = re.compile(r'<trkpt\b([^>]*?)(?:/>|>(.*?)</trkpt\s*>)', re.DOTALL)
+_LAT_ATTR_RE = re.compile(r'\blat\s*=\s*["\']([^"\']+)["\']')
+_LON_ATTR_RE = re.compile(r'\blon\s*=\s*["\']([^"\']+)["\']')
+_ELE_RE = re.compile(r'<ele>([^<]+)</ele>')
+_TIME_RE = re.compile(r'<time>([^<]+)</time>')
+
+
+# 地球平均半径（米）
+EARTH_RADIUS_M = 6371000
+
+# 流式写出TCX时每个片段包含的轨迹点数
+TCX_CHUNK_POINTS = 256
+
+# gzip压缩级别：6在速度和压缩率之间取得平衡，TCX通常可压缩到十分之一左右
+GZIP_COMPRESS_LEVEL = 6
+
+# 轨迹简化允许的最大总距离误差（相对值），0.005即0.5%
+SIMPLIFY_MAX_DISTANCE_ERROR = 0.005
+
+
+def haversine_segments(lat, lon, use_numpy=None):
+    """
+    批量计算轨迹每段的Haversine距离和累计距离
+    
+    安装了NumPy时一次向量化计算全部分段；否则使用纯Python循环，
+    每个点的弧度和余弦只计算一次。
+    
+    Args:
+        lat (array): 纬度序列（度），array('d')或任意浮点序列
+        lon (array): 经度序列（度）
+        use_numpy (bool): 是否使用NumPy，默认在可用时使用
+        
+    Returns:
+        tuple: (segments, cumulative)，均为array('d')；
+               segments长度为n-1，cumulative长度为n且cumulative[0]为0
+    """
+    count = len(lat)
+    if count == 0:
+        return array('d'), array('d')
+    if use_numpy is None:
+        use_numpy = np is not None
+    
+    if use_numpy:
+        lat_rad = np.radians(np.asarray(lat, dtype=np.float64))
+        lon_rad = np.radians(np.asarray(lon, dtype=np.float64))
+        cos_lat = np.cos(lat_rad)
+        a = (np.sin(np.diff(lat_rad) * 0.5) ** 2
+             + cos_lat[:-1] * cos_lat[1:] * np.sin(np.diff(lon_rad) * 0.5) ** 2)
+        seg = (2 * EARTH_RADIUS_M) * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+        cum = np.zeros(count, dtype=np.float64)
+        np.cumsum(seg, out=cum[1:])
+        segments = array('d')
+        segments.frombytes(seg.tobytes())
+        cumulative = array('d')
+        cumulative.frombytes(cum.tobytes())
+        return segments, cumulative
+    
+    radians = math.radians
+    sin = math.sin
+    cos = math.cos
+    sqrt = math.sqrt
+    atan2 = math.atan2
+    diameter = 2 * EARTH_RADIUS_M
+    
+    segments = array('d', [0.0]) * (count - 1)
+    cumulative = array('d', [0.0]) * count
+    prev_lat = radians(lat[0])
+    prev_lon = radians(lon[0])
+    prev_cos = cos(prev_lat)
+    total = 0.0
+    for i in range(1, count):
+        curr_lat = radians(lat[i])
+        curr_lon = radians(lon[i])
+        curr_cos = cos(curr_lat)
+        a = sin((curr_lat - prev_lat) * 0.5) ** 2 + prev_cos * curr_cos * sin((curr_lon - prev_lon) * 0.5) ** 2
+        segment = diameter * atan2(sqrt(a), sqrt(1 - a))
+        segments[i - 1] = segment
+        total += segment
+        cumulative[i] = total
+        prev_lat = curr_lat
+        prev_lon = curr_lon
+        prev_cos = curr_cos
+    return segments, cumulative
+
+
+class Track:
+    """
+    列式轨迹数据
+    
+    用并列的array('d')列保存每个轨迹点的坐标、海拔、相对时间和累计距离，
+    时间以相对start_time的秒数保存，不为每个点创建datetime和dict。
+    每点约40字节；各列支持缓冲区协议，可用numpy.frombuffer零拷贝读取。
+    """
+    
+    __slots__ = ('start_time', 'lat', 'lon', 'ele', 'offsets', 'cumulative_distance', 'source_times')
+    
+    def __init__(self, start_time=None):
+        """
+        初始化空轨迹
+        
+        Args:
+            start_time (datetime): 第一个轨迹点的时间，offsets相对于此时间
+        """
+        self.start_time = start_time
+        self.lat = array('d')
+        self.lon = array('d')
+        self.ele = array('d')
+        self.offsets = array('d')
+        self.cumulative_distance = array('d')
+        # GPX中记录的真实时间（相对第一个有效时间的秒数，无效为NaN），仅在重采样时解析
+        self.source_times = None
+    
+    def __len__(self):
+        return len(self.lat)
+    
+    def append(self, lat, lon, ele, offset):
+        """追加一个轨迹点"""
+        self.lat.append(lat)
+        self.lon.append(lon)
+        self.ele.append(ele)
+        self.offsets.append(offset)
+    
+    def time_at(self, index):
+        """返回第index个轨迹点的绝对时间"""
+        return self.start_time + timedelta(seconds=self.offsets[index])
+    
+    def __getitem__(self, index):
+        """以dict形式返回单个轨迹点，兼容旧的列表调用方式"""
+        point = {
+            'lat': self.lat[index],
+            'lon': self.lon[index],
+            'ele': self.ele[index],
+            'time': self.time_at(index)
+        }
+        if len(self.cumulative_distance) == len(self.lat):
+            point['cumulative_distance'] = self.cumulative_distance[index]
+        return point
+    
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+    
+    @classmethod
+    def from_points(cls, points):
+        """
+        从旧的轨迹点字典列表构造Track
+        
+        Args:
+            points (list): 包含lat/lon/ele/time的字典列表
+            
+        Returns:
+            Track: 列式轨迹
+        """
+        if isinstance(points, cls):
+            return points
+        
+        track = cls(points[0]['time'] if points else None)
+        for point in points:
+            offset = (point['time'] - track.start_time).total_seconds()
+            track.append(point['lat'], point['lon'], point.get('ele', 0.0), offset)
+        if points and all('cumulative_distance' in point for point in points):
+            track.cumulative_distance = array('d', (point['cumulative_distance'] for point in points))
+        return track
+    
+    def to_points(self):
+        """转换为旧的轨迹点字典列表"""
+        return list(self)
+    
+    def select(self, indices):
+        """
+        按索引选取轨迹点，返回新的Track（累计距离需重新计算）
+        
+        Args:
+            indices (list): 递增的轨迹点索引
+            
+        Returns:
+            Track: 只包含选中点的轨迹
+        """
+        track = Track(self.start_time)
+        track.lat = array('d', (self.lat[i] for i in indices))
+        track.lon = array('d', (self.lon[i] for i in indices))
+        track.ele = array('d', (self.ele[i] for i in indices))
+        track.offsets = array('d', (self.offsets[i] for i in indices))
+        if self.source_times is not None:
+            track.source_times = array('d', (self.source_times[i] for i in indices))
+        return track
+
+
+def _to_array(values):
+    """将NumPy浮点数组转换为array('d')"""
+    result = array('d')
+    result.frombytes(np.ascontiguousarray(values, dtype=np.float64).tobytes())
+    return result
+
+
+def resample_track(track, interval, use_numpy=None):
+    """
+    按固定时间间隔重采样轨迹
+    
+    以GPX记录的真实时间（没有时优先回退到offsets）为自变量，
+    对纬度、经度和海拔做线性插值，得到间隔为interval秒的等时网格。
+    时间缺失或不递增的点不参与插值。安装NumPy时用numpy.interp一次完成，
+    否则使用双指针单次遍历。
+    
+    Args:
+        track (Track): 列式轨迹
+        interval (float): 重采样间隔（秒），不大于0时不重采样
+        use_numpy (bool): 是否使用NumPy，默认在可用时使用
+        
+    Returns:
+        Track: 重采样后的轨迹，offsets为0, interval, 2*interval...；无需重采样时返回原轨迹
+    """
+    if interval <= 0 or len(track) < 2:
+        return track
+    if use_numpy is None:
+        use_numpy = np is not None
+    times = track.source_times if track.source_times is not None else track.offsets
+    
+    if use_numpy:
+        t = np.frombuffer(times, dtype=np.float64)
+        valid = np.flatnonzero(~np.isnan(t))
+        t_valid = t[valid]
+        if len(t_valid) < 2:
+            return track
+        # 只保留时间严格递增的点
+        keep = np.empty(len(t_valid), dtype=bool)
+        keep[0] = True
+        keep[1:] = t_valid[1:] > np.maximum.accumulate(t_valid)[:-1]
+        index = valid[keep]
+        t_keep = t[index]
+        if len(t_keep) < 2:
+            return track
+        grid = t_keep[0] + interval * np.arange(int((t_keep[-1] - t_keep[0]) // interval) + 1)
+        
+        result = Track(track.start_time)
+        for name in ('lat', 'lon', 'ele'):
+            column = np.frombuffer(getattr(track, name), dtype=np.float64)[index]
+            setattr(result, name, _to_array(np.interp(grid, t_keep, column)))
+        result.offsets = _to_array(grid - t_keep[0])
+        result.source_times = _to_array(grid)
+        return result
+    
+    index = []
+    last = float('-inf')
+    for i, value in enumerate(times):
+        if value == value and value > last:  # 排除NaN和不递增的时间
+            index.append(i)
+            last = value
+    if len(index) < 2:
+        return track
+    
+    start = times[index[0]]
+    steps = int((times[index[-1]] - start) // interval) + 1
+    result = Track(track.start_time)
+    result.source_times = array('d', (start + k * interval for k in range(steps)))
+    result.offsets = array('d', (k * interval for k in range(steps)))
+    lat, lon, ele = track.lat, track.lon, track.ele
+    j = 0
+    for grid_time in result.source_times:
+        while j < len(index) - 2 and times[index[j + 1]] < grid_time:
+            j += 1
+        a = index[j]
+        b = index[j + 1]
+        ratio = (grid_time - times[a]) / (times[b] - times[a])
+        if ratio < 0:
+            ratio = 0.0
+        elif ratio > 1:
+            ratio = 1.0
+        result.lat.append(lat[a] + (lat[b] - lat[a]) * ratio)
+        result.lon.append(lon[a] + (lon[b] - lon[a]) * ratio)
+        result.ele.append(ele[a] + (ele[b] - ele[a]) * ratio)
+    return result
+
+
+def simplify_track(track, tolerance, max_distance_error=SIMPLIFY_MAX_DISTANCE_ERROR):
+    """
+    简化轨迹，去掉几乎共线的冗余点
+    
+    Visvalingam式逐点删除：每个中间点的重要度是它到前后相邻点连线的距离（米），
+    用最小堆每次删除重要度最小的点，并只重新计算两个邻居的重要度，复杂度O(n log n)。
+    重要度超过tolerance的点全部保留；删除一个点会使轨迹长度缩短，
+    累计缩短量不超过总长度的max_distance_error。
+    
+    Args:
+        track (Track): 列式轨迹
+        tolerance (float): 允许偏离原轨迹的距离（米），不大于0时不简化
+        max_distance_error (float): 允许的总距离相对误差
+        
+    Returns:
+        Track: 简化后的轨迹；无需简化时返回原轨迹
+    """
+    count = len(track)
+    if tolerance <= 0 or count < 3:
+        return track
+    
+    # 以轨迹平均纬度做等距投影，小范围内足以按平面计算米级距离
+    scale_y = EARTH_RADIUS_M * math.pi / 180
+    scale_x = scale_y * math.cos(math.radians(sum(track.lat) / count))
+    xs = [lon * scale_x for lon in track.lon]
+    ys = [lat * scale_y for lat in track.lat]
+    
+    def distance(a, b):
+        return math.hypot(xs[b] - xs[a], ys[b] - ys[a])
+    
+    def offset(i, a, b):
+        # 点i到线段a-b的距离
+        dx = xs[b] - xs[a]
+        dy = ys[b] - ys[a]
+        length_sq = dx * dx + dy * dy
+        if length_sq == 0:
+            return distance(a, i)
+        t = ((xs[i] - xs[a]) * dx + (ys[i] - ys[a]) * dy) / length_sq
+        t = 0.0 if t < 0 else 1.0 if t > 1 else t
+        return math.hypot(xs[a] + t * dx - xs[i], ys[a] + t * dy - ys[i])
+    
+    prev = list(range(-1, count - 1))
+    next_ = list(range(1, count + 1))
+    removed = bytearray(count)
+    importance = [0.0] * count
+    heap = []
+    for i in range(1, count - 1):
+        importance[i] = offset(i, i - 1, i + 1)
+        heap.append((importance[i], i))
+    heapq.heapify(heap)
+    
+    budget = sum(distance(i - 1, i) for i in range(1, count)) * max_distance_error
+    lost = 0.0
+    
+    while heap:
+        value, i = heapq.heappop(heap)
+        if removed[i] or value != importance[i]:
+            continue  # 已删除或重要度已更新的过期条目
+        if value > tolerance:
+            break
+        a = prev[i]
+        b = next_[i]
+        shortening = distance(a, i) + distance(i, b) - distance(a, b)
+        if lost + shortening > budget:
+            continue  # 超出距离误差预算，保留该点；邻居变化时会重新评估
+        lost += shortening
+        removed[i] = 1
+        next_[a] = b
+        prev[b] = a
+        for j in (a, b):
+            if 0 < j < count - 1:
+                importance[j] = offset(j, prev[j], next_[j])
+                heapq.heappush(heap, (importance[j], j))
+    
+    return track.select([i for i in range(count) if not removed[i]])
+
+
+class _UnclosedStream:
+    """
+    包装标准输出等共享流：with块结束时只刷新不关闭
+    """
+    
+    def __init__(self, stream):
+        self.stream = stream
+    
+    def write(self, chunk):
+        return self.stream.write(chunk)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.stream.flush()
+        return False
+
+
+class LapAggregator:
+    """
+    圈汇总数据的在线统计
+    
+    在输出轨迹点的同时累计速度、步频和功率的和、最大值和计数，
+    圈结束时直接得到汇总值，无需再次遍历或重新模拟。
+    """
+    
+    __slots__ = ('speed_sum', 'speed_count', 'cadence_sum', 'cadence_max', 'cadence_count',
+                 'power_sum', 'power_max', 'power_count')
+    
+    def __init__(self):
+        self.speed_sum = 0.0
+        self.speed_count = 0
+        self.cadence_sum = 0
+        self.cadence_max = 0
+        self.cadence_count = 0
+        self.power_sum = 0
+        self.power_max = 0
+        self.power_count = 0
+    
+    def add(self, speed, cadence, power):
+        """累计一个轨迹点"""
+        self.speed_sum += speed
+        self.speed_count += 1
+        if cadence > 0:  # 只统计有效步频
+            self.cadence_sum += cadence
+            self.cadence_count += 1
+            if cadence > self.cadence_max:
+                self.cadence_max = cadence
+        if power > 0:  # 只统计有效功率
+            self.power_sum += power
+            self.power_count += 1
+            if power > self.power_max:
+                self.power_max = power
+    
+    def summary(self, config):
+        """
+        计算平均值和最大值
+        
+        Args:
+            config (dict): 转换器配置，没有有效数据时使用其中的默认值
+            
+        Returns:
+            dict: avg_speed、avg_cadence、max_cadence、avg_power、max_power
+        """
+        return {
+            'avg_speed': self.speed_sum / self.speed_count if self.speed_count else 0.0,
+            'avg_cadence': int(self.cadence_sum / self.cadence_count) if self.cadence_count else config.get('base_cadence', 50),
+            'max_cadence': self.cadence_max if self.cadence_count else config.get('max_cadence', 70),
+            'avg_power': int(self.power_sum / self.power_count) if self.power_count else config.get('min_power', 150),
+            'max_power': self.power_max if self.power_count else config.get('max_power', 300)
+        }
+
 
 class GPXToTCXConverter:
     """
@@ -61,13 +510,93 @@ class GPXToTCXConverter:
             'activity_type': 'Running',  # 运动类型
             'device_name': 'GPX Converter', # 设备名称
             'calories_per_km': 60,       # 每公里消耗卡路里
-            'target_pace': '5:30'        # 目标配速 (min/km)
+            'target_pace': '5:30',       # 目标配速 (min/km)
+            'random_seed': None,         # 模拟数据随机种子，None表示每次随机
+            'auto_lap_distance': 0,      # 自动分圈距离 (米)，0表示不分圈
+            'compress': False,           # 是否输出gzip压缩的TCX (.tcx.gz)
+            'quiet': False,              # 是否屏蔽进度输出
+            'simplify_tolerance': 0,     # 轨迹简化容差 (米)，0表示不简化
+            'simplify_max_distance_error': SIMPLIFY_MAX_DISTANCE_ERROR,  # 简化允许的总距离相对误差
+            'resample_interval': 0       # 重采样时间间隔 (秒)，0表示不重采样
         }
         
         # 合并用户配置和默认配置
         self.config = default_config.copy()
         if config:
             self.config.update(config)
+        
+        # 每个转换器独立的随机数生成器，不与其他线程共享全局random状态
+        self.seed = self.config['random_seed']
+        if self.seed is None:
+            self.seed = random.SystemRandom().randrange(2 ** 32)
+        self.rng = random.Random(self.seed)
+        
+        # 分阶段性能数据：stage_callback(stage, record)在每个阶段结束时调用
+        self.profile = {}
+        self.stage_callback = None
+        # 本次转换是否以当前时间作为开始时间（输出随转换时间变化，不能缓存）
+        self.uses_current_time = False
+        
+        # 输出路径为"-"时写入的文本流，None表示sys.stdout
+        self.output_stream = None
+    
+    def log(self, message):
+        """
+        输出进度信息，配置quiet为True时不输出
+        
+        Args:
+            message (str): 进度信息
+        """
+        if not self.config.get('quiet'):
+            print(message)
+    
+    @contextmanager
+    def stage(self, name, points=0):
+        """
+        记录一个处理阶段的耗时和内存
+        
+        记录墙钟时间、CPU时间和点数；tracemalloc已启动时还记录该阶段的
+        峰值内存增量（字节），否则为None。结果保存在self.profile[name]，
+        并传给stage_callback。
+        
+        Args:
+            name (str): 阶段名称，如parse、metrics、simulate、serialize
+            points (int): 阶段处理的轨迹点数，也可在with块内更新record['points']
+            
+        Yields:
+            dict: 本阶段的记录
+        """
+        record = {'points': points}
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            memory_before = tracemalloc.get_traced_memory()[0]
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield record
+        finally:
+            record['wall_time'] = time.perf_counter() - wall_start
+            record['cpu_time'] = time.process_time() - cpu_start
+            record['peak_memory'] = tracemalloc.get_traced_memory()[1] - memory_before if tracing else None
+            self.profile[name] = record
+            if self.stage_callback:
+                self.stage_callback(name, record)
+    
+    def print_profile(self):
+        """
+        打印分阶段性能数据
+        """
+        if not self.profile:
+            return
+        print("\n⏱️  分阶段耗时:")
+        print(f"  {'阶段':<10}{'墙钟(ms)':>12}{'CPU(ms)':>12}{'点数':>10}{'点/秒':>12}{'峰值内存(KB)':>14}")
+        for name, record in self.profile.items():
+            wall = record['wall_time']
+            rate = record['points'] / wall if wall > 0 else 0
+            memory = f"{record['peak_memory'] / 1024:.1f}" if record['peak_memory'] is not None else '-'
+            print(f"  {name:<10}{wall * 1000:>12.1f}{record['cpu_time'] * 1000:>12.1f}"
+                  f"{record['points']:>10}{rate:>12.0f}{memory:>14}")
     
     def parse_target_pace(self, pace_str):
         """
@@ -108,7 +637,7 @@ class GPXToTCXConverter:
             float: 两点间距离（米）
         """
         # 地球半径（米）
-        R = 6371000
+        R = EARTH_RADIUS_M
         
         # 转换为弧度
         lat1_rad = math.radians(lat1)
@@ -126,6 +655,197 @@ class GPXToTCXConverter:
         
         return R * c
     
+    def _current_time(self):
+        """没有可用的开始时间时使用当前时间，并记录输出依赖转换时间"""
+        self.uses_current_time = True
+        return datetime.now()
+    
+    def _configured_base_time(self):
+        """
+        解析用户配置的开始时间
+        
+        Returns:
+            datetime: 配置的开始时间；未配置时返回None，解析失败时返回当前时间
+        """
+        if not self.config.get('start_time'):
+            return None
+        
+        start_time_config = self.config['start_time']
+        if isinstance(start_time_config, datetime):
+            base_time = start_time_config
+            self.log(f"✅ 使用自定义开始时间: {base_time.strftime('%Y-%m-%d %H:%M:%S')}")
+            return base_time
+        
+        # 如果是字符串，尝试解析
+        try:
+            if 'T' in str(start_time_config):
+                # 移除时区信息，按本地时间解析
+                time_str = str(start_time_config).replace('Z', '').split('+')[0].split('-')[0] if '+' in str(start_time_config) or 'Z' in str(start_time_config) else str(start_time_config)
+                base_time = datetime.fromisoformat(time_str)
+            else:
+                base_time = datetime.strptime(str(start_time_config), '%Y-%m-%d %H:%M:%S')
+            self.log(f"✅ 使用自定义开始时间: {base_time.strftime('%Y-%m-%d %H:%M:%S')}")
+        except:
+            base_time = self._current_time()
+            self.log(f"⚠️ 自定义时间解析失败，使用当前时间: {base_time.strftime('%Y-%m-%d %H:%M:%S')}")
+        return base_time
+    
+    def _parse_gpx_time(self, time_str):
+        """
+        解析GPX中的ISO时间字符串
+        
+        Returns:
+            datetime: 解析结果，空字符串或格式无效时返回None
+        """
+        if not time_str:
+            return None
+        try:
+            return datetime.fromisoformat(time_str.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    
+    def _iterparse_trackpoints(self, gpx_source):
+        """
+        使用iterparse流式遍历<trkpt>元素
+        
+        每个轨迹点处理完后立即清除元素并从父节点移除，
+        内存占用与文件大小无关。
+        
+        Args:
+            gpx_source: GPX文件路径或二进制文件对象
+            
+        Yields:
+            tuple: (lat, lon, ele, time_str)，均为原始字符串，缺失字段为空字符串
+        """
+        if _LXML_AVAILABLE:
+            # lxml可以直接按标签过滤，只产生trkpt的end事件
+            context = etree.iterparse(gpx_source, events=('end',), tag='{*}trkpt',
+                                      resolve_entities=False, no_network=True)
+        else:
+            context = etree.iterparse(gpx_source, events=('start', 'end'))
+        
+        container = None
+        for event, elem in context:
+            if not _LXML_AVAILABLE:
+                name = elem.tag.rsplit('}', 1)[-1]
+                if event == 'start':
+                    if name == 'trkseg':
+                        container = elem
+                    continue
+                if name != 'trkpt':
+                    continue
+            
+            lat = elem.get('lat')
+            lon = elem.get('lon')
+            ele = ''
+            time_str = ''
+            for child in elem:
+                if not isinstance(child.tag, str):
+                    continue
+                child_name = child.tag.rsplit('}', 1)[-1]
+                if child_name == 'ele':
+                    ele = (child.text or '').strip()
+                elif child_name == 'time':
+                    time_str = (child.text or '').strip()
+            
+            # 释放已处理的元素，保持内存占用恒定
+            elem.clear()
+            if _LXML_AVAILABLE:
+                while elem.getprevious() is not None:
+                    del elem.getparent()[0]
+            elif container is not None:
+                del container[:]
+            
+            if lat and lon:
+                yield lat, lon, ele, time_str
+    
+    def iter_gpx_points(self, gpx_source):
+        """
+        流式解析GPX文件，逐个生成轨迹点
+        
+        与parse_gpx_file返回相同结构的轨迹点，但不会一次性读入整个文件，
+        也不会保存完整的点列表，适合超大轨迹文件。
+        
+        Args:
+            gpx_source: GPX文件路径或二进制文件对象
+            
+        Yields:
+            dict: 轨迹点信息 (lat, lon, ele, time)
+            
+        Raises:
+            SyntaxError: GPX文件不是格式良好的XML
+        """
+        base_time = self._configured_base_time()
+        # 在找到第一个有效时间之前暂存的轨迹点（通常为空）
+        pending = []
+        count = 0
+        
+        for lat, lon, ele, time_str in self._iterparse_trackpoints(gpx_source):
+            if base_time is None:
+                pending.append((lat, lon, ele))
+                base_time = self._parse_gpx_time(time_str)
+                if base_time is None:
+                    continue
+                self.log(f"✅ 使用GPX文件中的时间: {base_time.strftime('%Y-%m-%d %H:%M:%S')}")
+                for p_lat, p_lon, p_ele in pending:
+                    yield self._make_point(p_lat, p_lon, p_ele, base_time, count)
+                    count += 1
+                pending = []
+                continue
+            
+            yield self._make_point(lat, lon, ele, base_time, count)
+            count += 1
+        
+        if pending:
+            # GPX文件中没有有效时间，使用当前时间
+            base_time = self._current_time()
+            self.log(f"✅ 使用当前时间: {base_time.strftime('%Y-%m-%d %H:%M:%S')}")
+            for p_lat, p_lon, p_ele in pending:
+                yield self._make_point(p_lat, p_lon, p_ele, base_time, count)
+                count += 1
+        
+        self.log(f"✅ 找到 {count} 个GPX轨迹点")
+    
+    def _make_point(self, lat, lon, ele, base_time, index):
+        """根据原始字段构造轨迹点，时间为基础时间加上索引秒数"""
+        return {
+            'lat': float(lat),
+            'lon': float(lon),
+            'ele': float(ele) if ele else 0.0,
+            'time': base_time + timedelta(seconds=index)
+        }
+    
+    def scan_trackpoints(self, gpx_content):
+        """
+        单次线性扫描GPX文本，逐个提取轨迹点字段
+        
+        每个<trkpt>只匹配一次，ele和time只在该点自身的标签体内查找，
+        解析耗时随文件大小线性增长，重复坐标也不会错配到其他点。
+        
+        Args:
+            gpx_content (str): GPX文件内容
+            
+        Yields:
+            tuple: (lat, lon, ele, time_str)，均为原始字符串，缺失字段为空字符串
+        """
+        for trkpt in _TRKPT_RE.finditer(gpx_content):
+            attrs = trkpt.group(1)
+            lat_match = _LAT_ATTR_RE.search(attrs)
+            lon_match = _LON_ATTR_RE.search(attrs)
+            if not lat_match or not lon_match:
+                continue
+            
+            body = trkpt.group(2)
+            ele = ''
+            time_str = ''
+            if body:
+                ele_match = _ELE_RE.search(body)
+                time_match = _TIME_RE.search(body)
+                ele = ele_match.group(1).strip() if ele_match else ''
+                time_str = time_match.group(1).strip() if time_match else ''
+            
+            yield lat_match.group(1), lon_match.group(1), ele, time_str
+    
     def parse_gpx_file(self, gpx_file_path):
         """
         解析GPX文件，提取轨迹点数据
@@ -140,158 +860,295 @@ class GPXToTCXConverter:
             with open(gpx_file_path, 'r', encoding='utf-8') as f:
                 gpx_content = f.read()
         except Exception as e:
-            print(f"❌ 读取GPX文件失败: {e}")
+            self.log(f"❌ 读取GPX文件失败: {e}")
             return []
         
-        # 使用正则表达式提取轨迹点 - 修复以支持GPX格式
-        # 先提取所有trkpt块（包括自闭合和开闭标签格式）
-        trkpt_blocks = re.findall(r'<trkpt[^>]*lat="([^"]+)"[^>]*lon="([^"]+)"[^>]*>(?:.*?</trkpt>|[^>]*/>)', gpx_content, re.DOTALL)
-        
-        matches = []
-        for block in trkpt_blocks:
-            lat, lon = block if isinstance(block, tuple) else (block, '')
-            # 在每个trkpt块中查找ele和time
-            full_block = re.search(r'<trkpt[^>]*lat="' + re.escape(lat) + r'"[^>]*lon="' + re.escape(lon) + r'"[^>]*>.*?(?:</trkpt>|/>)', gpx_content, re.DOTALL)
-            if full_block:
-                block_content = full_block.group(0)
-                ele_match = re.search(r'<ele>([^<]+)</ele>', block_content)
-                time_match = re.search(r'<time>([^<]+)</time>', block_content)
-                ele = ele_match.group(1) if ele_match else ''
-                time_str = time_match.group(1) if time_match else ''
-                matches.append((lat, lon, ele, time_str))
+        # 单次扫描提取所有轨迹点（包括自闭合和开闭标签格式）
+        matches = list(self.scan_trackpoints(gpx_content))
         
         gpx_points = []
         
         # 确定基础时间 - 优先使用用户配置的开始时间
-        if self.config.get('start_time'):
-            start_time_config = self.config['start_time']
-            if isinstance(start_time_config, datetime):
-                base_time = start_time_config
-                print(f"✅ 使用自定义开始时间: {base_time.strftime('%Y-%m-%d %H:%M:%S')}")
-            else:
-                # 如果是字符串，尝试解析
-                try:
-                    if 'T' in str(start_time_config):
-                        # 移除时区信息，按本地时间解析
-                        time_str = str(start_time_config).replace('Z', '').split('+')[0].split('-')[0] if '+' in str(start_time_config) or 'Z' in str(start_time_config) else str(start_time_config)
-                        base_time = datetime.fromisoformat(time_str)
-                    else:
-                        base_time = datetime.strptime(str(start_time_config), '%Y-%m-%d %H:%M:%S')
-                    print(f"✅ 使用自定义开始时间: {base_time.strftime('%Y-%m-%d %H:%M:%S')}")
-                except:
-                    base_time = datetime.now()
-                    print(f"⚠️ 自定义时间解析失败，使用当前时间: {base_time.strftime('%Y-%m-%d %H:%M:%S')}")
-        else:
+        base_time = self._configured_base_time()
+        if base_time is None:
             # 如果没有配置自定义时间，尝试使用GPX文件中的第一个时间点
-            base_time = None
-            for i, match in enumerate(matches):
-                lat, lon, ele, time_str = match
-                if time_str:
-                    try:
-                        base_time = datetime.fromisoformat(time_str.replace('Z', '+00:00'))
-                        print(f"✅ 使用GPX文件中的时间: {base_time.strftime('%Y-%m-%d %H:%M:%S')}")
-                        break
-                    except:
-                        continue
+            for lat, lon, ele, time_str in matches:
+                base_time = self._parse_gpx_time(time_str)
+                if base_time is not None:
+                    self.log(f"✅ 使用GPX文件中的时间: {base_time.strftime('%Y-%m-%d %H:%M:%S')}")
+                    break
             
             if base_time is None:
                 # 如果GPX文件中也没有有效时间，使用当前时间
-                base_time = datetime.now()
-                print(f"✅ 使用当前时间: {base_time.strftime('%Y-%m-%d %H:%M:%S')}")
+                base_time = self._current_time()
+                self.log(f"✅ 使用当前时间: {base_time.strftime('%Y-%m-%d %H:%M:%S')}")
         
         # 为所有点分配时间
-        for i, match in enumerate(matches):
-            lat, lon, ele, time_str = match
-            
+        for i, (lat, lon, ele, time_str) in enumerate(matches):
             # 使用基础时间加上索引秒数来分配时间
-            point_time = base_time + timedelta(seconds=i)
-            
-            gpx_points.append({
-                'lat': float(lat),
-                'lon': float(lon),
-                'ele': float(ele) if ele else 0.0,
-                'time': point_time
-            })
+            gpx_points.append(self._make_point(lat, lon, ele, base_time, i))
         
-        print(f"✅ 找到 {len(gpx_points)} 个GPX轨迹点")
+        self.log(f"✅ 找到 {len(gpx_points)} 个GPX轨迹点")
         return gpx_points
     
+    def _build_track(self, raw_points, keep_source_times=False):
+        """
+        由原始字段流构造列式轨迹
+        
+        时间按基础时间加索引秒数分配，基础时间的确定规则与parse_gpx_file一致。
+        
+        Args:
+            raw_points: 产生(lat, lon, ele, time_str)字符串元组的可迭代对象
+            keep_source_times (bool): 是否解析每个点的GPX时间到source_times列
+            
+        Returns:
+            Track: 列式轨迹
+        """
+        base_time = self._configured_base_time()
+        track = Track(base_time)
+        append = track.append
+        source_times = array('d') if keep_source_times else None
+        source_origin = None
+        
+        for index, (lat, lon, ele, time_str) in enumerate(raw_points):
+            if track.start_time is None:
+                track.start_time = self._parse_gpx_time(time_str)
+                if track.start_time is not None:
+                    self.log(f"✅ 使用GPX文件中的时间: {track.start_time.strftime('%Y-%m-%d %H:%M:%S')}")
+            append(float(lat), float(lon), float(ele) if ele else 0.0, float(index))
+            
+            if source_times is not None:
+                point_time = self._parse_gpx_time(time_str)
+                if point_time is not None and source_origin is None:
+                    source_origin = point_time
+                try:
+                    source_times.append((point_time - source_origin).total_seconds())
+                except TypeError:
+                    # 时间缺失，或带时区与不带时区的时间混用
+                    source_times.append(math.nan)
+        
+        track.source_times = source_times
+        
+        if track.start_time is None:
+            # 如果GPX文件中也没有有效时间，使用当前时间
+            track.start_time = self._current_time()
+            self.log(f"✅ 使用当前时间: {track.start_time.strftime('%Y-%m-%d %H:%M:%S')}")
+        
+        self.log(f"✅ 找到 {len(track)} 个GPX轨迹点")
+        return track
+    
+    def load_track(self, gpx_file_path):
+        """
+        读取GPX文件为列式轨迹，优先使用流式解析
+        
+        流式解析不会把整个文件读入内存；遇到格式不规范的GPX
+        （非良构XML）时回退到容错的正则扫描。
+        
+        Args:
+            gpx_file_path: GPX文件路径，或二进制文件对象（如sys.stdin.buffer）
+            
+        Returns:
+            Track: 列式轨迹，读取失败时为空轨迹
+        """
+        keep_source_times = self.config.get('resample_interval', 0) > 0
+        try:
+            return self._build_track(self._iterparse_trackpoints(gpx_file_path), keep_source_times)
+        except SyntaxError as e:
+            self.log(f"⚠️ GPX不是规范的XML ({e})，改用容错解析")
+        except Exception as e:
+            self.log(f"❌ 读取GPX文件失败: {e}")
+            return Track()
+        
+        try:
+            if isinstance(gpx_file_path, str):
+                with open(gpx_file_path, 'r', encoding='utf-8') as f:
+                    gpx_content = f.read()
+            elif gpx_file_path.seekable():
+                # 文件对象已被流式解析读过，回到开头重新读取
+                gpx_file_path.seek(0)
+                gpx_content = gpx_file_path.read().decode('utf-8')
+            else:
+                self.log("❌ 输入流不支持回退，无法使用容错解析")
+                return Track()
+        except Exception as e:
+            self.log(f"❌ 读取GPX文件失败: {e}")
+            return Track()
+        return self._build_track(self.scan_trackpoints(gpx_content), keep_source_times)
+    
+    def resample(self, track):
+        """
+        按配置的时间间隔重采样轨迹
+        
+        Args:
+            track (Track): 列式轨迹
+            
+        Returns:
+            Track: 重采样后的轨迹
+        """
+        before = len(track)
+        resampled = resample_track(track, self.config.get('resample_interval', 0))
+        self.log(f"✅ 轨迹重采样: {before} -> {len(resampled)} 个点 "
+                 f"(间隔 {self.config['resample_interval']:g} 秒)")
+        return resampled
+    
+    def simplify(self, track):
+        """
+        按配置的容差简化轨迹
+        
+        Args:
+            track (Track): 列式轨迹
+            
+        Returns:
+            Track: 简化后的轨迹
+        """
+        before = len(track)
+        simplified = simplify_track(track, self.config.get('simplify_tolerance', 0),
+                                    self.config.get('simplify_max_distance_error', SIMPLIFY_MAX_DISTANCE_ERROR))
+        self.log(f"✅ 轨迹简化: {before} -> {len(simplified)} 个点 "
+                 f"(容差 {self.config['simplify_tolerance']:g} 米)")
+        return simplified
+    
+    def load_points(self, gpx_file_path):
+        """
+        读取GPX轨迹点（兼容旧接口）
+        
+        Args:
+            gpx_file_path (str): GPX文件路径
+            
+        Returns:
+            list: 包含轨迹点信息的列表
+        """
+        return self.load_track(gpx_file_path).to_points()
+    
+    def compute_speed_profile(self, segments, offsets, use_numpy=None):
+        """
+        计算每个轨迹点压缩后的速度序列
+        
+        目标配速只解析一次。原始速度超出目标速度±15%范围时进行压缩，
+        结果供calculate_metrics、轨迹点输出和圈汇总统计共用。
+        
+        Args:
+            segments (array): 每段距离（米），长度为n-1
+            offsets (array): 每个点相对开始时间的秒数，长度为n
+            use_numpy (bool): 是否使用NumPy，默认在可用时使用
+            
+        Returns:
+            dict: speeds为长度n的array('d')（第一个点为0），
+                  avg_speed和max_speed只统计时间差大于0的分段
+        """
+        count = len(offsets)
+        speeds = array('d', [0.0]) * count
+        if count < 2:
+            return {'speeds': speeds, 'avg_speed': 0, 'max_speed': 0}
+        
+        # 基于配置的目标配速进行速度压缩
+        target_speed = self.parse_target_pace(self.config.get('target_pace', '5:30'))
+        
+        # 基于目标速度创建合理的速度范围 (±15%)
+        min_speed = target_speed * 0.85
+        max_speed = target_speed * 1.15
+        fast_speed = max_speed * 1.5
+        speed_range = max_speed - min_speed
+        
+        if use_numpy is None:
+            use_numpy = np is not None
+        
+        if use_numpy:
+            seg = np.asarray(segments, dtype=np.float64)
+            time_diff = np.diff(np.asarray(offsets, dtype=np.float64))
+            valid = time_diff > 0
+            raw = np.zeros(count - 1, dtype=np.float64)
+            np.divide(seg, time_diff, out=raw, where=valid)
+            excess = raw - fast_speed
+            with np.errstate(divide='ignore', invalid='ignore'):
+                compressed = np.where(
+                    raw > fast_speed,
+                    min_speed + excess / (excess + target_speed) * speed_range,
+                    np.where(raw > max_speed, max_speed + (raw - max_speed) * 0.1, raw))
+            np.clip(compressed, min_speed, max_speed, out=compressed)
+            speeds[1:] = array('d', compressed.tobytes())
+            moving = compressed[valid]
+            if moving.size:
+                return {'speeds': speeds,
+                        'avg_speed': float(moving.mean()),
+                        'max_speed': float(moving.max())}
+            return {'speeds': speeds, 'avg_speed': 0, 'max_speed': 0}
+        
+        total = 0.0
+        moving_count = 0
+        peak = 0
+        for i in range(1, count):
+            time_diff = offsets[i] - offsets[i-1]
+            raw_speed = segments[i-1] / time_diff if time_diff > 0 else 0
+            
+            # 对原始速度进行调整，使其接近目标配速
+            if raw_speed > fast_speed:  # 速度过快时进行压缩
+                compressed_speed = min_speed + (raw_speed - fast_speed) / (raw_speed - fast_speed + target_speed) * speed_range
+            elif raw_speed > max_speed:  # 轻微超速时轻微压缩
+                compressed_speed = max_speed + (raw_speed - max_speed) * 0.1
+            else:
+                compressed_speed = raw_speed
+            
+            # 限制在合理的速度范围内
+            compressed_speed = max(min_speed, min(compressed_speed, max_speed))
+            speeds[i] = compressed_speed
+            
+            if time_diff > 0:
+                total += compressed_speed
+                moving_count += 1
+                if compressed_speed > peak:
+                    peak = compressed_speed
+        
+        avg_speed = total / moving_count if moving_count else 0
+        return {'speeds': speeds, 'avg_speed': avg_speed, 'max_speed': peak}
+    
     def calculate_metrics(self, points):
         """
         计算轨迹的各种指标，使用与TCX输出一致的速度压缩逻辑
         
+        累计距离写入track.cumulative_distance；传入旧的字典列表时
+        同时写回每个点的cumulative_distance字段。
+        
         Args:
-            points (list): 轨迹点列表
+            points (Track|list): 列式轨迹或轨迹点列表
             
         Returns:
             dict: 包含各种指标的字典
         """
-        if len(points) < 2:
+        track = Track.from_points(points)
+        
+        if len(track) < 2:
+            track.cumulative_distance = array('d', [0.0]) * len(track)
             return {
                 'total_distance': 0,
                 'total_time': 0,
                 'avg_speed': 0,
                 'max_speed': 0,
-                'total_calories': 0
+                'total_calories': 0,
+                'speeds': array('d', [0.0]) * len(track)
             }
         
-        total_distance = 0
-        raw_speeds = []
-        compressed_speeds = []
+        offsets = track.offsets
         
-        # 计算每段的距离和速度
-        for i in range(1, len(points)):
-            prev_point = points[i-1]
-            curr_point = points[i]
-            
-            # 计算距离
-            segment_distance = self.calculate_distance(
-                prev_point['lat'], prev_point['lon'],
-                curr_point['lat'], curr_point['lon']
-            )
-            total_distance += segment_distance
-            
-            # 计算时间差
-            time_diff = (curr_point['time'] - prev_point['time']).total_seconds()
-            
-            # 计算原始速度
-            if time_diff > 0:
-                raw_speed = segment_distance / time_diff  # m/s
-                raw_speeds.append(raw_speed)
-                
-                # 基于配置的目标配速进行速度压缩
-                target_pace = self.config.get('target_pace', '5:30')
-                target_speed = self.parse_target_pace(target_pace)
-                
-                # 基于目标速度创建合理的速度范围 (±15%)
-                min_speed = target_speed * 0.85
-                max_speed = target_speed * 1.15
-                
-                # 对原始速度进行调整，使其接近目标配速
-                if raw_speed > max_speed * 1.5:  # 速度过快时进行压缩
-                    # 压缩到目标范围
-                    compressed_speed = min_speed + (raw_speed - max_speed * 1.5) / (raw_speed - max_speed * 1.5 + target_speed) * (max_speed - min_speed)
-                elif raw_speed > max_speed:  # 轻微超速时轻微压缩
-                    compressed_speed = max_speed + (raw_speed - max_speed) * 0.1
-                else:
-                    compressed_speed = raw_speed
-                
-                # 限制在合理的速度范围内
-                compressed_speed = max(min_speed, min(compressed_speed, max_speed))
-                compressed_speeds.append(compressed_speed)
-            
-            # 更新点的累积距离
-            points[i]['cumulative_distance'] = total_distance
+        # 一次性计算所有分段距离和累计距离
+        segments, cumulative_distance = haversine_segments(track.lat, track.lon)
+        total_distance = cumulative_distance[-1]
         
-        # 设置第一个点的累积距离
-        points[0]['cumulative_distance'] = 0
+        # 一次性计算压缩后的速度序列，供指标、轨迹点和圈汇总共用
+        speed_profile = self.compute_speed_profile(segments, offsets)
+        
+        track.cumulative_distance = cumulative_distance
+        if track is not points:
+            # 兼容旧的字典列表调用方式
+            for point, distance in zip(points, cumulative_distance):
+                point['cumulative_distance'] = distance
         
         # 计算总时间
-        total_time = (points[-1]['time'] - points[0]['time']).total_seconds()
+        total_time = offsets[-1] - offsets[0]
         
         # 使用压缩后的速度计算平均速度和最大速度
-        avg_speed = sum(compressed_speeds) / len(compressed_speeds) if compressed_speeds else 0
-        max_speed = max(compressed_speeds) if compressed_speeds else 0
+        avg_speed = speed_profile['avg_speed']
+        max_speed = speed_profile['max_speed']
         
         # 估算卡路里消耗
         total_calories = int((total_distance / 1000) * self.config['calories_per_km'])
@@ -301,7 +1158,8 @@ class GPXToTCXConverter:
             'total_time': total_time,
             'avg_speed': avg_speed,
             'max_speed': max_speed,
-            'total_calories': total_calories
+            'total_calories': total_calories,
+            'speeds': speed_profile['speeds']
         }
     
     def simulate_heart_rate(self, speed_ms, point_index, total_points):
@@ -341,8 +1199,7 @@ class GPXToTCXConverter:
             target_hr *= (1.0 + (progress - 0.8) * 0.15)  # 最多增加3%
         
         # 添加更大的随机波动增加真实性
-        import random
-        variation = random.uniform(-8, 12)  # 增加波动范围
+        variation = self.rng.uniform(-8, 12)  # 增加波动范围
         heart_rate = int(target_hr + variation)
         
         # 限制在合理范围内，但允许更大的变化
@@ -377,8 +1234,7 @@ class GPXToTCXConverter:
         cadence = base_cadence + (max_cadence - base_cadence) * speed_factor
         
         # 添加随机波动增加真实性
-        import random
-        variation = random.uniform(-3, 3)
+        variation = self.rng.uniform(-3, 3)
         cadence = int(cadence + variation)
         
         # 限制在合理范围内
@@ -417,40 +1273,237 @@ class GPXToTCXConverter:
         total_power = min_power + (max_power - min_power) * combined_factor
         
         # 添加随机波动增加真实性
-        import random
-        variation = random.uniform(-8, 8)
+        variation = self.rng.uniform(-8, 8)
         total_power = int(total_power + variation)
         
         # 限制在合理范围内
         return max(min_power - 10, min(max_power + 10, total_power))
     
-    def generate_tcx_content(self, points, metrics):
+    def simulate_series(self, speeds, seed=None):
+        """
+        批量模拟整条轨迹的心率、步频和功率
+        
+        公式与simulate_heart_rate、simulate_cadence、simulate_power一致，
+        配置只读取一次，随机数来自按种子新建的独立生成器：
+        相同的速度序列和种子总是得到相同的结果。
+        
+        Args:
+            speeds (array): 每个轨迹点的速度序列 (m/s)
+            seed (int): 随机种子，默认使用转换器的seed
+            
+        Returns:
+            dict: heart_rate、cadence、power三个array('i')序列
+        """
+        rng = random.Random(self.seed if seed is None else seed)
+        uniform = rng.random
+        config = self.config
+        
+        base_hr = config.get('base_hr', 120)
+        max_hr = config.get('max_hr', 180)
+        hr_factor = config.get('hr_factor', 1.5)
+        speed_threshold = config.get('speed_threshold', 0.8)
+        base_cadence = config.get('base_cadence', 50)
+        max_cadence = config.get('max_cadence', 70)
+        min_power = config.get('min_power', 150)
+        max_power = config.get('max_power', 300)
+        power_factor = config.get('power_factor', 2.5)
+        
+        hr_low = base_hr - 15
+        hr_high = max_hr + 15
+        hr_span = max(1, max_hr - base_hr)
+        cadence_low = base_cadence - 5
+        cadence_high = max_cadence + 5
+        power_low = min_power - 10
+        power_high = max_power + 10
+        
+        total_points = len(speeds)
+        progress_scale = 1.0 / max(1, total_points - 1)
+        heart_rates = array('i', [0]) * total_points
+        cadences = array('i', [0]) * total_points
+        powers = array('i', [0]) * total_points
+        
+        for i in range(total_points):
+            speed_ms = speeds[i]
+            
+            # 心率：速度、运动进程（热身和疲劳）和随机波动
+            if speed_ms < speed_threshold:
+                target_hr = base_hr
+            else:
+                speed_factor = min((speed_ms - speed_threshold) / 2.0, 1.0)
+                target_hr = base_hr + (max_hr - base_hr) * speed_factor * hr_factor / 2.0
+            progress = i * progress_scale
+            if progress < 0.2:
+                target_hr *= (0.95 + progress * 0.25)
+            elif progress > 0.8:
+                target_hr *= (1.0 + (progress - 0.8) * 0.15)
+            heart_rate = int(target_hr + (-8 + 20 * uniform()))
+            heart_rate = max(hr_low, min(hr_high, heart_rate))
+            heart_rates[i] = heart_rate
+            
+            # 步频
+            if speed_ms < 0.5:
+                cadence = 0
+            elif speed_ms < speed_threshold:
+                cadence = base_cadence
+            else:
+                speed_factor = min((speed_ms - speed_threshold) / 3.0, 1.0)
+                cadence = base_cadence + (max_cadence - base_cadence) * speed_factor
+                cadence = int(cadence + (-3 + 6 * uniform()))
+                cadence = max(cadence_low, min(cadence_high, cadence))
+            cadences[i] = cadence
+            
+            # 功率：结合速度和心率
+            if speed_ms < speed_threshold:
+                power = 0
+            else:
+                speed_factor = min((speed_ms - speed_threshold) / 2.0, 1.0)
+                hr_ratio = max(0, min(1, (heart_rate - base_hr) / hr_span))
+                combined_factor = (speed_factor * 0.6 + hr_ratio * 0.4) * power_factor / 3.0
+                power = min_power + (max_power - min_power) * combined_factor
+                power = int(power + (-8 + 16 * uniform()))
+                power = max(power_low, min(power_high, power))
+            powers[i] = power
+        
+        return {'heart_rate': heart_rates, 'cadence': cadences, 'power': powers}
+    
+    def split_laps(self, track, metrics, speeds, total_time):
+        """
+        按配置划分圈，并预先计算每圈头部的汇总值
+        
+        auto_lap_distance大于0时按该距离（米）自动分圈，否则整条轨迹为一圈，
+        汇总值直接取自metrics。
+        
+        Args:
+            track (Track): 已重新分配时间的列式轨迹
+            metrics (dict): 运动指标
+            speeds (array): 压缩后的速度序列
+            total_time (float): 整条轨迹的总时间（秒）
+            
+        Returns:
+            list: 每圈一个dict，包含start、end（轨迹点索引范围）、total_time、
+                  distance、max_speed、calories、trigger和avg_speed
+        """
+        total_points = len(track)
+        lap_distance = self.config.get('auto_lap_distance') or 0
+        
+        if lap_distance <= 0 or total_points < 2:
+            return [{
+                'start': 0,
+                'end': total_points,
+                'total_time': total_time,
+                'distance': metrics['total_distance'],
+                'max_speed': metrics['max_speed'],
+                'calories': metrics['total_calories'],
+                'trigger': 'Manual',
+                'avg_speed': metrics['avg_speed']
+            }]
+        
+        offsets = track.offsets
+        cumulative = track.cumulative_distance
+        calories_per_km = self.config['calories_per_km']
+        
+        def make_lap(start, end, next_index):
+            distance = cumulative[next_index] - cumulative[start]
+            return {
+                'start': start,
+                'end': end,
+                'total_time': offsets[next_index] - offsets[start],
+                'distance': distance,
+                'max_speed': max(speeds[start:end]),
+                'calories': int((distance / 1000) * calories_per_km),
+                'trigger': 'Distance',
+                'avg_speed': None
+            }
+        
+        laps = []
+        start = 0
+        next_mark = lap_distance
+        # 最后一个点只能结束当前圈，不能开启只有一个点、距离和时间为0的新圈
+        for i in range(1, total_points - 1):
+            if cumulative[i] >= next_mark:
+                # 第i个点是新一圈的起点
+                laps.append(make_lap(start, i, i))
+                start = i
+                while next_mark <= cumulative[i]:
+                    next_mark += lap_distance
+        laps.append(make_lap(start, total_points, total_points - 1))
+        return laps
+    
+    def generate_tcx_content(self, points, metrics, simulation=None):
         """
         生成TCX文件内容
         
         Args:
-            points (list): 轨迹点列表
+            points (Track|list): 列式轨迹或轨迹点列表（需已计算累计距离）
             metrics (dict): 运动指标
+            simulation (dict): simulate_series的结果，未提供时按速度序列批量模拟
             
         Returns:
             str: TCX文件内容
         """
-        if not points:
-            return ""
+        return ''.join(self.iter_tcx_chunks(points, metrics, simulation))
+    
+    def write_tcx(self, points, metrics, fp, simulation=None):
+        """
+        将TCX内容分块写入文件对象，不在内存中保留完整文档
+        
+        Args:
+            points (Track|list): 列式轨迹或轨迹点列表（需已计算累计距离）
+            metrics (dict): 运动指标
+            fp: 支持write(str)的文件对象（文件、socket包装、StringIO等）
+            simulation (dict): simulate_series的结果，未提供时按速度序列批量模拟
+            
+        Returns:
+            int: 写入的字符数
+        """
+        written = 0
+        for chunk in self.iter_tcx_chunks(points, metrics, simulation):
+            fp.write(chunk)
+            written += len(chunk)
+        return written
+    
+    def iter_tcx_chunks(self, points, metrics, simulation=None):
+        """
+        逐块生成TCX文件内容
+        
+        圈头部的汇总值在输出轨迹点之前由metrics计算，轨迹点按
+        TCX_CHUNK_POINTS个一组拼接后产出，内存占用与轨迹长度无关。
+        
+        Args:
+            points (Track|list): 列式轨迹或轨迹点列表（需已计算累计距离）
+            metrics (dict): 运动指标
+            simulation (dict): simulate_series的结果，未提供时按速度序列批量模拟
+            
+        Yields:
+            str: TCX文件内容片段
+        """
+        if not len(points):
+            return
+        
+        track = Track.from_points(points)
+        
+        # 读取共享的压缩速度序列；未提供时基于原始时间计算一次
+        speeds = metrics.get('speeds')
+        if speeds is None or len(speeds) != len(track):
+            cumulative = track.cumulative_distance
+            segments = array('d', (cumulative[i] - cumulative[i-1] for i in range(1, len(track))))
+            speeds = self.compute_speed_profile(segments, track.offsets)['speeds']
+        
+        if simulation is None:
+            simulation = self.simulate_series(speeds)
+        heart_rates = simulation['heart_rate']
+        cadences = simulation['cadence']
+        powers = simulation['power']
         
         # 确定开始时间：优先使用用户配置的开始时间，否则使用第一个轨迹点的时间
-        if self.config.get('start_time'):
+        if isinstance(self.config.get('start_time'), datetime):
             # 使用用户配置的自定义开始时间
             start_time = self.config['start_time']
-            print(f"✅ TCX生成使用自定义开始时间: {start_time.strftime('%Y-%m-%d %H:%M:%S')}")
-        elif points and len(points) > 0:
-            # 使用第一个轨迹点的时间作为开始时间
-            start_time = points[0]['time']
-            print(f"✅ TCX生成使用GPX文件时间: {start_time.strftime('%Y-%m-%d %H:%M:%S')}")
+            self.log(f"✅ TCX生成使用自定义开始时间: {start_time.strftime('%Y-%m-%d %H:%M:%S')}")
         else:
-            # 如果没有轨迹点，使用当前时间作为默认
-            start_time = datetime.now()
-            print(f"✅ TCX生成使用当前时间: {start_time.strftime('%Y-%m-%d %H:%M:%S')}")
+            # 使用第一个轨迹点的时间作为开始时间（字符串形式的自定义时间已在解析时应用）
+            start_time = track.start_time
+            self.log(f"✅ TCX生成使用GPX文件时间: {start_time.strftime('%Y-%m-%d %H:%M:%S')}")
         
         # 生成Activity ID，使用确定的开始时间
         activity_id = start_time.strftime('%Y-%m-%dT%H:%M:%S.000Z')
@@ -461,21 +1514,23 @@ class GPXToTCXConverter:
         
         # 重新计算时间戳，确保与realistic_total_time一致
         # 使用确定的开始时间作为基准重新分配所有轨迹点的时间
-        if len(points) > 1:
-            time_interval = realistic_total_time / max(1, len(points) - 1)
+        track.start_time = start_time
+        if len(track) > 1:
+            time_interval = realistic_total_time / max(1, len(track) - 1)
             
             # 使用确定的开始时间重新分配所有轨迹点的时间
             # 这确保了无论是自定义开始时间还是GPX文件时间，都能正确应用
-            for i, point in enumerate(points):
-                point['time'] = start_time + timedelta(seconds=i * time_interval)
+            track.offsets = array('d', (i * time_interval for i in range(len(track))))
             
-            print(f"✅ 重新分配轨迹点时间，基于开始时间: {start_time.strftime('%Y-%m-%d %H:%M:%S')}")
-        elif len(points) == 1:
+            self.log(f"✅ 重新分配轨迹点时间，基于开始时间: {start_time.strftime('%Y-%m-%d %H:%M:%S')}")
+        elif len(track) == 1:
             # 只有一个点时，直接使用确定的开始时间
-            points[0]['time'] = start_time
+            track.offsets = array('d', [0.0])
+        
+        cumulative_distance = track.cumulative_distance
         
         # TCX文件头部
-        tcx_content = '''<?xml version="1.0" encoding="UTF-8"?>
+        yield '''<?xml version="1.0" encoding="UTF-8"?>
 <TrainingCenterDatabase
   xsi:schemaLocation="http://www.garmin.com/xmlschemas/TrainingCenterDatabase/v2 http://www.garmin.com/xmlschemas/TrainingCenterDatabasev2.xsd"
   xmlns:ns5="http://www.garmin.com/xmlschemas/ActivityGoals/v1"
@@ -485,7 +1540,14 @@ class GPXToTCXConverter:
   xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xmlns:ns4="http://www.garmin.com/xmlschemas/ProfileExtension/v1">
   <Activities>
     <Activity Sport="{sport}">
-      <Id>{activity_id}</Id>
+      <Id>{activity_id}</Id>'''.format(
+            sport=self.config['activity_type'],
+            activity_id=activity_id
+        )
+        
+        for lap in self.split_laps(track, metrics, speeds, realistic_total_time):
+            # 圈头部（汇总值在输出轨迹点之前即可确定）
+            yield '''
       <Lap StartTime="{start_time}">
         <TotalTimeSeconds>{total_time}</TotalTimeSeconds>
         <DistanceMeters>{total_distance}</DistanceMeters>
@@ -498,68 +1560,47 @@ class GPXToTCXConverter:
           <Value>{max_hr}</Value>
         </MaximumHeartRateBpm>
         <Intensity>Active</Intensity>
-        <TriggerMethod>Manual</TriggerMethod>
+        <TriggerMethod>{trigger}</TriggerMethod>
         <Track>'''.format(
-            sport=self.config['activity_type'],
-            activity_id=activity_id,
-            start_time=start_time.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z',
-            total_time=realistic_total_time,
-            total_distance=metrics['total_distance'],
-            max_speed=metrics['max_speed'],
-            calories=metrics['total_calories'],
-            avg_hr=self.config['base_hr'] + 20,  # 估算平均心率
-            max_hr=self.config['max_hr'] - 10    # 估算最大心率
-        )
-        
-        # 生成轨迹点
-        for i, point in enumerate(points):
-            # 计算瞬时速度（基于相邻点）
-            if i > 0:
-                prev_point = points[i-1]
-                time_diff = (point['time'] - prev_point['time']).total_seconds()
-                distance_diff = point['cumulative_distance'] - prev_point['cumulative_distance']
-                raw_speed = distance_diff / time_diff if time_diff > 0 else 0
+                start_time=track.time_at(lap['start']).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z',
+                total_time=lap['total_time'],
+                total_distance=lap['distance'],
+                max_speed=lap['max_speed'],
+                calories=lap['calories'],
+                avg_hr=self.config['base_hr'] + 20,  # 估算平均心率
+                max_hr=self.config['max_hr'] - 10,   # 估算最大心率
+                trigger=lap['trigger']
+            )
+            
+            # 输出轨迹点的同时在线累计圈汇总数据
+            aggregator = LapAggregator()
+            pending = []
+            
+            for i in range(lap['start'], lap['end']):
+                # 使用共享的压缩速度序列
+                current_speed = speeds[i]
                 
-                # 基于配置的目标配速计算合理的速度范围
-                target_pace = self.config.get('target_pace', '5:30')
-                target_speed = self.parse_target_pace(target_pace)
+                # 批量模拟好的运动指标
+                heart_rate = heart_rates[i]
+                cadence = cadences[i]
+                power = powers[i]
                 
-                # 基于目标速度创建合理的速度范围 (±15%)
-                min_speed = target_speed * 0.85
-                max_speed = target_speed * 1.15
+                if i > 0:
+                    aggregator.add(current_speed, cadence, power)
                 
-                # 对原始速度进行调整，使其接近目标配速
-                if raw_speed > max_speed * 1.5:  # 速度过快时进行压缩
-                    # 压缩到目标范围
-                    current_speed = min_speed + (raw_speed - max_speed * 1.5) / (raw_speed - max_speed * 1.5 + target_speed) * (max_speed - min_speed)
-                elif raw_speed > max_speed:  # 轻微超速时轻微压缩
-                    current_speed = max_speed + (raw_speed - max_speed) * 0.1
-                else:
-                    current_speed = raw_speed
+                # 格式化时间（TCX标准要求UTC时间格式）
+                time_str = track.time_at(i).strftime('%Y-%m-%dT%H:%M:%S.000Z')
                 
-                # 限制在合理的速度范围内
-                current_speed = max(min_speed, min(current_speed, max_speed))
-            else:
-                current_speed = 0
-            
-            # 模拟运动指标
-            heart_rate = self.simulate_heart_rate(current_speed, i, len(points))
-            cadence = self.simulate_cadence(current_speed)
-            power = self.simulate_power(current_speed, heart_rate)
-            
-            # 格式化时间（TCX标准要求UTC时间格式）
-            time_str = point['time'].strftime('%Y-%m-%dT%H:%M:%S.000Z')
-            
-            # 生成轨迹点XML（保留Position字段和所有必要字段）
-            trackpoint_xml = f'''
+                # 生成轨迹点XML（保留Position字段和所有必要字段）
+                trackpoint_xml = f'''
           <Trackpoint>
             <Time>{time_str}</Time>
             <Position>
-              <LatitudeDegrees>{point['lat']}</LatitudeDegrees>
-              <LongitudeDegrees>{point['lon']}</LongitudeDegrees>
+              <LatitudeDegrees>{track.lat[i]}</LatitudeDegrees>
+              <LongitudeDegrees>{track.lon[i]}</LongitudeDegrees>
             </Position>
-            <AltitudeMeters>{point['ele']}</AltitudeMeters>
-            <DistanceMeters>{point['cumulative_distance']}</DistanceMeters>
+            <AltitudeMeters>{track.ele[i]}</AltitudeMeters>
+            <DistanceMeters>{cumulative_distance[i]}</DistanceMeters>
             <HeartRateBpm>
               <Value>{heart_rate}</Value>
             </HeartRateBpm>
@@ -571,71 +1612,33 @@ class GPXToTCXConverter:
               </ns3:TPX>
             </Extensions>
           </Trackpoint>'''
-            
-            tcx_content += trackpoint_xml
-        
-        # 计算汇总统计数据
-        all_cadences = []
-        all_powers = []
-        
-        for i, point in enumerate(points):
-            if i > 0:
-                prev_point = points[i-1]
-                time_diff = (point['time'] - prev_point['time']).total_seconds()
-                distance_diff = point['cumulative_distance'] - prev_point['cumulative_distance']
-                raw_speed = distance_diff / time_diff if time_diff > 0 else 0
-                
-                # 基于配置的目标配速计算合理的速度范围
-                target_pace = self.config.get('target_pace', '5:30')
-                target_speed = self.parse_target_pace(target_pace)
-                
-                # 基于目标速度创建合理的速度范围 (±15%)
-                min_speed = target_speed * 0.85
-                max_speed = target_speed * 1.15
                 
-                # 对原始速度进行调整，使其接近目标配速
-                if raw_speed > max_speed * 1.5:  # 速度过快时进行压缩
-                    current_speed = min_speed + (raw_speed - max_speed * 1.5) / (raw_speed - max_speed * 1.5 + target_speed) * (max_speed - min_speed)
-                elif raw_speed > max_speed:  # 轻微超速时轻微压缩
-                    current_speed = max_speed + (raw_speed - max_speed) * 0.1
-                else:
-                    current_speed = raw_speed
-                
-                # 限制在合理的速度范围内
-                current_speed = max(min_speed, min(current_speed, max_speed))
-                
-                # 收集统计数据
-                cadence = self.simulate_cadence(current_speed)
-                heart_rate = self.simulate_heart_rate(current_speed, i, len(points))
-                power = self.simulate_power(current_speed, heart_rate)
-                
-                if cadence > 0:  # 只统计有效步频
-                    all_cadences.append(cadence)
-                if power > 0:  # 只统计有效功率
-                    all_powers.append(power)
-        
-        # 计算平均值和最大值
-        avg_cadence = int(sum(all_cadences) / len(all_cadences)) if all_cadences else self.config.get('base_cadence', 50)
-        max_cadence = max(all_cadences) if all_cadences else self.config.get('max_cadence', 70)
-        avg_power = int(sum(all_powers) / len(all_powers)) if all_powers else self.config.get('min_power', 150)
-        max_power = max(all_powers) if all_powers else self.config.get('max_power', 300)
-        
-        # 获取子运动类型信息
-        sub_sport = self.config.get('sub_sport', 'Generic')
-        
-        # TCX文件尾部（模拟Garmin设备）
-        tcx_content += f'''
+                pending.append(trackpoint_xml)
+                if len(pending) >= TCX_CHUNK_POINTS:
+                    yield ''.join(pending)
+                    pending = []
+            
+            if pending:
+                yield ''.join(pending)
+            
+            # 圈尾部：使用输出轨迹点时累计的汇总数据
+            summary = aggregator.summary(self.config)
+            avg_speed = lap['avg_speed'] if lap['avg_speed'] is not None else summary['avg_speed']
+            yield f'''
         </Track>
         <Extensions>
           <ns3:LX>
-            <ns3:AvgSpeed>{metrics['avg_speed']:.6f}</ns3:AvgSpeed>
-            <ns3:AvgRunCadence>{avg_cadence}</ns3:AvgRunCadence>
-            <ns3:MaxRunCadence>{max_cadence}</ns3:MaxRunCadence>
-            <ns3:AvgWatts>{avg_power}</ns3:AvgWatts>
-            <ns3:MaxWatts>{max_power}</ns3:MaxWatts>
+            <ns3:AvgSpeed>{avg_speed:.6f}</ns3:AvgSpeed>
+            <ns3:AvgRunCadence>{summary['avg_cadence']}</ns3:AvgRunCadence>
+            <ns3:MaxRunCadence>{summary['max_cadence']}</ns3:MaxRunCadence>
+            <ns3:AvgWatts>{summary['avg_power']}</ns3:AvgWatts>
+            <ns3:MaxWatts>{summary['max_power']}</ns3:MaxWatts>
           </ns3:LX>
         </Extensions>
-      </Lap>
+      </Lap>'''
+        
+        # TCX文件尾部（模拟Garmin设备）
+        yield f'''
       <Creator xsi:type="Device_t">
         <Name>{escape(self.config.get('device_name', 'Forerunner 570'))} - 47mm</Name>
         <UnitId>3605783213</UnitId>
@@ -664,46 +1667,309 @@ class GPXToTCXConverter:
   </Author>
 </TrainingCenterDatabase>'''
         
-        return tcx_content
+    
+    def open_output(self, output_path):
+        """
+        打开TCX输出文件
+        
+        配置compress为True或输出路径以.gz结尾时写入gzip压缩流，
+        压缩随写入逐块进行，不需要先生成完整文档。输出路径为"-"时写入标准输出。
+        
+        Args:
+            output_path (str): 输出文件路径，"-"表示标准输出
+            
+        Returns:
+            文本模式的可写文件对象
+        """
+        if output_path == '-':
+            stream = self.output_stream or sys.stdout
+            if self.config.get('compress'):
+                # GzipFile关闭时不会关闭传入的fileobj，标准输出保持可用
+                stream.flush()
+                raw = gzip.GzipFile(fileobj=stream.buffer, mode='wb',
+                                    compresslevel=GZIP_COMPRESS_LEVEL, mtime=0)
+                return io.TextIOWrapper(raw, encoding='utf-8')
+            return _UnclosedStream(stream)
+        if self.config.get('compress') or output_path.endswith('.gz'):
+            # 固定mtime，保证相同输入生成相同的压缩文件
+            raw = gzip.GzipFile(output_path, mode='wb', compresslevel=GZIP_COMPRESS_LEVEL, mtime=0)
+            return io.TextIOWrapper(raw, encoding='utf-8')
+        return open(output_path, 'w', encoding='utf-8')
     
     def convert(self, gpx_file_path, output_path):
         """
         转换GPX文件为TCX文件
         
         Args:
-            gpx_file_path (str): GPX文件路径
-            output_path (str): 输出TCX文件路径
+            gpx_file_path: GPX文件路径，"-"表示标准输入，也可以是二进制文件对象
+            output_path (str): 输出TCX文件路径，"-"表示标准输出
             
         Returns:
             bool: 转换是否成功
         """
-        print(f"🔄 正在解析GPX文件: {gpx_file_path}")
-        points = self.parse_gpx_file(gpx_file_path)
+        if gpx_file_path == '-':
+            gpx_file_path = sys.stdin.buffer
         
-        if not points:
-            print("❌ GPX文件解析失败或没有轨迹点")
+        prepared = self.prepare(gpx_file_path)
+        if prepared is None:
             return False
-        
-        print(f"🔄 正在计算运动指标...")
-        metrics = self.calculate_metrics(points)
-        
-        print(f"📏 总距离: {metrics['total_distance']:.2f} 米")
-        print(f"⏱️  总时间: {metrics['total_time']:.0f} 秒")
-        print(f"🏃 平均速度: {metrics['avg_speed']:.2f} m/s")
-        print(f"🔥 估算卡路里: {metrics['total_calories']} 卡")
-        
-        print(f"🔄 正在生成TCX文件...")
-        tcx_content = self.generate_tcx_content(points, metrics)
+        track, metrics, simulation = prepared
         
         try:
-            print(f"💾 正在保存到: {output_path}")
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(tcx_content)
-            print("✅ 转换完成！")
+            # 边生成边写入，不在内存中拼接完整的TCX文档
+            self.log(f"🔄 正在生成TCX文件...")
+            self.log(f"💾 正在保存到: {output_path}")
+            with self.stage('serialize', len(track)):
+                with self.open_output(output_path) as f:
+                    self.write_tcx(track, metrics, f, simulation)
+            self.log("✅ 转换完成！")
             return True
         except Exception as e:
-            print(f"❌ 保存文件失败: {e}")
+            self.log(f"❌ 保存文件失败: {e}")
             return False
+    
+    def prepare(self, gpx_file_path):
+        """
+        执行序列化之前的各阶段：解析、重采样、简化、计算指标、模拟数据
+        
+        结果可交给write_tcx写入文件，或交给iter_tcx_chunks直接流式输出。
+        
+        Args:
+            gpx_file_path: GPX文件路径或二进制文件对象
+            
+        Returns:
+            tuple: (轨迹, 运动指标, 模拟数据)，解析失败或没有轨迹点时为None
+        """
+        self.profile = {}
+        self.uses_current_time = False
+        self.log(f"🔄 正在解析GPX文件: {gpx_file_path}")
+        with self.stage('parse') as record:
+            track = self.load_track(gpx_file_path)
+            record['points'] = len(track)
+        
+        if not len(track):
+            self.log("❌ GPX文件解析失败或没有轨迹点")
+            return None
+        
+        if self.config.get('resample_interval', 0) > 0:
+            with self.stage('resample', len(track)):
+                track = self.resample(track)
+        
+        if self.config.get('simplify_tolerance', 0) > 0:
+            with self.stage('simplify', len(track)):
+                track = self.simplify(track)
+        
+        self.log(f"🔄 正在计算运动指标...")
+        with self.stage('metrics', len(track)):
+            metrics = self.calculate_metrics(track)
+        
+        self.log(f"📏 总距离: {metrics['total_distance']:.2f} 米")
+        self.log(f"⏱️  总时间: {metrics['total_time']:.0f} 秒")
+        self.log(f"🏃 平均速度: {metrics['avg_speed']:.2f} m/s")
+        self.log(f"🔥 估算卡路里: {metrics['total_calories']} 卡")
+        
+        self.log(f"🔄 正在模拟心率、步频和功率...")
+        with self.stage('simulate', len(track)):
+            simulation = self.simulate_series(metrics['speeds'])
+        
+        return track, metrics, simulation
+
+
+def collect_batch_inputs(inputs, manifest=None):
+    """
+    收集批量转换的输入文件
+    
+    支持目录（递归查找*.gpx）、通配符和清单文件（每行一个路径，#开头为注释）。
+    每个文件同时返回镜像输出目录结构时使用的根目录：只有一个目录输入时以该目录
+    为根，只有单独的文件时以它们的公共上级目录为根；有多个目录输入或目录与文件
+    混合时，统一以公共上级目录为根，输出路径包含各目录名，不同目录下的同名文件
+    不会写到同一个输出。
+    
+    Args:
+        inputs (list): 文件、目录或通配符
+        manifest (str): 清单文件路径
+        
+    Returns:
+        list: (GPX文件路径, 根目录) 元组列表，已去重并排序
+    """
+    patterns = list(inputs)
+    if manifest:
+        with open(manifest, 'r', encoding='utf-8') as f:
+            patterns.extend(line.strip() for line in f if line.strip() and not line.lstrip().startswith('#'))
+    
+    entries = {}
+    directories = []
+    loose_files = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            root = os.path.abspath(pattern)
+            directories.append(root)
+            for dirpath, _, filenames in os.walk(root):
+                for filename in filenames:
+                    if filename.lower().endswith('.gpx'):
+                        entries.setdefault(os.path.join(dirpath, filename), root)
+        else:
+            matches = glob.glob(pattern, recursive=True) if glob.has_magic(pattern) else [pattern]
+            loose_files.extend(os.path.abspath(path) for path in matches if os.path.isfile(path))
+    
+    anchors = [os.path.dirname(path) for path in loose_files]
+    if loose_files:
+        root = os.path.commonpath(anchors)
+        for path in loose_files:
+            entries.setdefault(path, root)
+    
+    if len(set(directories)) > 1 or (directories and loose_files):
+        # 以目录的上级目录参与计算，输出路径保留目录名
+        root = os.path.commonpath(anchors + [os.path.dirname(directory) for directory in directories])
+        entries = {path: root for path in entries}
+    
+    return sorted(entries.items())
+
+
+def plan_batch(entries, output_dir, compress=False, force=False):
+    """
+    生成批量转换任务，跳过输出比输入新的文件
+    
+    Args:
+        entries (list): collect_batch_inputs的结果
+        output_dir (str): 输出根目录，按输入的相对路径镜像子目录
+        compress (bool): 是否输出.tcx.gz
+        force (bool): 是否忽略已有输出强制重新转换
+        
+    Returns:
+        tuple: (待转换的(输入, 输出)列表, 跳过的文件数)
+        
+    Raises:
+        ValueError: 多个输入对应同一个输出文件（如同目录下的x.gpx和x.GPX）
+    """
+    suffix = '.tcx.gz' if compress else '.tcx'
+    jobs = []
+    skipped = 0
+    planned = {}
+    for input_path, root in entries:
+        relative = os.path.splitext(os.path.relpath(input_path, root))[0] + suffix
+        output_path = os.path.join(output_dir, relative)
+        key = os.path.normcase(os.path.abspath(output_path))
+        if key in planned:
+            raise ValueError(f"{planned[key]} 和 {input_path} 的输出文件相同: {output_path}")
+        planned[key] = input_path
+        if (not force and os.path.exists(output_path)
+                and os.path.getmtime(output_path) >= os.path.getmtime(input_path)):
+            skipped += 1
+            continue
+        jobs.append((input_path, output_path))
+    return jobs, skipped
+
+
+def run_conversion_job(job):
+    """
+    转换单个文件并返回可序列化的结果（顶层函数，可被进程池序列化）
+    
+    供CLI批量模式和Web进程池执行模式在工作进程中调用，不输出进度信息。
+    
+    Args:
+        job (tuple): (输入路径, 输出路径, 配置字典)
+        
+    Returns:
+        dict: input、output、success、points、file_size、profile、uses_current_time、error
+    """
+    input_path, output_path, config = job
+    result = {'input': input_path, 'output': output_path, 'success': False, 'points': 0,
+              'file_size': 0, 'profile': {}, 'uses_current_time': False, 'error': None}
+    try:
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        converter = GPXToTCXConverter(dict(config, quiet=True))
+        result['success'] = converter.convert(input_path, output_path)
+        result['profile'] = converter.profile
+        result['points'] = converter.profile.get('parse', {}).get('points', 0)
+        result['uses_current_time'] = converter.uses_current_time
+        if result['success']:
+            result['file_size'] = os.path.getsize(output_path)
+        else:
+            result['error'] = '转换失败'
+    except Exception as e:
+        result['error'] = str(e)
+    return result
+
+
+def run_batch(jobs, config, workers=1):
+    """
+    批量转换，workers大于1时使用进程池
+    
+    Args:
+        jobs (list): plan_batch生成的(输入, 输出)列表
+        config (dict): 转换器配置
+        workers (int): 并行进程数
+        
+    Yields:
+        dict: 每个文件的转换结果（按完成顺序，慢文件不会阻塞其他文件的进度输出）
+    """
+    payloads = [(input_path, output_path, config) for input_path, output_path in jobs]
+    if workers <= 1 or len(payloads) <= 1:
+        for payload in payloads:
+            yield run_conversion_job(payload)
+        return
+    
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(run_conversion_job, payload) for payload in payloads]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def batch_main(args, config):
+    """
+    批量模式入口
+    
+    Args:
+        args: 命令行参数
+        config (dict): 转换器配置
+        
+    Returns:
+        int: 退出码，有失败文件时为1
+    """
+    entries = collect_batch_inputs(args.gpx_file, args.manifest)
+    if not entries:
+        print("❌ 没有找到GPX文件")
+        return 1
+    
+    try:
+        jobs, skipped = plan_batch(entries, args.output_dir, args.compress, args.force)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    workers = args.jobs or os.cpu_count() or 1
+    
+    print("\n" + "="*50)
+    print("🚀 GPX转TCX批量转换")
+    print("="*50)
+    print(f"📁 输入文件: {len(entries)} 个")
+    print(f"📁 输出目录: {args.output_dir}")
+    print(f"⏭️  已是最新: {skipped} 个")
+    print(f"⚙️  并行进程: {workers}")
+    print("="*50)
+    
+    start = time.perf_counter()
+    converted = 0
+    failed = 0
+    total_points = 0
+    for index, result in enumerate(run_batch(jobs, config, workers), 1):
+        if result['success']:
+            converted += 1
+            total_points += result['points']
+        else:
+            failed += 1
+            print(f"❌ {result['input']}: {result['error']}")
+        if index % 100 == 0 or index == len(jobs):
+            print(f"🔄 进度: {index}/{len(jobs)}")
+    elapsed = time.perf_counter() - start
+    
+    print("\n📊 批量转换完成:")
+    print(f"  成功: {converted} 个, 失败: {failed} 个, 跳过: {skipped} 个")
+    print(f"  耗时: {elapsed:.2f} 秒")
+    if elapsed > 0:
+        print(f"  吞吐: {converted / elapsed:.1f} 文件/秒, {total_points / elapsed:.0f} 点/秒")
+    
+    return 1 if failed else 0
 
 
 def print_usage_examples():
@@ -732,6 +1998,15 @@ def print_usage_examples():
     print("   python3 gpx_to_tcx.py 路径.gpx -o 运动.tcx \\")
     print("     --base-hr 110 --max-hr 180 --activity-type Running \\")
     print("     --start-time 2024-12-25T08:30:00Z --calories-per-km 65")
+    
+    print("\n6. 输出gzip压缩文件（生成 运动.tcx.gz）：")
+    print("   python3 gpx_to_tcx.py 路径.gpx -o 运动.tcx --compress")
+    
+    print("\n7. 批量转换目录，8个进程并行：")
+    print("   python3 gpx_to_tcx.py 轨迹目录/ --output-dir 输出目录/ --jobs 8")
+    
+    print("\n8. 在管道中使用标准输入/输出：")
+    print("   zcat 路径.gpx.gz | python3 gpx_to_tcx.py - -o - --compress > 运动.tcx.gz")
     print("\n" + "="*60)
 
 
@@ -751,8 +2026,9 @@ def main():
         return
     
     # 基本参数
-    parser.add_argument('gpx_file', help='输入的GPX文件路径')
-    parser.add_argument('-o', '--output', default='converted_activity.tcx', help='输出TCX文件路径（默认为converted_activity.tcx）')
+    parser.add_argument('gpx_file', nargs='*', help='输入的GPX文件路径，"-"表示标准输入；批量模式下可以是多个文件、目录或通配符')
+    parser.add_argument('-o', '--output', default=None, help='输出TCX文件路径，"-"表示标准输出（默认为converted_activity.tcx）')
+    parser.add_argument('-q', '--quiet', action='store_true', help='不输出进度信息')
     parser.add_argument('--examples', action='store_true', help='显示使用示例')
     
     # 心率参数
@@ -775,14 +2051,96 @@ def main():
     parser.add_argument('--activity-type', type=str, default='Running', help='运动类型 (默认: Running)')
     parser.add_argument('--device-name', type=str, default='GPX Converter', help='设备名称 (默认: GPX Converter)')
     parser.add_argument('--calories-per-km', type=int, default=60, help='每公里消耗卡路里 (默认: 60)')
+    parser.add_argument('--seed', type=int, help='模拟数据随机种子，相同输入和种子生成相同结果')
+    parser.add_argument('--profile', action='store_true', help='输出各阶段耗时、CPU时间和峰值内存')
+    parser.add_argument('--profile-output', type=str, help='将cProfile统计数据保存到指定文件（可用pstats或snakeviz查看）')
+    parser.add_argument('--compress', action='store_true', help='输出gzip压缩的TCX文件 (.tcx.gz)')
+    parser.add_argument('--auto-lap-distance', type=float, default=0, help='自动分圈距离，单位米 (默认: 0，不分圈)')
+    parser.add_argument('--resample', type=float, default=0, help='按GPX真实时间重采样为固定间隔，单位秒 (默认: 0，不重采样)')
+    parser.add_argument('--simplify', type=float, default=0, help='轨迹简化容差，单位米，总距离误差不超过0.5%% (默认: 0，不简化)')
+    
+    # 批量转换参数
+    parser.add_argument('--manifest', type=str, help='批量模式：包含GPX文件路径的清单文件，每行一个')
+    parser.add_argument('--output-dir', type=str, help='批量模式：输出目录，按输入目录结构镜像保存')
+    parser.add_argument('-j', '--jobs', type=int, default=0, help='批量模式：并行进程数 (默认: CPU核数)')
+    parser.add_argument('--force', action='store_true', help='批量模式：忽略已存在且较新的输出，全部重新转换')
     
     args = parser.parse_args()
     
     # 检查必需参数
-    if not args.gpx_file:
+    if not args.gpx_file and not args.manifest:
         parser.print_help()
         return
     
+    # 构建配置字典
+    config = {
+        'base_hr': args.base_hr,
+        'max_hr': args.max_hr,
+        'hr_factor': args.hr_factor,
+        'base_cadence': args.base_cadence,
+        'max_cadence': args.max_cadence,
+        'cadence_factor': args.cadence_factor,
+        'power_factor': args.power_factor,
+        'min_power': args.min_power,
+        'speed_threshold': args.speed_threshold,
+        'start_time': args.start_time,
+        'activity_type': args.activity_type,
+        'device_name': args.device_name,
+        'calories_per_km': args.calories_per_km,
+        'random_seed': args.seed,
+        'auto_lap_distance': args.auto_lap_distance,
+        'compress': args.compress,
+        'quiet': args.quiet,
+        'simplify_tolerance': args.simplify,
+        'resample_interval': args.resample
+    }
+    
+    # 多个输入、目录、通配符或清单文件时进入批量模式
+    batch_mode = (len(args.gpx_file) != 1 or args.manifest or args.output_dir
+                  or os.path.isdir(args.gpx_file[0]) or glob.has_magic(args.gpx_file[0]))
+    if batch_mode:
+        if args.output is not None:
+            parser.error("批量模式下不能使用 -o/--output，请使用 --output-dir 指定输出目录")
+        args.output_dir = args.output_dir or 'tcx_output'
+    else:
+        args.gpx_file = args.gpx_file[0]
+        args.output = args.output or 'converted_activity.tcx'
+    
+    # 输出到标准输出时，进度信息改写到标准错误；--quiet时不输出
+    data_stream = sys.stdout
+    if args.quiet:
+        status_stream = open(os.devnull, 'w')
+    elif args.output == '-':
+        status_stream = sys.stderr
+    else:
+        status_stream = sys.stdout
+    
+    try:
+        with redirect_stdout(status_stream):
+            if batch_mode:
+                return batch_main(args, config)
+            return single_main(args, config, data_stream)
+    finally:
+        if args.quiet:
+            status_stream.close()
+
+
+def single_main(args, config, data_stream=None):
+    """
+    单文件模式入口
+    
+    Args:
+        args: 命令行参数
+        config (dict): 转换器配置
+        data_stream: 输出为"-"时写入TCX的文本流，默认为sys.stdout
+        
+    Returns:
+        int: 退出码
+    """
+    # 压缩输出统一使用.gz后缀（标准输出除外）
+    if args.compress and args.output != '-' and not args.output.endswith('.gz'):
+        args.output += '.gz'
+    
     # 打印配置信息
     print("\n" + "="*50)
     print("🚀 GPX转TCX工具")
@@ -804,29 +2162,37 @@ def main():
     print(f"  卡路里/公里: {args.calories_per_km}")
     if args.start_time:
         print(f"  开始时间: {args.start_time}")
+    if args.seed is not None:
+        print(f"  随机种子: {args.seed}")
+    if args.auto_lap_distance > 0:
+        print(f"  自动分圈: 每 {args.auto_lap_distance:g} 米")
+    if args.resample > 0:
+        print(f"  重采样: 每 {args.resample:g} 秒")
+    if args.simplify > 0:
+        print(f"  轨迹简化: 容差 {args.simplify:g} 米")
     print("="*50)
     
-    # 构建配置字典
-    config = {
-        'base_hr': args.base_hr,
-        'max_hr': args.max_hr,
-        'hr_factor': args.hr_factor,
-        'base_cadence': args.base_cadence,
-        'max_cadence': args.max_cadence,
-        'cadence_factor': args.cadence_factor,
-        'power_factor': args.power_factor,
-        'min_power': args.min_power,
-        'speed_threshold': args.speed_threshold,
-        'start_time': args.start_time,
-        'activity_type': args.activity_type,
-        'device_name': args.device_name,
-        'calories_per_km': args.calories_per_km
-    }
-    
     # 创建转换器并执行转换
     converter = GPXToTCXConverter(config)
+    converter.output_stream = data_stream
+    profiler = None
+    if args.profile:
+        tracemalloc.start()
+    if args.profile_output:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    
     success = converter.convert(args.gpx_file, args.output)
     
+    if profiler:
+        profiler.disable()
+        profiler.dump_stats(args.profile_output)
+        print(f"\n📊 cProfile统计已保存到: {args.profile_output}")
+    if args.profile:
+        tracemalloc.stop()
+        converter.print_profile()
+    
     if success:
         print(f"\n🎉 成功！TCX文件已保存为: {args.output}")
         print("\n💡 提示：")
@@ -834,7 +2200,7 @@ def main():
         print("   - 如需调整运动数据，请使用相应的命令行参数")
         print("   - 运行 --examples 查看更多使用示例")
     else:
-        print("\n❌ 转换失败，请检查输入文件")
+        print("\n❌ 转换失败，请检查输入文件", file=sys.stderr)
         return 1
     
     return 0
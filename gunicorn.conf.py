@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+"""
+Gunicorn配置
+
+每个CPU核一个工作进程，每个进程若干线程处理上传、状态轮询等I/O请求。
+可通过环境变量覆盖：PORT、WEB_CONCURRENCY（进程数）、GUNICORN_THREADS（每进程线程数）。
+多进程部署时任务状态保存在共享的SQLite任务存储中（TASK_STORE=sqlite）。
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8080')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_class = 'gthread'
+
+# 大文件上传和转换可能较慢
+timeout = 120
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('LOG_LEVEL', 'info')
+
+# 每个工作进程各自导入wsgi.py，由create_app()启动本进程的心跳、清理和采样线程。
+# 不要开启预加载：否则这些线程会在不处理请求的主进程中运行，主进程也会登记心跳
+preload_app = False
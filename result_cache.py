@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+转换结果缓存
+============
+
+以GPX内容和转换配置的哈希为键，在磁盘上保存转换结果。相同路线、相同设置
+再次上传时直接复用已有结果，不再重新转换。
+
+- 缓存键: sha256(缓存版本 + 规范化后的GPX内容 + 排序后的配置JSON)
+- 随机种子由缓存键派生，保证同一键的模拟数据可复现
+- 按文件修改时间做LRU淘汰，命中时刷新修改时间，总大小不超过上限
+- 只依赖文件系统状态，多个进程可以共享同一个缓存目录
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+
+# 计算GPX摘要时每次读取的字节数
+DIGEST_CHUNK_SIZE = 1024 * 1024
+
+# 缓存格式和转换器输出版本：转换结果（TCX内容、模拟算法、默认配置等）发生变化时
+# 必须加1，旧版本的缓存键不再命中，旧文件按LRU自然淘汰
+CACHE_VERSION = 1
+
+
+def gpx_digest(stream):
+    """
+    计算GPX内容摘要，换行符统一为LF并忽略首尾空白
+
+    Args:
+        stream: 可seek的二进制文件对象，读取后重置到开头
+
+    Returns:
+        str: 十六进制sha256摘要
+    """
+    digest = hashlib.sha256()
+    stream.seek(0)
+    pending = b''
+    started = False
+    whitespace = b''
+    while True:
+        chunk = stream.read(DIGEST_CHUNK_SIZE)
+        if not chunk:
+            break
+        # 块末尾的\r可能与下一块开头的\n组成CRLF，留到下一块处理
+        data = pending + chunk
+        if data.endswith(b'\r'):
+            data, pending = data[:-1], b'\r'
+        else:
+            pending = b''
+        data = data.replace(b'\r\n', b'\n')
+        if not started:
+            data = data.lstrip()
+            started = bool(data)
+        # 末尾空白暂存，后面还有内容时再计入
+        stripped = data.rstrip()
+        if stripped:
+            digest.update(whitespace + stripped)
+            whitespace = data[len(stripped):]
+        else:
+            whitespace += data
+    stream.seek(0)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """磁盘上按总大小做LRU淘汰的转换结果缓存"""
+
+    def __init__(self, directory, max_bytes, suffix='.tcx'):
+        """
+        Args:
+            directory (str): 缓存目录
+            max_bytes (int): 缓存文件总大小上限，0表示禁用缓存
+            suffix (str): 缓存文件后缀（与输出文件格式一致，如.tcx.gz）
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    @staticmethod
+    def make_key(digest, config):
+        """
+        由GPX摘要和转换配置生成缓存键
+
+        Args:
+            digest (str): gpx_digest的结果
+            config (dict): sanitize_config处理后的任务配置
+
+        Returns:
+            str: 十六进制sha256缓存键
+        """
+        payload = json.dumps(config, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(f'v{CACHE_VERSION}\n{digest}\n{payload}'.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def seed_for(key):
+        """由缓存键派生模拟数据的随机种子"""
+        return int(key[:8], 16)
+
+    def path_for(self, key):
+        return os.path.join(self.directory, key + self.suffix)
+
+    def fetch(self, key, destination):
+        """
+        缓存命中时把结果链接（不支持时复制）到destination
+
+        Returns:
+            bool: 是否命中
+        """
+        path = self.path_for(key)
+        try:
+            # 刷新修改时间，作为LRU的最近使用时间
+            os.utime(path)
+            _link_or_copy(path, destination)
+        except FileNotFoundError:
+            with self.lock:
+                self.misses += 1
+            return False
+        with self.lock:
+            self.hits += 1
+        return True
+
+    def store(self, key, source):
+        """保存转换结果，并淘汰最久未使用的缓存直到总大小不超过上限"""
+        if not self.enabled:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        # 先写临时文件再原子替换，其他进程不会读到不完整的结果
+        temp_path = os.path.join(self.directory, f'.{uuid.uuid4().hex}.tmp')
+        try:
+            _link_or_copy(source, temp_path)
+            os.replace(temp_path, self.path_for(key))
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        self.evict(keep=key)
+
+    def evict(self, keep=None):
+        """
+        按修改时间从旧到新删除缓存文件，直到总大小不超过上限
+
+        Returns:
+            int: 删除的文件数
+        """
+        keep_path = self.path_for(keep) if keep else None
+        with self.lock:
+            entries = []
+            total = 0
+            with os.scandir(self.directory) as scanner:
+                for entry in scanner:
+                    if not entry.name.endswith(self.suffix) or not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, entry.path, stat.st_size))
+                    total += stat.st_size
+
+            removed = 0
+            for _, path, size in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if path == keep_path:
+                    continue
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                removed += 1
+            return removed
+
+    def size(self):
+        """当前缓存文件总大小（字节）"""
+        if not os.path.isdir(self.directory):
+            return 0
+        with os.scandir(self.directory) as scanner:
+            return sum(entry.stat().st_size for entry in scanner
+                       if entry.name.endswith(self.suffix) and entry.is_file())
+
+
+def _link_or_copy(source, destination):
+    """创建硬链接，文件系统不支持时复制"""
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copyfile(source, destination)
@@ -34,4 +34,4 @@ echo "🌐 启动Web应用..."
 echo "访问地址: http://localhost:8080"
 echo "按 Ctrl+C 停止应用"
 echo ""
-python3 web_app.py
\ No newline at end of file
+exec gunicorn -c gunicorn.conf.py wsgi:app
\ No newline at end of file
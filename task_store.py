@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+转换任务存储
+============
+
+提供两种可互换的任务存储，接口与dict相近（get、pop、items、len等）：
+
+- MemoryTaskStore: 保存在当前进程内存中，重启后丢失
+- SQLiteTaskStore: 保存在SQLite数据库中（WAL模式），多进程部署和重启后仍可查询
+- LazyTaskStore: 首次使用时才按配置创建上述存储，导入模块时不会创建数据库文件
+
+任务对象需要实现 to_record() 和类方法 from_record(record)，并带有owner属性
+（创建任务的工作进程标识）。SQLite存储同时记录各工作进程的心跳，进程退出后
+遗留的未完成任务可以由其他进程接管。
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+# 停止心跳的工作进程记录保留时间（秒）
+WORKER_RECORD_SECONDS = 24 * 3600
+
+
+class MemoryTaskStore:
+    """进程内存任务存储"""
+
+    # 任务只来自当前进程，清理时由进程内的过期索引覆盖，不需要再按时间扫描存储
+    shared = False
+
+    def __init__(self):
+        self._tasks = {}
+        self._lock = threading.Lock()
+
+    def save(self, task):
+        """保存新任务，之后task.update()的修改会写回本存储"""
+        task.store = self
+        with self._lock:
+            self._tasks[task.task_id] = task
+
+    def update(self, task_id, changes):
+        """
+        修改已保存任务的字段，任务已被删除时不做任何事
+
+        Returns:
+            bool: 任务是否存在
+        """
+        with self._lock:
+            task = self._tasks.get(task_id)
+            if task is None:
+                return False
+            for name, value in changes.items():
+                setattr(task, name, value)
+            return True
+
+    def get(self, task_id, default=None):
+        with self._lock:
+            return self._tasks.get(task_id, default)
+
+    def pop(self, task_id, default=None):
+        with self._lock:
+            return self._tasks.pop(task_id, default)
+
+    def values(self):
+        with self._lock:
+            return list(self._tasks.values())
+
+    def items(self):
+        with self._lock:
+            return list(self._tasks.items())
+
+    def created_before(self, cutoff):
+        """返回创建时间早于cutoff的任务（线性扫描，定时清理不使用）"""
+        return [task for task in self.values() if task.created_at < cutoff]
+
+    def count_by_status(self, statuses):
+        """统计状态属于statuses的任务数"""
+        return sum(1 for task in self.values() if task.status in statuses)
+
+    def heartbeat(self, owner):
+        """内存存储只属于当前进程，不需要心跳"""
+
+    def orphaned(self, statuses, stale_after):
+        """内存存储中的任务都属于当前进程，不会有遗留任务"""
+        return []
+
+    def claim(self, task_id, expected_owner, owner):
+        task = self.get(task_id)
+        if task is None or task.owner != expected_owner:
+            return False
+        task.owner = owner
+        return True
+
+    def __setitem__(self, task_id, task):
+        self.save(task)
+
+    def __getitem__(self, task_id):
+        task = self.get(task_id)
+        if task is None:
+            raise KeyError(task_id)
+        return task
+
+    def __delitem__(self, task_id):
+        if self.pop(task_id) is None:
+            raise KeyError(task_id)
+
+    def __contains__(self, task_id):
+        return self.get(task_id) is not None
+
+    def __len__(self):
+        with self._lock:
+            return len(self._tasks)
+
+
+class SQLiteTaskStore:
+    """
+    SQLite任务存储
+
+    使用WAL模式，读写互不阻塞，多个进程可以同时访问同一个数据库文件。
+    task_id为主键，created_at和status建有索引，按ID查询、按时间清理和
+    查找遗留任务都走索引。每个线程使用独立的连接。新任务用INSERT写入，
+    之后的修改按字段UPDATE，多个进程同时修改同一任务时互不覆盖。
+    """
+
+    # 包含其他进程和重启前创建的任务，清理时需按created_at索引查询
+    shared = True
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS tasks (
+            task_id TEXT PRIMARY KEY,
+            input_file TEXT,
+            output_file TEXT,
+            config TEXT,
+            status TEXT NOT NULL,
+            progress INTEGER NOT NULL DEFAULT 0,
+            message TEXT,
+            error TEXT,
+            created_at TEXT NOT NULL,
+            completed_at TEXT,
+            profile TEXT,
+            queue_seq INTEGER,
+            owner TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_tasks_created_at ON tasks (created_at);
+        CREATE TABLE IF NOT EXISTS workers (
+            owner TEXT PRIMARY KEY,
+            heartbeat_at REAL NOT NULL
+        );
+    """
+
+    # 旧版本数据库缺少的列
+    MIGRATIONS = (('owner', 'ALTER TABLE tasks ADD COLUMN owner TEXT'),)
+
+    COLUMNS = ('task_id', 'input_file', 'output_file', 'config', 'status', 'progress', 'message',
+               'error', 'created_at', 'completed_at', 'profile', 'queue_seq', 'owner')
+
+    def __init__(self, db_path, task_class):
+        """
+        初始化存储并创建表结构
+
+        Args:
+            db_path (str): 数据库文件路径
+            task_class: 任务类，需实现to_record()和from_record(record)
+        """
+        self.db_path = db_path
+        self.task_class = task_class
+        self._local = threading.local()
+        connection = self._connection()
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.executescript(self.SCHEMA)
+        existing = {row['name'] for row in connection.execute('PRAGMA table_info(tasks)')}
+        for column, statement in self.MIGRATIONS:
+            if column not in existing:
+                connection.execute(statement)
+        connection.execute('CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status)')
+
+    def _connection(self):
+        """返回当前线程的数据库连接（fork后的子进程重新连接，不复用父进程的连接）"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            # isolation_level=None：每条语句自动提交，避免长事务阻塞其他进程
+            connection = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    @staticmethod
+    def _encode(column, value):
+        """把任务字段转换为数据库中保存的值"""
+        if value is None:
+            return None
+        if column in ('config', 'profile'):
+            return json.dumps(value, ensure_ascii=False)
+        if column in ('created_at', 'completed_at'):
+            return value.isoformat(timespec='microseconds')
+        return value
+
+    def _to_row(self, task):
+        record = task.to_record()
+        return tuple(self._encode(column, record[column]) for column in self.COLUMNS)
+
+    def _from_row(self, row):
+        record = dict(row)
+        record['config'] = json.loads(record['config']) if record['config'] else {}
+        record['profile'] = json.loads(record['profile']) if record['profile'] else None
+        record['created_at'] = datetime.fromisoformat(record['created_at'])
+        if record['completed_at']:
+            record['completed_at'] = datetime.fromisoformat(record['completed_at'])
+        task = self.task_class.from_record(record)
+        task.store = self
+        return task
+
+    def save(self, task):
+        """插入新任务，之后task.update()的修改会写回本存储"""
+        task.store = self
+        placeholders = ', '.join('?' for _ in self.COLUMNS)
+        self._connection().execute(
+            f"INSERT INTO tasks ({', '.join(self.COLUMNS)}) VALUES ({placeholders})",
+            self._to_row(task)
+        )
+
+    def update(self, task_id, changes):
+        """
+        只更新changes中的字段，不覆盖其他进程同时写入的其他字段
+
+        任务已被清理删除时不做任何事，不会重新插入。
+
+        Args:
+            task_id (str): 任务ID
+            changes (dict): 字段名到新值的映射
+
+        Returns:
+            bool: 任务是否存在
+        """
+        unknown = set(changes) - set(self.COLUMNS)
+        if unknown or 'task_id' in changes:
+            raise ValueError(f"不能更新的任务字段: {sorted(unknown or ['task_id'])}")
+        if not changes:
+            return task_id in self
+        assignments = ', '.join(f'{column} = ?' for column in changes)
+        values = [self._encode(column, value) for column, value in changes.items()]
+        cursor = self._connection().execute(
+            f'UPDATE tasks SET {assignments} WHERE task_id = ?', values + [task_id]
+        )
+        return cursor.rowcount == 1
+
+    def get(self, task_id, default=None):
+        row = self._connection().execute('SELECT * FROM tasks WHERE task_id = ?', (task_id,)).fetchone()
+        return self._from_row(row) if row else default
+
+    def pop(self, task_id, default=None):
+        task = self.get(task_id)
+        if task is None:
+            return default
+        self._connection().execute('DELETE FROM tasks WHERE task_id = ?', (task_id,))
+        return task
+
+    def values(self):
+        rows = self._connection().execute('SELECT * FROM tasks ORDER BY created_at').fetchall()
+        return [self._from_row(row) for row in rows]
+
+    def items(self):
+        return [(task.task_id, task) for task in self.values()]
+
+    def created_before(self, cutoff):
+        """返回创建时间早于cutoff的任务（走created_at索引）"""
+        rows = self._connection().execute(
+            'SELECT * FROM tasks WHERE created_at < ? ORDER BY created_at',
+            (cutoff.isoformat(timespec='microseconds'),)
+        ).fetchall()
+        return [self._from_row(row) for row in rows]
+
+    def count_by_status(self, statuses):
+        """统计状态属于statuses的任务数"""
+        statuses = list(statuses)
+        placeholders = ', '.join('?' for _ in statuses)
+        row = self._connection().execute(
+            f'SELECT COUNT(*) FROM tasks WHERE status IN ({placeholders})', statuses
+        ).fetchone()
+        return row[0]
+
+    def heartbeat(self, owner):
+        """记录工作进程仍在运行"""
+        self._connection().execute('INSERT OR REPLACE INTO workers (owner, heartbeat_at) VALUES (?, ?)',
+                                   (owner, time.time()))
+
+    def orphaned(self, statuses, stale_after):
+        """
+        返回所属工作进程已停止心跳的未完成任务
+
+        Args:
+            statuses (list): 需要检查的任务状态
+            stale_after (float): 超过该秒数没有心跳的进程视为已退出
+
+        Returns:
+            list: 遗留任务
+        """
+        statuses = list(statuses)
+        placeholders = ', '.join('?' for _ in statuses)
+        cutoff = time.time() - stale_after
+        connection = self._connection()
+        rows = connection.execute(
+            f'SELECT * FROM tasks WHERE status IN ({placeholders}) AND (owner IS NULL OR owner NOT IN '
+            f'(SELECT owner FROM workers WHERE heartbeat_at >= ?)) ORDER BY created_at',
+            statuses + [cutoff]
+        ).fetchall()
+        # 一天以上没有心跳的进程记录不再需要
+        connection.execute('DELETE FROM workers WHERE heartbeat_at < ?', (cutoff - WORKER_RECORD_SECONDS,))
+        return [self._from_row(row) for row in rows]
+
+    def claim(self, task_id, expected_owner, owner):
+        """
+        原子地把任务转给owner，多个进程同时接管同一任务时只有一个成功
+
+        Returns:
+            bool: 是否接管成功
+        """
+        cursor = self._connection().execute(
+            'UPDATE tasks SET owner = ? WHERE task_id = ? AND owner IS ?', (owner, task_id, expected_owner)
+        )
+        return cursor.rowcount == 1
+
+    def __setitem__(self, task_id, task):
+        self.save(task)
+
+    def __getitem__(self, task_id):
+        task = self.get(task_id)
+        if task is None:
+            raise KeyError(task_id)
+        return task
+
+    def __delitem__(self, task_id):
+        cursor = self._connection().execute('DELETE FROM tasks WHERE task_id = ?', (task_id,))
+        if cursor.rowcount == 0:
+            raise KeyError(task_id)
+
+    def __contains__(self, task_id):
+        row = self._connection().execute('SELECT 1 FROM tasks WHERE task_id = ?', (task_id,)).fetchone()
+        return row is not None
+
+    def __len__(self):
+        return self._connection().execute('SELECT COUNT(*) FROM tasks').fetchone()[0]
+
+
+def create_task_store(kind, db_path, task_class):
+    """
+    按配置创建任务存储
+
+    Args:
+        kind (str): 'sqlite' 或 'memory'
+        db_path (str): SQLite数据库文件路径
+        task_class: 任务类
+
+    Returns:
+        MemoryTaskStore或SQLiteTaskStore
+    """
+    if kind == 'memory':
+        return MemoryTaskStore()
+    if kind == 'sqlite':
+        return SQLiteTaskStore(db_path, task_class)
+    raise ValueError(f"未知的任务存储类型: {kind}")
+
+
+class LazyTaskStore:
+    """
+    延迟创建的任务存储
+
+    首次访问时才调用create_task_store，之后所有操作转发给实际的存储。
+    """
+
+    def __init__(self, kind, db_path, task_class):
+        self.kind = kind
+        self.db_path = db_path
+        self.task_class = task_class
+        self._store = None
+        self._lock = threading.Lock()
+
+    def open(self):
+        """创建（仅首次）并返回实际的任务存储"""
+        with self._lock:
+            if self._store is None:
+                self._store = create_task_store(self.kind, self.db_path, self.task_class)
+            return self._store
+
+    @property
+    def is_open(self):
+        return self._store is not None
+
+    def __getattr__(self, name):
+        return getattr(self.open(), name)
+
+    def __setitem__(self, task_id, task):
+        self.open()[task_id] = task
+
+    def __getitem__(self, task_id):
+        return self.open()[task_id]
+
+    def __delitem__(self, task_id):
+        del self.open()[task_id]
+
+    def __contains__(self, task_id):
+        return task_id in self.open()
+
+    def __len__(self):
+        return len(self.open())
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试命令行批量转换
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from benchmark_pipeline import write_synthetic_gpx
+from gpx_to_tcx import collect_batch_inputs, plan_batch, run_batch
+
+
+def _make_tree(root):
+    """在root下创建 a/b/x.gpx、a/y.gpx、top.gpx 和一个非GPX文件"""
+    for relative in ['a/b/x.gpx', 'a/y.gpx', 'top.gpx']:
+        path = os.path.join(root, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        shutil.copy("测试轨迹.gpx", path)
+    with open(os.path.join(root, 'a', 'notes.txt'), 'w') as f:
+        f.write('not a track')
+
+
+def test_collect_inputs():
+    """目录、通配符和清单文件都能得到相同的镜像根目录"""
+    print("🧪 测试输入收集...")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source = os.path.join(tmpdir, 'in')
+        _make_tree(source)
+        source = os.path.abspath(source)
+
+        from_dir = collect_batch_inputs([source])
+        assert [os.path.relpath(path, root) for path, root in from_dir] == \
+            [os.path.join('a', 'b', 'x.gpx'), os.path.join('a', 'y.gpx'), 'top.gpx']
+
+        from_glob = collect_batch_inputs([os.path.join(source, '**', '*.gpx')])
+        assert from_glob == from_dir
+
+        manifest = os.path.join(tmpdir, 'manifest.txt')
+        with open(manifest, 'w', encoding='utf-8') as f:
+            f.write('# 注释\n')
+            for path, _ in from_dir:
+                f.write(path + '\n')
+        assert collect_batch_inputs([], manifest) == from_dir
+    print("✅ 输入收集正确")
+
+
+def test_batch_converts_and_skips_up_to_date():
+    """批量转换写入镜像目录，再次运行时跳过已是最新的文件"""
+    print("🧪 测试批量转换和增量跳过...")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source = os.path.join(tmpdir, 'in')
+        output_dir = os.path.join(tmpdir, 'out')
+        _make_tree(source)
+
+        entries = collect_batch_inputs([source])
+        jobs, skipped = plan_batch(entries, output_dir, compress=True)
+        assert skipped == 0 and len(jobs) == 3
+
+        results = list(run_batch(jobs, {'random_seed': 1}, workers=2))
+        assert all(result['success'] for result in results)
+        assert sum(result['points'] for result in results) == 30
+        assert os.path.exists(os.path.join(output_dir, 'a', 'b', 'x.tcx.gz'))
+        assert os.path.exists(os.path.join(output_dir, 'top.tcx.gz'))
+
+        jobs, skipped = plan_batch(entries, output_dir, compress=True)
+        assert jobs == [] and skipped == 3
+
+        # 输入更新后重新转换
+        touched = os.path.join(source, 'a', 'y.gpx')
+        newer = os.path.getmtime(os.path.join(output_dir, 'a', 'y.tcx.gz')) + 10
+        os.utime(touched, (newer, newer))
+        jobs, skipped = plan_batch(entries, output_dir, compress=True)
+        assert [job[0] for job in jobs] == [os.path.abspath(touched)] and skipped == 2
+
+        jobs, skipped = plan_batch(entries, output_dir, compress=True, force=True)
+        assert len(jobs) == 3 and skipped == 0
+    print("✅ 批量转换和增量跳过正确")
+
+
+def test_same_name_in_two_directories():
+    """不同目录下的同名文件输出到各自的子目录，输出冲突时报错"""
+    print("🧪 测试同名输入...")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for name in ('a', 'b'):
+            os.makedirs(os.path.join(tmpdir, name))
+            shutil.copy("测试轨迹.gpx", os.path.join(tmpdir, name, 'x.gpx'))
+        output_dir = os.path.join(tmpdir, 'out')
+
+        entries = collect_batch_inputs([os.path.join(tmpdir, 'a'), os.path.join(tmpdir, 'b')])
+        jobs, _ = plan_batch(entries, output_dir)
+        assert sorted(output for _, output in jobs) == [os.path.join(output_dir, 'a', 'x.tcx'),
+                                                        os.path.join(output_dir, 'b', 'x.tcx')]
+
+        # 单个目录仍以该目录为根
+        entries = collect_batch_inputs([os.path.join(tmpdir, 'a')])
+        assert plan_batch(entries, output_dir)[0][0][1] == os.path.join(output_dir, 'x.tcx')
+
+        # 仍然冲突时（如扩展名大小写不同）拒绝执行
+        shutil.copy("测试轨迹.gpx", os.path.join(tmpdir, 'a', 'x.GPX'))
+        entries = collect_batch_inputs([os.path.join(tmpdir, 'a')])
+        try:
+            plan_batch(entries, output_dir)
+        except ValueError as e:
+            assert 'x.tcx' in str(e)
+        else:
+            raise AssertionError("输出冲突时应报错")
+    print("✅ 同名输入不会互相覆盖")
+
+
+def test_failed_file_is_reported():
+    """单个文件失败不影响其他文件"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        missing = os.path.join(tmpdir, 'missing.gpx')
+        good = os.path.join(tmpdir, 'good.gpx')
+        shutil.copy("测试轨迹.gpx", good)
+        jobs = [(missing, os.path.join(tmpdir, 'missing.tcx')), (good, os.path.join(tmpdir, 'good.tcx'))]
+        results = list(run_batch(jobs, {}, workers=1))
+        assert [result['success'] for result in results] == [False, True]
+        assert results[0]['error']
+
+
+def test_results_arrive_in_completion_order():
+    """排在前面的大文件不阻塞后面小文件的结果"""
+    print("🧪 测试按完成顺序返回结果...")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        large = os.path.join(tmpdir, 'large.gpx')
+        small = os.path.join(tmpdir, 'small.gpx')
+        write_synthetic_gpx(large, 50000)
+        shutil.copy("测试轨迹.gpx", small)
+        jobs = [(large, os.path.join(tmpdir, 'large.tcx')), (small, os.path.join(tmpdir, 'small.tcx'))]
+        results = list(run_batch(jobs, {}, workers=2))
+        assert [os.path.basename(result['input']) for result in results] == ['small.gpx', 'large.gpx']
+    print("✅ 小文件先返回")
+
+
+def test_output_option_rejected_in_batch_mode():
+    """批量模式下指定-o时报错退出，而不是静默忽略"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        result = subprocess.run([sys.executable, 'gpx_to_tcx.py', "测试轨迹.gpx", "测试轨迹.gpx",
+                                 '-o', os.path.join(tmpdir, 'out.tcx'), '--output-dir', tmpdir],
+                                capture_output=True, text=True)
+        assert result.returncode == 2
+        assert '--output-dir' in result.stderr
+        assert os.listdir(tmpdir) == []
+
+
+if __name__ == '__main__':
+    test_collect_inputs()
+    test_batch_converts_and_skips_up_to_date()
+    test_same_name_in_two_directories()
+    test_failed_file_is_reported()
+    test_results_arrive_in_completion_order()
+    test_output_option_rejected_in_batch_mode()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试分阶段性能基准脚本
+"""
+
+from benchmark_pipeline import STAGES, run_benchmarks, compare_reports
+
+
+def test_small_run_reports_all_stages():
+    """小规模运行生成所有阶段的计时"""
+    print("🧪 运行小规模基准测试...")
+    report = run_benchmarks([300], repeat=1)
+    result = report['results']['300']
+    assert result['points'] == 300
+    assert result['tcx_chars'] > 300 * 400
+    for stage in STAGES:
+        assert result[stage] > 0
+    print("✅ 所有阶段均已计时")
+
+
+def test_regression_detection():
+    """超过阈值且超过噪声下限才判定为退化"""
+    print("🧪 测试基线比较...")
+    baseline = {'results': {'1000': {stage: 0.1 for stage in STAGES}}}
+    current = {'results': {'1000': {stage: 0.1 for stage in STAGES}}}
+    assert compare_reports(current, baseline, 0.25) == []
+
+    current['results']['1000']['write_tcx'] = 0.2
+    current['results']['1000']['parse_gpx_file'] = 0.11
+    regressions = compare_reports(current, baseline, 0.25)
+    assert regressions == [('1000', 'write_tcx', 0.1, 0.2)]
+
+    # 微小耗时的相对波动视为噪声
+    tiny = {'results': {'1000': {stage: 0.001 for stage in STAGES}}}
+    noisy = {'results': {'1000': {stage: 0.003 for stage in STAGES}}}
+    assert compare_reports(noisy, tiny, 0.25) == []
+
+    # 基线中没有的规模不参与比较
+    assert compare_reports({'results': {'5000': current['results']['1000']}}, baseline, 0.25) == []
+    print("✅ 退化判定正确")
+
+
+if __name__ == '__main__':
+    test_small_run_reports_all_stages()
+    test_regression_detection()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试按过期时间索引的清理
+"""
+
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from task_store import MemoryTaskStore
+import web_app
+
+
+def test_expiry_index_pops_only_due_entries():
+    """只弹出已到期的条目，按过期时间顺序"""
+    print("🧪 测试过期索引...")
+    index = web_app.ExpiryIndex()
+    index.add(300, ['c'])
+    index.add(100, ['a'], 'task-a')
+    index.add(200, ['b'])
+    assert index.pop_due(50) == []
+    assert index.pop_due(200) == [('task-a', ('a',)), (None, ('b',))]
+    assert len(index) == 1
+    print("✅ 只处理到期条目")
+
+
+def test_cleanup_removes_expired_tasks_and_files():
+    """过期任务的文件和记录被删除，未过期的不动，启动时扫描到的旧文件也会清理"""
+    print("🧪 测试清理...")
+    saved_index = web_app.file_expiry
+    saved_folders = (web_app.UPLOAD_FOLDER, web_app.OUTPUT_FOLDER)
+    web_app.file_expiry = web_app.ExpiryIndex()
+    task_ids = ['cleanup-old', 'cleanup-new']
+    with tempfile.TemporaryDirectory() as tmpdir:
+        web_app.UPLOAD_FOLDER = os.path.join(tmpdir, 'uploads')
+        web_app.OUTPUT_FOLDER = os.path.join(tmpdir, 'outputs')
+        try:
+            os.makedirs(web_app.UPLOAD_FOLDER)
+            os.makedirs(web_app.OUTPUT_FOLDER)
+
+            def touch(path, age_hours=0):
+                with open(path, 'w') as f:
+                    f.write('x')
+                mtime = time.time() - age_hours * 3600
+                os.utime(path, (mtime, mtime))
+                return path
+
+            # 重启前遗留的文件
+            orphan = touch(os.path.join(web_app.OUTPUT_FOLDER, 'orphan.tcx'), 48)
+            recent = touch(os.path.join(web_app.OUTPUT_FOLDER, 'recent.tcx'), 1)
+            assert web_app.index_existing_files() == 2
+
+            tasks = {}
+            for task_id, age in zip(task_ids, (30, 1)):
+                task = web_app.ConversionTask(task_id, touch(os.path.join(web_app.UPLOAD_FOLDER, f'{task_id}.gpx')),
+                                              touch(os.path.join(web_app.OUTPUT_FOLDER, f'{task_id}.tcx')), {})
+                task.created_at = datetime.now() - timedelta(hours=age)
+                web_app.conversion_tasks[task_id] = task
+                web_app.register_task_files(task)
+                tasks[task_id] = task
+
+            assert web_app.cleanup_old_files() == (3, 1)
+            assert not os.path.exists(orphan) and os.path.exists(recent)
+            assert 'cleanup-old' not in web_app.conversion_tasks
+            assert 'cleanup-new' in web_app.conversion_tasks
+            assert os.path.exists(tasks['cleanup-new'].output_file)
+            assert len(web_app.file_expiry) == 2
+            assert web_app.cleanup_old_files() == (0, 0)
+        finally:
+            web_app.file_expiry = saved_index
+            web_app.UPLOAD_FOLDER, web_app.OUTPUT_FOLDER = saved_folders
+            for task_id in task_ids:
+                web_app.conversion_tasks.pop(task_id, None)
+    print("✅ 过期任务和文件已清理")
+
+
+def test_memory_store_cleanup_uses_only_expiry_index():
+    """内存存储不按时间扫描全部任务，过期任务由过期索引清理"""
+    print("🧪 测试内存存储清理...")
+    saved_index = web_app.file_expiry
+    saved_tasks = web_app.conversion_tasks
+    store = MemoryTaskStore()
+
+    def scan(cutoff):
+        raise AssertionError("内存存储不应扫描全部任务")
+
+    store.created_before = scan
+    web_app.file_expiry = web_app.ExpiryIndex()
+    web_app.conversion_tasks = store
+    try:
+        for task_id, age in (('memory-old', 30), ('memory-new', 1)):
+            task = web_app.ConversionTask(task_id, None, None, {})
+            task.created_at = datetime.now() - timedelta(hours=age)
+            store.save(task)
+            web_app.file_expiry.add((task.created_at + timedelta(hours=web_app.APP_CONFIG['FILE_RETENTION_HOURS']))
+                                    .timestamp(), [], task_id)
+
+        assert web_app.cleanup_old_files() == (0, 1)
+        assert 'memory-old' not in store and 'memory-new' in store
+    finally:
+        web_app.file_expiry = saved_index
+        web_app.conversion_tasks = saved_tasks
+    print("✅ 只处理过期索引中的任务")
+
+
+if __name__ == '__main__':
+    test_expiry_index_pops_only_due_entries()
+    test_cleanup_removes_expired_tasks_and_files()
+    test_memory_store_cleanup_uses_only_expiry_index()
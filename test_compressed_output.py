@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试gzip压缩的TCX输出及Web下载
+"""
+
+import gzip
+import os
+import tempfile
+from gpx_to_tcx import GPXToTCXConverter
+
+
+def _convert(output_path, config=None):
+    converter = GPXToTCXConverter(dict({'random_seed': 21}, **(config or {})))
+    assert converter.convert("测试轨迹.gpx", output_path)
+
+
+def test_gzip_output_matches_plain():
+    """压缩输出解压后与普通输出一致，且相同输入生成相同压缩文件"""
+    print("🧪 测试压缩输出...")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        plain = os.path.join(tmpdir, 'a.tcx')
+        compressed = os.path.join(tmpdir, 'a.tcx.gz')
+        flagged = os.path.join(tmpdir, 'b.tcx')
+        _convert(plain)
+        _convert(compressed)
+        _convert(flagged, {'compress': True})
+
+        with open(plain, 'rb') as f:
+            expected = f.read()
+        with gzip.open(compressed, 'rb') as f:
+            assert f.read() == expected
+        with gzip.open(flagged, 'rb') as f:
+            assert f.read() == expected
+        with open(compressed, 'rb') as f:
+            first = f.read()
+        _convert(compressed)
+        with open(compressed, 'rb') as f:
+            assert f.read() == first
+        print(f"✅ {len(expected)} 字节 -> {os.path.getsize(compressed)} 字节")
+
+
+def test_download_content_negotiation():
+    """接受gzip的客户端收到压缩内容，其余客户端收到解压后的TCX"""
+    print("🧪 测试下载内容协商...")
+    import web_app
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        plain = os.path.join(tmpdir, 'a.tcx')
+        compressed = os.path.join(tmpdir, 'a.tcx.gz')
+        _convert(plain)
+        _convert(compressed)
+        with open(plain, 'rb') as f:
+            expected = f.read()
+
+        task = web_app.ConversionTask('gzip-test', os.path.join(tmpdir, 'gzip-test_a.gpx'), compressed, {})
+        task.status = 'completed'
+        web_app.conversion_tasks[task.task_id] = task
+        try:
+            client = web_app.create_app().test_client()
+
+            response = client.get('/download/gzip-test', headers={'Accept-Encoding': 'gzip, deflate'})
+            assert response.status_code == 200
+            assert response.headers['Content-Encoding'] == 'gzip'
+            assert gzip.decompress(response.data) == expected
+            response.close()
+
+            response = client.get('/download/gzip-test', headers={'Accept-Encoding': 'identity'})
+            assert response.status_code == 200
+            assert 'Content-Encoding' not in response.headers
+            assert response.data == expected
+            assert 'a_converted.tcx' in response.headers['Content-Disposition']
+            response.close()
+        finally:
+            web_app.conversion_tasks.pop(task.task_id, None)
+        print("✅ 内容协商正确")
+
+
+if __name__ == '__main__':
+    test_gzip_output_matches_plain()
+    test_download_content_negotiation()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试有界转换队列和上传背压
+"""
+
+import io
+import threading
+import time
+import web_app
+
+
+def _wait_until(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "等待超时"
+        time.sleep(0.01)
+
+
+def _blocking_queue(worker_count, max_size):
+    """创建一个转换会被阻塞的队列，返回(队列, 放行事件, 原perform_conversion)"""
+    release = threading.Event()
+    original = web_app.perform_conversion
+
+    def blocked(task):
+        release.wait(5)
+        task.status = 'completed'
+
+    web_app.perform_conversion = blocked
+    return web_app.ConversionQueue(worker_count, max_size), release, original
+
+
+def test_queue_positions_and_limit():
+    """任务按提交顺序排队，队列满时拒绝"""
+    print("🧪 测试排队位置和队列上限...")
+    conversion_queue, release, original = _blocking_queue(1, 2)
+    try:
+        tasks = [web_app.ConversionTask(f'q{i}', 'in.gpx', 'out.tcx', {}) for i in range(4)]
+        assert conversion_queue.submit(tasks[0])
+        _wait_until(lambda: conversion_queue.started == 1)
+
+        assert conversion_queue.submit(tasks[1])
+        assert conversion_queue.submit(tasks[2])
+        assert not conversion_queue.submit(tasks[3])
+        assert [conversion_queue.position(task) for task in tasks] == [0, 1, 2, 0]
+        assert conversion_queue.depth() == 2
+
+        release.set()
+        conversion_queue.jobs.join()
+        assert all(task.status == 'completed' for task in tasks[:3])
+        assert tasks[3].status == 'pending'
+        assert [conversion_queue.position(task) for task in tasks[:3]] == [0, 0, 0]
+    finally:
+        release.set()
+        web_app.perform_conversion = original
+    print("✅ 排队位置和上限正确")
+
+
+def test_upload_returns_429_when_full():
+    """队列已满时上传返回429和Retry-After，状态接口返回排队位置"""
+    print("🧪 测试上传背压...")
+    conversion_queue, release, original = _blocking_queue(1, 1)
+    saved_queue = web_app.conversion_queue
+    saved_cache = web_app.result_cache
+    web_app.conversion_queue = conversion_queue
+    # 关闭结果缓存，保证每次上传都进入队列
+    web_app.result_cache = web_app.ResultCache(saved_cache.directory, 0)
+    task_ids = []
+    try:
+        client = web_app.create_app().test_client()
+        with open("测试轨迹.gpx", 'rb') as f:
+            gpx_bytes = f.read()
+
+        def upload():
+            return client.post('/upload', data={'file': (io.BytesIO(gpx_bytes), 'queue.gpx')},
+                               content_type='multipart/form-data')
+
+        first = upload()
+        assert first.status_code == 200
+        task_ids.append(first.get_json()['task_id'])
+        _wait_until(lambda: conversion_queue.started == 1)
+
+        second = upload()
+        assert second.status_code == 200
+        task_ids.append(second.get_json()['task_id'])
+        assert second.get_json()['queue_position'] == 1
+
+        status = client.get(f'/status/{task_ids[1]}').get_json()
+        assert status['queue_position'] == 1
+        assert '排队中' in status['message']
+
+        rejected = upload()
+        assert rejected.status_code == 429
+        assert rejected.headers['Retry-After'] == str(web_app.APP_CONFIG['RETRY_AFTER_SECONDS'])
+        assert len(web_app.conversion_tasks) >= 2
+    finally:
+        release.set()
+        conversion_queue.jobs.join()
+        web_app.conversion_queue = saved_queue
+        web_app.result_cache = saved_cache
+        web_app.perform_conversion = original
+        for task_id in task_ids:
+            task = web_app.conversion_tasks.pop(task_id, None)
+            if task:
+                for path in (task.input_file, task.output_file):
+                    if web_app.os.path.exists(path):
+                        web_app.os.remove(path)
+    print("✅ 队列满时返回429")
+
+
+if __name__ == '__main__':
+    test_queue_positions_and_limit()
+    test_upload_returns_429_when_full()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试/convert直接转换接口（内存解析、流式返回）
+"""
+
+import gzip
+import io
+import os
+import re
+import threading
+import web_app
+
+
+def _post(client, data, **headers):
+    return client.post('/convert', data={'file': (io.BytesIO(data), 'track.gpx')},
+                       content_type='multipart/form-data', headers=headers)
+
+
+def _folder_files():
+    return {folder: set(os.listdir(folder)) for folder in (web_app.UPLOAD_FOLDER, web_app.OUTPUT_FOLDER)}
+
+
+def test_convert_streams_without_files_or_timers():
+    """转换结果直接在响应体中返回，不产生上传/输出文件和定时线程"""
+    print("🧪 测试直接转换...")
+    client = web_app.create_app().test_client()
+    with open("测试轨迹.gpx", 'rb') as f:
+        gpx_bytes = f.read()
+
+    files_before = _folder_files()
+    threads_before = threading.active_count()
+    response = _post(client, gpx_bytes)
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert 'attachment; filename="track.tcx"' == response.headers['Content-Disposition']
+    body = response.get_data(as_text=True)
+    assert body.startswith('<?xml')
+    assert body.rstrip().endswith('</TrainingCenterDatabase>')
+    assert body.count('<Trackpoint>') == 10
+    assert _folder_files() == files_before
+    assert threading.active_count() == threads_before
+    print("✅ 未产生临时文件和定时线程")
+
+
+def test_convert_gzip_and_errors():
+    """客户端接受gzip时流式压缩，无效GPX返回错误"""
+    print("🧪 测试gzip响应和错误处理...")
+    client = web_app.create_app().test_client()
+    with open("测试轨迹.gpx", 'rb') as f:
+        gpx_bytes = f.read()
+
+    response = _post(client, gpx_bytes, **{'Accept-Encoding': 'gzip'})
+    if web_app.COMPRESS_OUTPUTS:
+        assert response.headers['Content-Encoding'] == 'gzip'
+        body = gzip.decompress(response.get_data()).decode('utf-8')
+    else:
+        body = response.get_data(as_text=True)
+    assert len(re.findall(r'<Time>', body)) >= 10
+
+    assert _post(client, b'<gpx></gpx>').status_code == 500
+    assert _post(client, b'').status_code == 400
+    print("✅ gzip和错误处理正确")
+
+
+if __name__ == '__main__':
+    test_convert_streams_without_files_or_timers()
+    test_convert_gzip_and_errors()
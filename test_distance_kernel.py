@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试批量Haversine距离计算
+"""
+
+from array import array
+import gpx_to_tcx
+from gpx_to_tcx import GPXToTCXConverter, haversine_segments
+
+
+def _sample_columns(count):
+    """生成测试用的经纬度列"""
+    lat = array('d', (31.2304 + i * 1e-4 + (i % 3) * 1e-5 for i in range(count)))
+    lon = array('d', (121.4737 + i * 2e-4 for i in range(count)))
+    return lat, lon
+
+
+def test_python_kernel_matches_calculate_distance():
+    """纯Python实现与逐段calculate_distance一致"""
+    print("🧪 测试纯Python距离计算...")
+    converter = GPXToTCXConverter()
+    lat, lon = _sample_columns(200)
+    segments, cumulative = haversine_segments(lat, lon, use_numpy=False)
+    
+    expected = [converter.calculate_distance(lat[i-1], lon[i-1], lat[i], lon[i]) for i in range(1, len(lat))]
+    assert len(segments) == 199 and len(cumulative) == 200
+    assert all(abs(a - b) < 1e-9 for a, b in zip(segments, expected))
+    assert cumulative[0] == 0.0
+    assert abs(cumulative[-1] - sum(expected)) < 1e-6
+    print(f"✅ 总距离 {cumulative[-1]:.2f} 米")
+
+
+def test_numpy_kernel_matches_python():
+    """NumPy向量化实现与纯Python实现一致"""
+    print("🧪 测试NumPy距离计算...")
+    if gpx_to_tcx.np is None:
+        print("⚠️ 未安装NumPy，跳过")
+        return
+    lat, lon = _sample_columns(1000)
+    py_segments, py_cumulative = haversine_segments(lat, lon, use_numpy=False)
+    np_segments, np_cumulative = haversine_segments(lat, lon, use_numpy=True)
+    assert isinstance(np_cumulative, array)
+    assert all(abs(a - b) < 1e-6 for a, b in zip(py_segments, np_segments))
+    assert abs(py_cumulative[-1] - np_cumulative[-1]) < 1e-6
+    print("✅ 两种实现结果一致")
+
+
+def test_degenerate_tracks():
+    """空轨迹和单点轨迹"""
+    print("🧪 测试边界情况...")
+    for use_numpy in (False, gpx_to_tcx.np is not None):
+        assert haversine_segments(array('d'), array('d'), use_numpy=use_numpy) == (array('d'), array('d'))
+        segments, cumulative = haversine_segments(array('d', [30.0]), array('d', [120.0]), use_numpy=use_numpy)
+        assert len(segments) == 0 and list(cumulative) == [0.0]
+    print("✅ 边界情况正确")
+
+
+if __name__ == '__main__':
+    test_python_kernel_matches_calculate_distance()
+    test_numpy_kernel_matches_python()
+    test_degenerate_tracks()
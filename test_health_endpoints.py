@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试健康检查端点
+"""
+
+import time
+import web_app
+
+
+def test_health_returns_cached_snapshot():
+    """/health直接返回后台采样的快照，不阻塞请求"""
+    print("🧪 测试健康检查快照...")
+    client = web_app.create_app().test_client()
+    web_app.health_sampler.sample()
+
+    started = time.perf_counter()
+    response = client.get('/health')
+    elapsed = time.perf_counter() - started
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['status'] in ('healthy', 'warning')
+    assert set(data['system']) >= {'cpu_percent', 'memory_percent', 'disk_percent'}
+    assert set(data['application']) >= {'active_tasks', 'total_tasks', 'queue_depth'}
+    assert data['sample_age_seconds'] < web_app.health_sampler.interval
+    # 原实现每次请求阻塞1秒采样CPU
+    assert elapsed < 0.1, elapsed
+    print(f"✅ 响应耗时 {elapsed * 1000:.2f}ms")
+
+
+def test_liveness_and_readiness():
+    """存活检查总是200；采样停止或队列已满时就绪检查返回503"""
+    print("🧪 测试存活和就绪检查...")
+    client = web_app.create_app().test_client()
+    web_app.health_sampler.sample()
+    assert client.get('/health/live').status_code == 200
+    assert client.get('/health/ready').get_json()['status'] == 'ready'
+
+    saved_sampled_at = web_app.health_sampler.sampled_at
+    web_app.health_sampler.sampled_at = time.monotonic() - web_app.health_sampler.interval * 10
+    try:
+        response = client.get('/health/ready')
+        assert response.status_code == 503
+        assert 'Health sampler stalled' in response.get_json()['reasons']
+    finally:
+        web_app.health_sampler.sampled_at = saved_sampled_at
+
+    saved_queue = web_app.conversion_queue
+    web_app.conversion_queue = web_app.ConversionQueue(1, 1)
+    web_app.conversion_queue.jobs.put_nowait(None)
+    try:
+        response = client.get('/health/ready')
+        assert response.status_code == 503
+        assert response.get_json()['reasons'] == ['Conversion queue full']
+        assert client.get('/health/live').status_code == 200
+    finally:
+        web_app.conversion_queue = saved_queue
+    print("✅ 存活和就绪检查正确")
+
+
+if __name__ == '__main__':
+    test_health_returns_cached_snapshot()
+    test_liveness_and_readiness()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试圈汇总数据的在线统计和自动分圈
+"""
+
+import re
+from gpx_to_tcx import GPXToTCXConverter, LapAggregator
+
+
+def _convert_to_text(config):
+    converter = GPXToTCXConverter(config)
+    track = converter.load_track("测试轨迹.gpx")
+    metrics = converter.calculate_metrics(track)
+    simulation = converter.simulate_series(metrics['speeds'])
+    return converter.generate_tcx_content(track, metrics, simulation), metrics
+
+
+def _lap_blocks(tcx_content):
+    return re.findall(r'<Lap .*?</Lap>', tcx_content, re.S)
+
+
+def _ints(pattern, text):
+    return [int(value) for value in re.findall(pattern, text)]
+
+
+def test_aggregator_defaults():
+    """没有有效数据时使用配置中的默认值"""
+    print("🧪 测试空圈的默认汇总值...")
+    summary = LapAggregator().summary({'base_cadence': 55, 'max_cadence': 75,
+                                       'min_power': 120, 'max_power': 280})
+    assert summary == {'avg_speed': 0.0, 'avg_cadence': 55, 'max_cadence': 75,
+                       'avg_power': 120, 'max_power': 280}
+    print("✅ 默认值正确")
+
+
+def test_lap_summary_matches_trackpoints():
+    """LX汇总值与输出的轨迹点一致"""
+    print("🧪 测试圈汇总与轨迹点一致...")
+    tcx_content, _ = _convert_to_text({'random_seed': 11})
+    laps = _lap_blocks(tcx_content)
+    assert len(laps) == 1
+    lap = laps[0]
+
+    # 第一个点（速度为0）不参与统计
+    cadences = [c for c in _ints(r'<ns3:RunCadence>(\d+)</ns3:RunCadence>', lap)[1:] if c > 0]
+    powers = [p for p in _ints(r'<ns3:Watts>(\d+)</ns3:Watts>', lap)[1:] if p > 0]
+    assert _ints(r'<ns3:MaxRunCadence>(\d+)<', lap) == [max(cadences)]
+    assert _ints(r'<ns3:AvgRunCadence>(\d+)<', lap) == [int(sum(cadences) / len(cadences))]
+    assert _ints(r'<ns3:MaxWatts>(\d+)<', lap) == [max(powers)]
+    assert _ints(r'<ns3:AvgWatts>(\d+)<', lap) == [int(sum(powers) / len(powers))]
+    assert '<TriggerMethod>Manual</TriggerMethod>' in lap
+    print("✅ 汇总值来自输出的轨迹点")
+
+
+def test_auto_laps_sum_to_totals():
+    """自动分圈后各圈距离和时间之和等于总值"""
+    print("🧪 测试按距离自动分圈...")
+    single, metrics = _convert_to_text({'random_seed': 11})
+    tcx_content, _ = _convert_to_text({'random_seed': 11, 'auto_lap_distance': 50})
+    laps = _lap_blocks(tcx_content)
+    expected_laps = int(metrics['total_distance'] // 50) + 1
+    assert len(laps) >= 2 and len(laps) <= expected_laps
+
+    distances = [float(re.search(r'<DistanceMeters>([\d.]+)</DistanceMeters>', lap).group(1)) for lap in laps]
+    times = [float(re.search(r'<TotalTimeSeconds>([\d.]+)</TotalTimeSeconds>', lap).group(1)) for lap in laps]
+    total_time = float(re.search(r'<TotalTimeSeconds>([\d.]+)</TotalTimeSeconds>', single).group(1))
+    assert abs(sum(distances) - metrics['total_distance']) < 1e-6
+    assert abs(sum(times) - total_time) < 1e-6
+    assert distances[0] >= 50
+
+    # 分圈不改变轨迹点本身
+    assert tcx_content.count('<Trackpoint>') == single.count('<Trackpoint>')
+    assert all('<TriggerMethod>Distance</TriggerMethod>' in lap for lap in laps)
+    print(f"✅ 共 {len(laps)} 圈，距离和时间与总值一致")
+
+
+def test_last_point_does_not_open_empty_lap():
+    """最后一个点越过分圈距离时并入当前圈，不产生距离和时间为0的圈"""
+    print("🧪 测试末尾分圈点...")
+    converter = GPXToTCXConverter({'random_seed': 11})
+    track = converter.load_track("测试轨迹.gpx")
+    metrics = converter.calculate_metrics(track)
+    cumulative = track.cumulative_distance
+    total_time = track.offsets[-1] - track.offsets[0]
+
+    for lap_distance in (metrics['total_distance'], (cumulative[-2] + cumulative[-1]) / 2):
+        converter.config['auto_lap_distance'] = lap_distance
+        laps = converter.split_laps(track, metrics, metrics['speeds'], total_time)
+        assert len(laps) == 1, laps
+        assert laps[0]['end'] == len(track)
+        assert abs(laps[0]['distance'] - metrics['total_distance']) < 1e-6
+
+    # 倒数第二个点越过时，最后一圈包含两个点
+    converter.config['auto_lap_distance'] = (cumulative[-3] + cumulative[-2]) / 2
+    laps = converter.split_laps(track, metrics, metrics['speeds'], total_time)
+    assert [lap['end'] - lap['start'] for lap in laps][-1] == 2
+    assert all(lap['total_time'] > 0 and lap['distance'] > 0 for lap in laps)
+    print("✅ 没有空圈")
+
+
+if __name__ == '__main__':
+    test_aggregator_defaults()
+    test_lap_summary_matches_trackpoints()
+    test_auto_laps_sum_to_totals()
+    test_last_point_does_not_open_empty_lap()
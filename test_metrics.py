@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试监控指标和/metrics端点
+"""
+
+import io
+import re
+import threading
+import time
+from telemetry import Registry
+import web_app
+
+
+def _sample(text, name, **labels):
+    """从Prometheus文本中取出一个样本值"""
+    label_text = ','.join(f'{key}="{value}"' for key, value in labels.items())
+    pattern = '^' + re.escape(name + (f'{{{label_text}}}' if labels else '')) + r' (\S+)$'
+    match = re.search(pattern, text, re.MULTILINE)
+    assert match, f"未找到 {name} {labels}"
+    return float(match.group(1))
+
+
+def test_metric_types_render_and_are_thread_safe():
+    """计数器在多线程下不丢失更新，直方图输出累计分桶"""
+    print("🧪 测试指标类型...")
+    registry = Registry()
+    counter = registry.counter('demo_total', 'demo counter', ['kind'])
+    histogram = registry.histogram('demo_seconds', 'demo histogram', buckets=(0.1, 1.0))
+    registry.gauge('demo_depth', 'demo gauge', function=lambda: 3)
+
+    def work():
+        for _ in range(10000):
+            counter.inc(kind='a')
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value)
+
+    text = registry.render()
+    assert _sample(text, 'demo_total', kind='a') == 40000
+    assert '# TYPE demo_seconds histogram' in text
+    assert _sample(text, 'demo_seconds_bucket', le='0.1') == 1
+    assert _sample(text, 'demo_seconds_bucket', le='1') == 2
+    assert _sample(text, 'demo_seconds_bucket', le='+Inf') == 3
+    assert _sample(text, 'demo_seconds_count') == 3
+    assert _sample(text, 'demo_depth') == 3
+
+    try:
+        counter.inc(kind='a', extra='x')
+        assert False, "标签不匹配时应报错"
+    except ValueError:
+        pass
+    print("✅ 指标输出正确")
+
+
+def test_metrics_endpoint_reports_conversions():
+    """上传转换后/metrics包含阶段耗时、吞吐量、缓存和请求指标"""
+    print("🧪 测试/metrics端点...")
+    client = web_app.create_app().test_client()
+    saved_cache = web_app.result_cache
+    web_app.result_cache = web_app.ResultCache(saved_cache.directory, 0)
+    parse_before = web_app.STAGE_SECONDS.snapshot(stage='parse')['count']
+    task_id = None
+    try:
+        with open("测试轨迹.gpx", 'rb') as f:
+            response = client.post('/upload', data={'file': (io.BytesIO(f.read()), 'metrics.gpx')},
+                                   content_type='multipart/form-data')
+        task_id = response.get_json()['task_id']
+        deadline = time.time() + 10
+        while web_app.conversion_tasks.get(task_id).status not in ('completed', 'error'):
+            assert time.time() < deadline, "等待转换超时"
+            time.sleep(0.05)
+        client.get(f'/status/{task_id}')
+
+        response = client.get('/metrics')
+        assert response.status_code == 200
+        assert response.mimetype == 'text/plain'
+        text = response.get_data(as_text=True)
+    finally:
+        web_app.result_cache = saved_cache
+        task = web_app.conversion_tasks.pop(task_id, None) if task_id else None
+        for path in (task.input_file, task.output_file) if task else ():
+            if web_app.os.path.exists(path):
+                web_app.os.remove(path)
+
+    assert _sample(text, 'gpx_conversion_stage_seconds_count', stage='parse') == parse_before + 1
+    assert _sample(text, 'gpx_conversion_points_per_second_count') >= 1
+    assert _sample(text, 'gpx_conversions_total', result='completed') >= 1
+    assert _sample(text, 'gpx_conversion_queue_depth') >= 0
+    assert _sample(text, 'gpx_conversion_active_workers') >= 0
+    assert _sample(text, 'gpx_upload_size_bytes_count', route='/upload') >= 1
+    assert _sample(text, 'gpx_http_request_duration_seconds_count', route='/status/<task_id>', method='GET') >= 1
+    assert _sample(text, 'gpx_http_requests_total', route='/upload', method='POST', status='200') >= 1
+    print("✅ /metrics包含转换和请求指标")
+
+
+if __name__ == '__main__':
+    test_metric_types_render_and_are_thread_safe()
+    test_metrics_endpoint_reports_conversions()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试Web转换的进程池执行模式
+"""
+
+import os
+import re
+import shutil
+import signal
+import tempfile
+import time
+import web_app
+from gpx_to_tcx import run_conversion_job
+
+
+def test_run_conversion_job_result():
+    """工作进程函数返回可序列化的状态和性能数据"""
+    print("🧪 测试转换任务函数...")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        output_path = os.path.join(tmpdir, 'nested', 'out.tcx.gz')
+        result = run_conversion_job(("测试轨迹.gpx", output_path, {'random_seed': 1}))
+        assert result['success'] and result['error'] is None
+        assert result['points'] == 10
+        assert result['file_size'] == os.path.getsize(output_path)
+        assert list(result['profile']) == ['parse', 'metrics', 'simulate', 'serialize']
+
+        failed = run_conversion_job((os.path.join(tmpdir, 'missing.gpx'), os.path.join(tmpdir, 'x.tcx'), {}))
+        assert not failed['success'] and failed['error']
+    print("✅ 结果字段完整")
+
+
+def test_process_mode_matches_thread_mode():
+    """进程模式与线程模式使用相同配置转换并回填任务状态"""
+    print("🧪 对比进程模式和线程模式...")
+    saved_mode = web_app.APP_CONFIG['EXECUTION_MODE']
+    outputs = {}
+    try:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for mode in ('thread', 'process'):
+                web_app.APP_CONFIG['EXECUTION_MODE'] = mode
+                input_path = os.path.join(tmpdir, f'{mode}_a.gpx')
+                shutil.copy("测试轨迹.gpx", input_path)
+                task = web_app.ConversionTask(mode, input_path, os.path.join(tmpdir, f'{mode}.tcx'),
+                                              web_app.sanitize_config({'start_time': '2025-01-15T09:00'}))
+                web_app.perform_conversion(task)
+
+                assert task.status == 'completed', task.error
+                assert task.progress == 100
+                assert list(task.profile) == ['parse', 'metrics', 'simulate', 'serialize']
+                with open(task.output_file, 'r', encoding='utf-8') as f:
+                    outputs[mode] = f.read()
+        # 模拟数据每次随机，比较与随机无关的部分
+        times = {mode: re.findall(r'<Time>([^<]+)</Time>', content) for mode, content in outputs.items()}
+        assert len(times['thread']) == 10
+        assert times['thread'] == times['process']
+        assert times['thread'][0] == '2025-01-15T01:00:00.000Z'
+    finally:
+        web_app.APP_CONFIG['EXECUTION_MODE'] = saved_mode
+        if web_app._process_pool is not None:
+            web_app._process_pool.shutdown()
+            web_app._process_pool = None
+    print("✅ 两种模式结果一致")
+
+
+def test_pool_recovers_after_worker_killed():
+    """工作进程被杀死后进程池重建，后续任务正常转换"""
+    print("🧪 测试工作进程异常退出...")
+    saved_mode = web_app.APP_CONFIG['EXECUTION_MODE']
+    web_app.APP_CONFIG['EXECUTION_MODE'] = 'process'
+    try:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            def convert(name):
+                input_path = os.path.join(tmpdir, f'{name}_a.gpx')
+                shutil.copy("测试轨迹.gpx", input_path)
+                task = web_app.ConversionTask(name, input_path, os.path.join(tmpdir, f'{name}.tcx'),
+                                              web_app.sanitize_config({}))
+                web_app.perform_conversion(task)
+                return task
+
+            assert convert('before').status == 'completed'
+            pool = web_app._process_pool
+            # 模拟内存不足时工作进程被系统杀死
+            os.kill(next(iter(pool._processes)), signal.SIGKILL)
+            deadline = time.time() + 10
+            while not pool._broken:
+                assert time.time() < deadline, "进程池未检测到工作进程退出"
+                time.sleep(0.05)
+
+            failed = convert('broken')
+            assert failed.status == 'error'
+            assert web_app._process_pool is None
+
+            assert convert('after').status == 'completed'
+            assert web_app._process_pool is not pool
+    finally:
+        web_app.APP_CONFIG['EXECUTION_MODE'] = saved_mode
+        if web_app._process_pool is not None:
+            web_app._process_pool.shutdown()
+            web_app._process_pool = None
+    print("✅ 进程池已重建")
+
+
+if __name__ == '__main__':
+    test_run_conversion_job_result()
+    test_process_mode_matches_thread_mode()
+    test_pool_recovers_after_worker_killed()
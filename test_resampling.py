@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试按固定时间间隔重采样轨迹
+"""
+
+import math
+import os
+import tempfile
+from datetime import datetime, timedelta
+from gpx_to_tcx import GPXToTCXConverter, resample_track, haversine_segments
+
+
+def _write_10hz_gpx(path, seconds):
+    """生成10 Hz采样、匀速向北的轨迹，时间带小数秒"""
+    start = datetime(2024, 12, 25, 6, 0, 0)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        f.write('<gpx version="1.1" creator="test" xmlns="http://www.topografix.com/GPX/1/1">\n')
+        f.write('<trk><trkseg>\n')
+        for i in range(seconds * 10 + 1):
+            time_str = (start + timedelta(milliseconds=100 * i)).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+            f.write(f'<trkpt lat="{30 + i * 2.7e-6:.8f}" lon="120.0"><ele>{i * 0.01:.2f}</ele>'
+                    f'<time>{time_str}</time></trkpt>\n')
+        f.write('</trkseg></trk>\n</gpx>\n')
+
+
+def test_source_times_parsed_only_when_resampling():
+    """只有启用重采样时才解析每个点的GPX时间"""
+    print("🧪 测试源时间列...")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        gpx_path = os.path.join(tmpdir, 'fast.gpx')
+        _write_10hz_gpx(gpx_path, 3)
+
+        plain = GPXToTCXConverter({'quiet': True}).load_track(gpx_path)
+        assert plain.source_times is None
+
+        track = GPXToTCXConverter({'quiet': True, 'resample_interval': 1}).load_track(gpx_path)
+        assert len(track.source_times) == 31
+        assert abs(track.source_times[10] - 1.0) < 1e-9
+        assert abs(track.source_times[-1] - 3.0) < 1e-9
+    print("✅ 源时间解析正确")
+
+
+def test_resample_10hz_to_1hz():
+    """10 Hz轨迹重采样为1 Hz，NumPy和纯Python结果一致"""
+    print("🧪 测试10 Hz -> 1 Hz...")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        gpx_path = os.path.join(tmpdir, 'fast.gpx')
+        _write_10hz_gpx(gpx_path, 60)
+        track = GPXToTCXConverter({'quiet': True, 'resample_interval': 1}).load_track(gpx_path)
+
+    results = [resample_track(track, 1, use_numpy=flag) for flag in (True, False)]
+    for result in results:
+        assert len(result) == 61
+        assert list(result.offsets) == [float(k) for k in range(61)]
+        assert abs(result.lat[5] - track.lat[50]) < 1e-12
+        assert abs(result.ele[-1] - track.ele[-1]) < 1e-9
+    for name in ('lat', 'lon', 'ele', 'offsets'):
+        assert all(math.isclose(a, b, abs_tol=1e-9)
+                   for a, b in zip(getattr(results[0], name), getattr(results[1], name)))
+
+    original = haversine_segments(track.lat, track.lon)[1][-1]
+    resampled = haversine_segments(results[0].lat, results[0].lon)[1][-1]
+    assert abs(original - resampled) < 1e-6
+    print(f"✅ {len(track)} -> {len(results[0])} 个点，距离不变")
+
+
+def test_invalid_times_are_skipped():
+    """时间缺失或倒退的点不参与插值"""
+    print("🧪 测试无效时间...")
+    converter = GPXToTCXConverter({'quiet': True, 'resample_interval': 2})
+    raw = [
+        ('30.0', '120.0', '0', ''),
+        ('30.0', '120.0', '0', '2024-01-01T00:00:00Z'),
+        ('30.001', '120.0', '0', '2024-01-01T00:00:04Z'),
+        ('30.5', '120.0', '0', '2024-01-01T00:00:03Z'),
+        ('30.002', '120.0', '0', '2024-01-01T00:00:08Z'),
+    ]
+    track = converter._build_track(raw, keep_source_times=True)
+    assert math.isnan(track.source_times[0])
+    for flag in (True, False):
+        result = resample_track(track, 2, use_numpy=flag)
+        assert list(result.offsets) == [0.0, 2.0, 4.0, 6.0, 8.0]
+        assert all(abs(a - b) < 1e-12 for a, b in zip(result.lat, [30.0, 30.0005, 30.001, 30.0015, 30.002]))
+    print("✅ 无效时间已跳过")
+
+
+def test_convert_with_resampling():
+    """convert在解析后执行重采样阶段"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        gpx_path = os.path.join(tmpdir, 'fast.gpx')
+        _write_10hz_gpx(gpx_path, 20)
+        converter = GPXToTCXConverter({'quiet': True, 'resample_interval': 5})
+        assert converter.convert(gpx_path, os.path.join(tmpdir, 'out.tcx'))
+        assert list(converter.profile)[:2] == ['parse', 'resample']
+        assert converter.profile['metrics']['points'] == 5
+
+
+if __name__ == '__main__':
+    test_source_times_parsed_only_when_resampling()
+    test_resample_10hz_to_1hz()
+    test_invalid_times_are_skipped()
+    test_convert_with_resampling()
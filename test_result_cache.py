@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试转换结果缓存
+"""
+
+import io
+import os
+import re
+import tempfile
+import time
+import result_cache
+from result_cache import ResultCache, gpx_digest
+import web_app
+
+
+def test_digest_normalizes_line_endings():
+    """换行符和首尾空白不同的相同GPX得到相同摘要"""
+    print("🧪 测试GPX摘要...")
+    body = b'<gpx>\n<trk><trkpt lat="30" lon="120"/></trk>\n</gpx>'
+    variants = [body, body.replace(b'\n', b'\r\n'), b'\n  ' + body + b'\n\n']
+    saved = result_cache.DIGEST_CHUNK_SIZE
+    digests = set()
+    try:
+        # 小块读取，覆盖CRLF跨块的情况
+        for size in (3, 7, saved):
+            result_cache.DIGEST_CHUNK_SIZE = size
+            for data in variants:
+                stream = io.BytesIO(data)
+                digests.add(gpx_digest(stream))
+                assert stream.tell() == 0
+    finally:
+        result_cache.DIGEST_CHUNK_SIZE = saved
+    assert len(digests) == 1
+    assert gpx_digest(io.BytesIO(body.replace(b'120', b'121'))) not in digests
+    print("✅ 摘要一致")
+
+
+def test_lru_eviction_by_total_size():
+    """超过总大小上限时淘汰最久未使用的结果"""
+    print("🧪 测试LRU淘汰...")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache = ResultCache(os.path.join(tmpdir, 'cache'), 250)
+
+        def result(name):
+            path = os.path.join(tmpdir, name + '.tcx')
+            with open(path, 'wb') as f:
+                f.write(b'x' * 100)
+            return path
+
+        for index, key in enumerate(('a', 'b')):
+            cache.store(key, result(key))
+            os.utime(cache.path_for(key), (index, index))
+        # 命中a后，b成为最久未使用
+        assert cache.fetch('a', os.path.join(tmpdir, 'copy.tcx'))
+        cache.store('c', result('c'))
+        assert os.path.exists(cache.path_for('a'))
+        assert not os.path.exists(cache.path_for('b'))
+        assert os.path.exists(cache.path_for('c'))
+        assert cache.size() == 200
+        assert not cache.fetch('b', os.path.join(tmpdir, 'missing.tcx'))
+        assert (cache.hits, cache.misses) == (1, 1)
+    print("✅ LRU淘汰正确")
+
+
+def test_upload_hit_completes_immediately():
+    """第二次上传相同文件和配置时直接完成任务，输出与首次一致"""
+    print("🧪 测试上传命中缓存...")
+    saved = web_app.result_cache
+    task_ids = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        web_app.result_cache = ResultCache(tmpdir, 10 * 1024 * 1024, saved.suffix)
+        try:
+            client = web_app.create_app().test_client()
+            with open("测试轨迹.gpx", 'rb') as f:
+                gpx_bytes = f.read()
+
+            def upload(data):
+                response = client.post('/upload', data={'file': (io.BytesIO(data), 'cache.gpx'), 'base_hr': '140'},
+                                       content_type='multipart/form-data')
+                assert response.status_code == 200
+                task_ids.append(response.get_json()['task_id'])
+                return response.get_json()
+
+            first = upload(gpx_bytes)
+            assert not first.get('cached')
+            deadline = time.time() + 10
+            while web_app.conversion_tasks.get(first['task_id']).status != 'completed':
+                assert time.time() < deadline, "等待转换超时"
+                time.sleep(0.05)
+
+            second = upload(gpx_bytes.replace(b'\n', b'\r\n'))
+            assert second['cached'] and second['queue_position'] == 0
+            task = web_app.conversion_tasks.get(second['task_id'])
+            assert task.status == 'completed' and task.progress == 100
+            assert not os.path.exists(task.input_file)
+
+            first_task = web_app.conversion_tasks.get(first['task_id'])
+            assert first_task.config['cache_key'] == task.config['cache_key']
+            with open(first_task.output_file, 'rb') as a, open(task.output_file, 'rb') as b:
+                assert a.read() == b.read()
+            assert client.get(f"/download/{second['task_id']}").status_code == 200
+        finally:
+            web_app.result_cache = saved
+            for task_id in task_ids:
+                task = web_app.conversion_tasks.pop(task_id, None)
+                for path in (task.input_file, task.output_file) if task else ():
+                    if path and os.path.exists(path):
+                        os.remove(path)
+    print("✅ 缓存命中后任务立即完成")
+
+
+def test_time_dependent_output_not_cached():
+    """没有开始时间且GPX中没有时间时，输出依赖当前时间，不写入缓存"""
+    print("🧪 测试依赖当前时间的结果...")
+    saved = web_app.result_cache
+    task_ids = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        web_app.result_cache = ResultCache(tmpdir, 10 * 1024 * 1024, saved.suffix)
+        try:
+            client = web_app.create_app().test_client()
+            with open("测试轨迹.gpx", 'rb') as f:
+                gpx_bytes = re.sub(rb'\s*<time>[^<]*</time>', b'', f.read())
+
+            for _ in range(2):
+                response = client.post('/upload', data={'file': (io.BytesIO(gpx_bytes), 'notime.gpx')},
+                                       content_type='multipart/form-data')
+                assert response.status_code == 200
+                assert not response.get_json().get('cached')
+                task_ids.append(response.get_json()['task_id'])
+                deadline = time.time() + 10
+                while web_app.conversion_tasks.get(task_ids[-1]).status != 'completed':
+                    assert time.time() < deadline, "等待转换超时"
+                    time.sleep(0.05)
+            assert web_app.result_cache.size() == 0
+        finally:
+            web_app.result_cache = saved
+            for task_id in task_ids:
+                task = web_app.conversion_tasks.pop(task_id, None)
+                for path in (task.input_file, task.output_file) if task else ():
+                    if path and os.path.exists(path):
+                        os.remove(path)
+    print("✅ 每次重新转换")
+
+
+def test_seed_makes_output_reproducible():
+    """同一缓存键的随机种子相同，两次转换输出一致"""
+    config = web_app.sanitize_config({'start_time': '2025-01-15T09:00'})
+    key = ResultCache.make_key('digest', config)
+    assert key == ResultCache.make_key('digest', dict(reversed(list(config.items()))))
+    # 转换器输出变化后提升缓存版本，旧的缓存键不再命中
+    saved_version = result_cache.CACHE_VERSION
+    result_cache.CACHE_VERSION += 1
+    try:
+        assert ResultCache.make_key('digest', config) != key
+    finally:
+        result_cache.CACHE_VERSION = saved_version
+    config['random_seed'] = ResultCache.seed_for(key)
+    converter_config = web_app.build_converter_config(config)
+    assert converter_config['random_seed'] == config['random_seed']
+
+    outputs = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for index in range(2):
+            output_path = os.path.join(tmpdir, f'{index}.tcx')
+            converter = web_app.GPXToTCXConverter(dict(converter_config, quiet=True))
+            assert converter.convert("测试轨迹.gpx", output_path)
+            with open(output_path, 'rb') as f:
+                outputs.append(f.read())
+    assert outputs[0] == outputs[1]
+
+
+if __name__ == '__main__':
+    test_digest_normalizes_line_endings()
+    test_lru_eviction_by_total_size()
+    test_upload_hit_completes_immediately()
+    test_time_dependent_output_not_cached()
+    test_seed_makes_output_reproducible()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试批量、带种子的运动指标模拟
+"""
+
+import os
+import random
+import tempfile
+from array import array
+from gpx_to_tcx import GPXToTCXConverter
+
+
+SPEEDS = array('d', [0.0, 0.3, 0.6, 1.0, 1.5, 2.0, 3.0, 5.0, 1.6, 1.7] * 10)
+
+
+def test_series_matches_per_point_functions():
+    """批量模拟与逐点模拟函数使用相同公式和随机序列"""
+    print("🧪 对比批量模拟和逐点模拟...")
+    converter = GPXToTCXConverter({'random_seed': 7})
+    series = converter.simulate_series(SPEEDS)
+    
+    converter.rng = random.Random(7)
+    for i, speed in enumerate(SPEEDS):
+        heart_rate = converter.simulate_heart_rate(speed, i, len(SPEEDS))
+        assert series['heart_rate'][i] == heart_rate
+        assert series['cadence'][i] == converter.simulate_cadence(speed)
+        assert series['power'][i] == converter.simulate_power(speed, heart_rate)
+    print("✅ 批量模拟结果一致")
+
+
+def test_same_seed_same_output():
+    """相同种子得到相同结果，不受全局random影响"""
+    print("🧪 测试种子可复现...")
+    first = GPXToTCXConverter({'random_seed': 2025}).simulate_series(SPEEDS)
+    random.seed(0)
+    random.random()
+    second = GPXToTCXConverter({'random_seed': 2025}).simulate_series(SPEEDS)
+    other = GPXToTCXConverter({'random_seed': 2026}).simulate_series(SPEEDS)
+    assert first == second
+    assert first != other
+    print("✅ 相同种子结果一致")
+
+
+def test_convert_is_reproducible():
+    """相同输入和种子生成完全相同的TCX文件"""
+    print("🧪 测试完整转换可复现...")
+    outputs = []
+    try:
+        for _ in range(2):
+            with tempfile.NamedTemporaryFile(suffix='.tcx', delete=False) as f:
+                outputs.append(f.name)
+            converter = GPXToTCXConverter({'random_seed': 99, 'start_time': '2025-01-15 09:00:00'})
+            assert converter.convert("测试轨迹.gpx", outputs[-1])
+        
+        contents = []
+        for path in outputs:
+            with open(path, 'r', encoding='utf-8') as f:
+                contents.append(f.read())
+        assert contents[0] == contents[1]
+        print("✅ 两次转换输出完全一致")
+    finally:
+        for path in outputs:
+            if os.path.exists(path):
+                os.unlink(path)
+
+
+if __name__ == '__main__':
+    test_series_matches_per_point_functions()
+    test_same_seed_same_output()
+    test_convert_is_reproducible()
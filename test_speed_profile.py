@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试共享的压缩速度序列
+"""
+
+import re
+from array import array
+import gpx_to_tcx
+from gpx_to_tcx import GPXToTCXConverter
+
+
+def test_target_pace_parsed_once():
+    """整个转换过程中目标配速只解析一次"""
+    print("🧪 测试目标配速解析次数...")
+    converter = GPXToTCXConverter({'target_pace': '4:45'})
+    calls = []
+    original = converter.parse_target_pace
+    converter.parse_target_pace = lambda pace: calls.append(pace) or original(pace)
+    
+    track = converter.load_track("测试轨迹.gpx")
+    metrics = converter.calculate_metrics(track)
+    converter.generate_tcx_content(track, metrics)
+    print(f"   解析次数: {len(calls)}")
+    assert calls == ['4:45']
+    print("✅ 目标配速只解析一次")
+
+
+def test_trackpoints_use_metric_speeds():
+    """轨迹点输出的速度与指标阶段的速度序列一致"""
+    print("🧪 测试轨迹点速度...")
+    converter = GPXToTCXConverter()
+    track = converter.load_track("测试轨迹.gpx")
+    metrics = converter.calculate_metrics(track)
+    content = converter.generate_tcx_content(track, metrics)
+    
+    written = [float(v) for v in re.findall(r'<ns3:Speed>([^<]+)</ns3:Speed>', content)]
+    expected = [round(v, 1) for v in metrics['speeds']]
+    assert written == expected
+    assert max(metrics['speeds']) == metrics['max_speed']
+    print(f"✅ {len(written)} 个轨迹点速度一致")
+
+
+def test_numpy_and_python_profiles_match():
+    """NumPy与纯Python的速度压缩结果一致"""
+    print("🧪 测试速度压缩实现...")
+    converter = GPXToTCXConverter({'target_pace': '5:00'})
+    segments = array('d', [0.5, 3.0, 3.6, 8.0, 40.0, 2.0, 3.0])
+    offsets = array('d', [0, 1, 2, 3, 4, 5, 5, 6])
+    python_profile = converter.compute_speed_profile(segments, offsets, use_numpy=False)
+    
+    assert python_profile['speeds'][0] == 0.0
+    assert python_profile['speeds'][6] == 1000.0 / 300 * 0.85  # 时间差为0时取下限
+    if gpx_to_tcx.np is None:
+        print("⚠️ 未安装NumPy，跳过对比")
+        return
+    numpy_profile = converter.compute_speed_profile(segments, offsets, use_numpy=True)
+    assert numpy_profile['speeds'] == python_profile['speeds']
+    assert abs(numpy_profile['avg_speed'] - python_profile['avg_speed']) < 1e-12
+    assert numpy_profile['max_speed'] == python_profile['max_speed']
+    print("✅ 两种实现结果一致")
+
+
+if __name__ == '__main__':
+    test_target_pace_parsed_once()
+    test_trackpoints_use_metric_speeds()
+    test_numpy_and_python_profiles_match()
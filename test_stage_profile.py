@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试转换流程的分阶段性能记录
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import tracemalloc
+from gpx_to_tcx import GPXToTCXConverter
+
+STAGES = ['parse', 'metrics', 'simulate', 'serialize']
+
+
+def test_convert_records_stages():
+    """convert按顺序记录各阶段并调用回调"""
+    print("🧪 测试分阶段记录...")
+    converter = GPXToTCXConverter({'random_seed': 3})
+    calls = []
+    converter.stage_callback = lambda stage, record: calls.append(stage)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        assert converter.convert("测试轨迹.gpx", os.path.join(tmpdir, 'out.tcx'))
+
+    assert calls == STAGES
+    assert list(converter.profile) == STAGES
+    for record in converter.profile.values():
+        assert record['points'] == 10
+        assert record['wall_time'] >= 0 and record['cpu_time'] >= 0
+        assert record['peak_memory'] is None
+    json.dumps(converter.profile)
+    print("✅ 四个阶段均已记录")
+
+
+def test_peak_memory_when_tracing():
+    """tracemalloc启动时记录每个阶段的峰值内存"""
+    print("🧪 测试峰值内存记录...")
+    converter = GPXToTCXConverter({'random_seed': 3})
+    tracemalloc.start()
+    try:
+        with converter.stage('demo', 5) as record:
+            data = [0] * 100000
+            del data
+    finally:
+        tracemalloc.stop()
+    assert record['points'] == 5
+    assert record['peak_memory'] >= 100000 * 7
+    print(f"✅ 峰值内存 {record['peak_memory'] / 1024:.0f} KB")
+
+
+def test_web_task_carries_profile():
+    """Web任务完成后附带分阶段性能数据"""
+    print("🧪 测试Web任务性能数据...")
+    import web_app
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        input_path = os.path.join(tmpdir, 'profile-test_a.gpx')
+        shutil.copy("测试轨迹.gpx", input_path)
+        task = web_app.ConversionTask('profile-test', input_path, os.path.join(tmpdir, 'a.tcx.gz'), {})
+        web_app.perform_conversion(task)
+
+        assert task.status == 'completed'
+        data = task.to_dict()
+        assert list(data['profile']) == STAGES
+        json.dumps(data)
+    print("✅ 任务状态包含profile")
+
+
+if __name__ == '__main__':
+    test_convert_records_stages()
+    test_peak_memory_when_tracing()
+    test_web_task_carries_profile()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试转换进度推送接口
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+import web_app
+
+
+def _events(body):
+    """解析SSE响应，返回[(事件名, 数据)]"""
+    events = []
+    for block in body.strip().split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in block.split('\n') if not line.startswith(':'))
+        if lines:
+            events.append((lines['event'], json.loads(lines['data'])))
+    return events
+
+
+def _new_task(task_id):
+    task = web_app.ConversionTask(task_id, 'uploads/none.gpx', 'outputs/none.tcx', {})
+    web_app.conversion_tasks[task_id] = task
+    return task
+
+
+def test_stream_pushes_updates_until_completed():
+    """转换线程的每次更新都会推送，完成后连接结束"""
+    print("🧪 测试进度推送...")
+    client = web_app.create_app().test_client()
+    task = _new_task('stream-a')
+
+    def convert():
+        time.sleep(0.2)
+        task.update(status='processing', progress=60, message='转换中...')
+        time.sleep(0.1)
+        task.update(progress=70, stage='parse')
+        time.sleep(0.1)
+        task.update(status='completed', progress=100, message='转换完成！')
+
+    worker = threading.Thread(target=convert)
+    worker.start()
+    try:
+        started = time.time()
+        response = client.get('/status/stream-a/stream')
+        assert response.mimetype == 'text/event-stream'
+        events = _events(response.get_data(as_text=True))
+        # 本进程内的更新立即推送，不需要等待轮询间隔
+        assert time.time() - started < web_app.APP_CONFIG['SSE_POLL_SECONDS']
+    finally:
+        worker.join()
+        web_app.conversion_tasks.pop('stream-a', None)
+        web_app.task_events.discard('stream-a')
+
+    names = [name for name, _ in events]
+    assert names[0] == 'progress' and names[-1] == 'completed'
+    assert events[0][1]['status'] == 'pending'
+    assert any(data['stage'] == 'parse' and data['progress'] == 70 for _, data in events)
+    assert events[-1][1]['progress'] == 100
+    print(f"✅ 收到 {len(events)} 个事件: {names}")
+
+
+def test_stream_reads_store_updates_from_other_processes():
+    """其他进程写入任务存储的更新在轮询间隔后推送"""
+    print("🧪 测试跨进程更新...")
+    saved = web_app.APP_CONFIG['SSE_POLL_SECONDS']
+    web_app.APP_CONFIG['SSE_POLL_SECONDS'] = 0.05
+    client = web_app.create_app().test_client()
+    task = _new_task('stream-b')
+
+    def other_process():
+        time.sleep(0.2)
+        # 直接写存储，不经过本进程的通知
+        web_app.conversion_tasks.update(task.task_id, {'status': 'error', 'error': '转换失败，请检查GPX文件格式'})
+
+    worker = threading.Thread(target=other_process)
+    worker.start()
+    try:
+        events = _events(client.get('/status/stream-b/stream').get_data(as_text=True))
+    finally:
+        worker.join()
+        web_app.APP_CONFIG['SSE_POLL_SECONDS'] = saved
+        web_app.conversion_tasks.pop('stream-b', None)
+
+    assert [name for name, _ in events] == ['progress', 'failed']
+    assert events[-1][1]['error'] == '转换失败，请检查GPX文件格式'
+    assert client.get('/status/missing/stream').status_code == 404
+    print("✅ 跨进程更新已推送")
+
+
+def test_stream_limit_returns_503():
+    """推送连接达到上限时返回503和重试提示，连接关闭后释放名额"""
+    print("🧪 测试推送连接上限...")
+    saved = web_app.sse_streams
+    web_app.sse_streams = threading.BoundedSemaphore(1)
+    client = web_app.create_app().test_client()
+    task = _new_task('stream-c')
+    try:
+        # 未读取响应体，生成器尚未开始执行
+        first = client.get('/status/stream-c/stream', buffered=False)
+        assert first.status_code == 200
+
+        rejected = client.get('/status/stream-c/stream')
+        assert rejected.status_code == 503
+        assert rejected.mimetype == 'text/event-stream'
+        assert rejected.headers['Retry-After'] == str(web_app.APP_CONFIG['RETRY_AFTER_SECONDS'])
+        assert rejected.get_data(as_text=True).startswith('retry: ')
+
+        # 客户端断开后名额释放
+        first.close()
+        task.update(status='completed', progress=100)
+        second = client.get('/status/stream-c/stream')
+        assert second.status_code == 200
+        assert [name for name, _ in _events(second.get_data(as_text=True))] == ['completed']
+        assert web_app.sse_streams.acquire(blocking=False)
+        web_app.sse_streams.release()
+    finally:
+        web_app.sse_streams = saved
+        web_app.conversion_tasks.pop('stream-c', None)
+        web_app.task_events.discard('stream-c')
+    print("✅ 超出上限时返回503")
+
+
+def test_each_stage_publishes_once():
+    """每个转换阶段只通知一次，推送连接不会收到重复事件"""
+    print("🧪 测试阶段通知次数...")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        task = web_app.ConversionTask('stream-d', "测试轨迹.gpx", os.path.join(tmpdir, 'out.tcx'), {})
+        before = web_app.task_events.version('stream-d')
+        try:
+            result = web_app.run_in_thread(task, web_app.build_converter_config({}))
+            assert result['success']
+            assert web_app.task_events.version('stream-d') - before == len(result['profile'])
+            assert web_app.task_events.stage('stream-d') == 'serialize'
+        finally:
+            web_app.task_events.discard('stream-d')
+    print(f"✅ {len(result['profile'])} 个阶段各通知一次")
+
+
+if __name__ == '__main__':
+    test_stream_pushes_updates_until_completed()
+    test_stream_reads_store_updates_from_other_processes()
+    test_stream_limit_returns_503()
+    test_each_stage_publishes_once()
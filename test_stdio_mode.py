@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试命令行标准输入/输出模式和静默输出
+"""
+
+import gzip
+import io
+import os
+import subprocess
+import sys
+import tempfile
+from contextlib import redirect_stdout
+from gpx_to_tcx import GPXToTCXConverter
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gpx_to_tcx.py')
+
+
+def _run(args, stdin_bytes=None):
+    return subprocess.run([sys.executable, SCRIPT] + args, input=stdin_bytes,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+
+
+def test_pipe_matches_file_output():
+    """管道模式的输出与写文件完全一致，进度信息只出现在标准错误"""
+    print("🧪 测试标准输入/输出管道...")
+    with open("测试轨迹.gpx", 'rb') as f:
+        gpx_bytes = f.read()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        output_path = os.path.join(tmpdir, 'out.tcx')
+        _run(["测试轨迹.gpx", '-o', output_path, '--seed', '8', '--quiet'])
+        with open(output_path, 'rb') as f:
+            expected = f.read()
+
+    piped = _run(['-', '-o', '-', '--seed', '8'], gpx_bytes)
+    assert piped.stdout == expected
+    assert 'GPX转TCX工具'.encode('utf-8') in piped.stderr
+
+    compressed = _run(['-', '-o', '-', '--seed', '8', '--compress', '--quiet'], gpx_bytes)
+    assert gzip.decompress(compressed.stdout) == expected
+    assert compressed.stderr == b''
+    print("✅ 管道输出与文件输出一致")
+
+
+def test_quiet_converter_prints_nothing():
+    """quiet配置屏蔽转换器的进度输出"""
+    print("🧪 测试静默模式...")
+    captured = io.StringIO()
+    with tempfile.TemporaryDirectory() as tmpdir, redirect_stdout(captured):
+        converter = GPXToTCXConverter({'quiet': True})
+        assert converter.convert("测试轨迹.gpx", os.path.join(tmpdir, 'out.tcx'))
+    assert captured.getvalue() == ''
+    print("✅ 没有进度输出")
+
+
+def test_load_track_from_file_object():
+    """文件对象输入，格式不规范时回到开头使用容错解析"""
+    print("🧪 测试文件对象输入...")
+    converter = GPXToTCXConverter({'quiet': True})
+    with open("测试轨迹.gpx", 'rb') as f:
+        gpx_bytes = f.read()
+    assert len(converter.load_track(io.BytesIO(gpx_bytes))) == 10
+
+    # 截断的XML无法流式解析，回退到正则扫描
+    truncated = gpx_bytes[:gpx_bytes.rindex(b'</trkseg>')]
+    assert len(converter.load_track(io.BytesIO(truncated))) == 10
+    print("✅ 文件对象解析正确")
+
+
+if __name__ == '__main__':
+    test_pipe_matches_file_output()
+    test_quiet_converter_prints_nothing()
+    test_load_track_from_file_object()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试基于iterparse的流式GPX解析
+"""
+
+import os
+import tempfile
+import tracemalloc
+from gpx_to_tcx import GPXToTCXConverter
+
+
+def _write_large_gpx(count):
+    """生成带命名空间的大轨迹文件"""
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.gpx', delete=False, encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        f.write('<gpx version="1.1" creator="test" xmlns="http://www.topografix.com/GPX/1/1">\n')
+        f.write('<trk><trkseg>\n')
+        for i in range(count):
+            f.write(f'<trkpt lat="{30 + i * 1e-5:.6f}" lon="{120 + i * 1e-5:.6f}">'
+                    f'<ele>{i % 50}</ele><time>2024-12-25T06:00:00Z</time></trkpt>\n')
+        f.write('</trkseg></trk>\n</gpx>\n')
+        return f.name
+
+
+def test_stream_matches_regex_parser():
+    """流式解析与正则解析结果一致"""
+    print("🧪 对比流式解析和正则解析...")
+    converter = GPXToTCXConverter()
+    streamed = list(converter.iter_gpx_points("测试轨迹.gpx"))
+    scanned = converter.parse_gpx_file("测试轨迹.gpx")
+    print(f"   流式: {len(streamed)} 个点, 正则: {len(scanned)} 个点")
+    assert streamed == scanned
+    print("✅ 两种解析方式结果一致")
+
+
+def test_stream_is_lazy_and_bounded():
+    """流式解析逐个生成点，Python内存占用不随点数增长"""
+    print("🧪 测试流式解析内存占用...")
+    gpx_file = _write_large_gpx(20000)
+    try:
+        converter = GPXToTCXConverter()
+        points = converter.iter_gpx_points(gpx_file)
+        first = next(points)
+        assert first['lat'] == 30.0
+        
+        tracemalloc.start()
+        count = 1
+        for point in points:
+            count += 1
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        
+        print(f"   {count} 个点, 峰值内存 {peak / 1024:.1f} KB")
+        assert count == 20000
+        assert peak < 2 * 1024 * 1024
+        print("✅ 流式解析内存占用恒定")
+    finally:
+        os.unlink(gpx_file)
+
+
+def test_convert_falls_back_for_malformed_gpx():
+    """非良构XML时convert回退到正则扫描"""
+    print("🧪 测试非规范GPX回退...")
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.gpx', delete=False, encoding='utf-8') as f:
+        f.write('<gpx><trk><trkseg>'
+                '<trkpt lat="31.2304" lon="121.4737"><ele>10</ele></trkpt>'
+                '<trkpt lat="31.2314" lon="121.4747"><ele>11</ele></trkpt>'
+                '</trkseg>')  # 缺少闭合标签
+        gpx_file = f.name
+    try:
+        points = GPXToTCXConverter().load_points(gpx_file)
+        assert [p['ele'] for p in points] == [10.0, 11.0]
+        print("✅ 回退解析成功")
+    finally:
+        os.unlink(gpx_file)
+
+
+if __name__ == '__main__':
+    test_stream_matches_regex_parser()
+    test_stream_is_lazy_and_bounded()
+    test_convert_falls_back_for_malformed_gpx()
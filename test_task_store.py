@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试SQLite任务存储
+"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from task_store import MemoryTaskStore, SQLiteTaskStore
+import web_app
+
+
+def _task(task_id, hours_ago=0):
+    task = web_app.ConversionTask(task_id, f'uploads/{task_id}.gpx', f'outputs/{task_id}.tcx.gz',
+                                  {'activity_type': 'Running', 'start_time': '2025-01-15T09:00'})
+    task.created_at = datetime.now() - timedelta(hours=hours_ago)
+    return task
+
+
+def test_tasks_survive_new_store_instance():
+    """任务写入后，新的存储实例（相当于重启或另一个进程）可以读到最新状态"""
+    print("🧪 测试任务持久化...")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_path = os.path.join(tmpdir, 'tasks.db')
+        store = SQLiteTaskStore(db_path, web_app.ConversionTask)
+        task = _task('a')
+        store['a'] = task
+        task.update(status='completed', progress=100, completed_at=datetime.now(),
+                    profile={'parse': {'wall_time': 0.01, 'points': 10}})
+
+        reopened = SQLiteTaskStore(db_path, web_app.ConversionTask)
+        loaded = reopened.get('a')
+        assert loaded.to_dict() == task.to_dict()
+        assert loaded.config == task.config
+        assert loaded.output_file == task.output_file
+        assert 'a' in reopened and 'missing' not in reopened
+        assert reopened.get('missing') is None
+        assert len(reopened) == 1
+
+        # 其他线程使用独立连接
+        seen = []
+        worker = threading.Thread(target=lambda: seen.append(reopened.get('a').status))
+        worker.start()
+        worker.join()
+        assert seen == ['completed']
+
+        mode = sqlite3.connect(db_path).execute('PRAGMA journal_mode').fetchone()[0]
+        assert mode == 'wal'
+    print("✅ 重新打开后任务状态一致")
+
+
+def test_created_before_and_counts():
+    """按创建时间查询过期任务，按状态统计"""
+    print("🧪 测试过期查询和状态统计...")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        stores = [MemoryTaskStore(), SQLiteTaskStore(os.path.join(tmpdir, 'tasks.db'), web_app.ConversionTask)]
+        for store in stores:
+            for task_id, hours_ago in (('old', 30), ('older', 48), ('new', 1)):
+                store.save(_task(task_id, hours_ago))
+            store.get('new').update(status='processing')
+
+            cutoff = datetime.now() - timedelta(hours=24)
+            assert sorted(task.task_id for task in store.created_before(cutoff)) == ['old', 'older']
+            assert store.count_by_status(['pending', 'processing']) == 3
+            assert store.count_by_status(['processing']) == 1
+
+            del store['old']
+            assert store.pop('older').task_id == 'older'
+            assert store.pop('older') is None
+            assert [task_id for task_id, _ in store.items()] == ['new']
+    print("✅ 两种存储行为一致")
+
+
+def test_updates_touch_only_changed_columns():
+    """并发更新只写各自修改的字段，任务删除后的迟到更新不会让任务复活"""
+    print("🧪 测试按字段更新...")
+    original = web_app.perform_conversion
+    web_app.perform_conversion = lambda task: None
+    try:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = SQLiteTaskStore(os.path.join(tmpdir, 'tasks.db'), web_app.ConversionTask)
+            store.save(_task('a'))
+
+            # 两个进程各自读到同一任务：接管进程修改owner，原进程写进度
+            recovering, owning = store.get('a'), store.get('a')
+            recovering.update(owner='host:2:new', status='pending')
+            owning.update(progress=60, message='转换中...')
+            merged = store.get('a')
+            assert (merged.owner, merged.status, merged.progress) == ('host:2:new', 'pending', 60)
+
+            # 排队序号写回存储，其他进程可以读到
+            conversion_queue = web_app.ConversionQueue(1, 4)
+            assert conversion_queue.submit(merged)
+            conversion_queue.jobs.join()
+            assert store.get('a').queue_seq == 1
+
+            assert store.pop('a') is not None
+            owning.update(status='completed', progress=100)
+            assert store.get('a') is None and len(store) == 0
+    finally:
+        web_app.perform_conversion = original
+    print("✅ 更新互不覆盖，删除后不再写回")
+
+
+def test_orphaned_tasks_recovered():
+    """所属进程已退出的未完成任务：输入文件仍在的重新排队，否则标记失败"""
+    print("🧪 测试接管遗留任务...")
+    saved_tasks = web_app.conversion_tasks
+    saved_queue = web_app.conversion_queue
+    original = web_app.perform_conversion
+    ran = []
+    web_app.perform_conversion = lambda task: ran.append(task.task_id)
+    try:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = SQLiteTaskStore(os.path.join(tmpdir, 'tasks.db'), web_app.ConversionTask)
+            web_app.conversion_tasks = store
+            web_app.conversion_queue = web_app.ConversionQueue(1, 4)
+            store.heartbeat('other-host:2:live')
+
+            def add(task_id, status, owner, input_exists=True):
+                task = _task(task_id)
+                task.input_file = os.path.join(tmpdir, f'{task_id}.gpx')
+                if input_exists:
+                    open(task.input_file, 'w').close()
+                task.status = status
+                task.owner = owner
+                store.save(task)
+
+            add('requeue', 'pending', 'old-host:1:dead')
+            add('running', 'processing', 'old-host:1:dead')
+            add('lost', 'pending', 'old-host:1:dead', input_exists=False)
+            add('alive', 'pending', 'other-host:2:live')
+            add('done', 'completed', 'old-host:1:dead')
+
+            assert web_app.recover_orphaned_tasks() == (2, 1)
+            web_app.conversion_queue.jobs.join()
+            assert sorted(ran) == ['requeue', 'running']
+            assert store.get('requeue').owner == web_app.worker_id()
+            assert store.get('running').status == 'pending'
+            assert store.get('lost').status == 'error'
+            assert '重启' in store.get('lost').error
+            assert store.get('alive').owner == 'other-host:2:live'
+            assert store.get('done').status == 'completed'
+
+            # 已接管的任务属于仍有心跳的当前进程，不会重复接管
+            assert web_app.recover_orphaned_tasks() == (0, 0)
+            assert not store.claim('alive', 'old-host:1:dead', 'another-host:3:x')
+    finally:
+        web_app.conversion_tasks = saved_tasks
+        web_app.conversion_queue = saved_queue
+        web_app.perform_conversion = original
+    print("✅ 遗留任务已接管")
+
+
+def test_old_database_migrated():
+    """旧版本数据库自动添加owner列，原有任务视为遗留任务"""
+    print("🧪 测试旧数据库迁移...")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_path = os.path.join(tmpdir, 'tasks.db')
+        store = SQLiteTaskStore(db_path, web_app.ConversionTask)
+        store.save(_task('legacy'))
+        connection = sqlite3.connect(db_path)
+        connection.execute('ALTER TABLE tasks DROP COLUMN owner')
+        connection.commit()
+        connection.close()
+
+        reopened = SQLiteTaskStore(db_path, web_app.ConversionTask)
+        assert reopened.get('legacy').owner is None
+        assert [task.task_id for task in reopened.orphaned(['pending'], 60)] == ['legacy']
+        reopened.heartbeat('host:1:boot')
+        assert reopened.claim('legacy', None, 'host:1:boot')
+        assert reopened.orphaned(['pending'], 60) == []
+        # 心跳超时后再次视为遗留任务
+        time.sleep(0.05)
+        assert [task.task_id for task in reopened.orphaned(['pending'], 0.01)] == ['legacy']
+    print("✅ 迁移后可以查询和接管")
+
+
+if __name__ == '__main__':
+    test_tasks_survive_new_store_instance()
+    test_created_before_and_counts()
+    test_updates_touch_only_changed_columns()
+    test_orphaned_tasks_recovered()
+    test_old_database_migrated()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试流式TCX写出
+"""
+
+import io
+from gpx_to_tcx import GPXToTCXConverter, Track, TCX_CHUNK_POINTS
+
+
+def _synthetic_track(count):
+    """生成一条匀速直线轨迹"""
+    converter = GPXToTCXConverter({'random_seed': 5})
+    raw_points = [
+        (f'{30 + i * 2e-5:.6f}', '120.0', '10', '2024-12-25T06:00:00Z')
+        for i in range(count)
+    ]
+    track = converter._build_track(raw_points)
+    return converter, track
+
+
+def test_write_matches_generate():
+    """写入文件对象的内容与一次性生成的字符串一致"""
+    print("🧪 对比流式写出和完整字符串...")
+    converter = GPXToTCXConverter({'random_seed': 5})
+    track = converter.load_track("测试轨迹.gpx")
+    metrics = converter.calculate_metrics(track)
+    simulation = converter.simulate_series(metrics['speeds'])
+
+    content = converter.generate_tcx_content(track, metrics, simulation)
+    buffer = io.StringIO()
+    written = converter.write_tcx(track, metrics, buffer, simulation)
+    assert buffer.getvalue() == content
+    assert written == len(content)
+    assert content.startswith('<?xml') and content.endswith('</TrainingCenterDatabase>')
+    print(f"✅ 写出 {written} 个字符，内容一致")
+
+
+def test_chunks_are_bounded():
+    """每个片段最多包含TCX_CHUNK_POINTS个轨迹点"""
+    print("🧪 测试片段大小...")
+    converter, track = _synthetic_track(TCX_CHUNK_POINTS * 4 + 10)
+    assert isinstance(track, Track)
+    metrics = converter.calculate_metrics(track)
+
+    chunks = list(converter.iter_tcx_chunks(track, metrics))
+    counts = [chunk.count('<Trackpoint>') for chunk in chunks]
+    print(f"   {len(chunks)} 个片段, 最大 {max(counts)} 个轨迹点")
+    assert sum(counts) == len(track)
+    assert max(counts) == TCX_CHUNK_POINTS
+    assert len(chunks) >= 5
+    print("✅ 片段大小有上限")
+
+
+def test_empty_track():
+    """空轨迹不产生任何内容"""
+    converter = GPXToTCXConverter()
+    assert list(converter.iter_tcx_chunks([], {})) == []
+    assert converter.generate_tcx_content([], {}) == ""
+
+
+if __name__ == '__main__':
+    test_write_matches_generate()
+    test_chunks_are_bounded()
+    test_empty_track()
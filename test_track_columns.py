@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试列式轨迹Track及旧接口兼容
+"""
+
+import tracemalloc
+from datetime import datetime, timedelta
+from gpx_to_tcx import GPXToTCXConverter, Track
+
+
+def _sample_points(count):
+    """生成字典形式的测试轨迹点"""
+    start = datetime(2025, 3, 1, 7, 0, 0)
+    return [{
+        'lat': 31.2304 + i * 1e-5,
+        'lon': 121.4737 + i * 1e-5,
+        'ele': 10.0 + i % 7,
+        'time': start + timedelta(seconds=i)
+    } for i in range(count)]
+
+
+def test_round_trip_adapter():
+    """字典列表与Track互相转换后数据不变"""
+    print("🧪 测试Track适配器...")
+    points = _sample_points(5)
+    track = Track.from_points(points)
+    assert len(track) == 5
+    assert track.start_time == points[0]['time']
+    assert list(track.offsets) == [0.0, 1.0, 2.0, 3.0, 4.0]
+    assert track.to_points() == points
+    assert track[-1]['time'] == points[-1]['time']
+    print("✅ 适配器转换一致")
+
+
+def test_metrics_same_for_track_and_list():
+    """Track和字典列表计算出相同的指标，旧列表仍写回累计距离"""
+    print("🧪 测试指标计算...")
+    converter = GPXToTCXConverter()
+    points = _sample_points(50)
+    track = Track.from_points(points)
+    
+    list_metrics = converter.calculate_metrics(points)
+    track_metrics = converter.calculate_metrics(track)
+    assert list_metrics == track_metrics
+    assert points[-1]['cumulative_distance'] == track.cumulative_distance[-1]
+    assert points[0]['cumulative_distance'] == 0
+    print(f"✅ 总距离 {track_metrics['total_distance']:.2f} 米，两种方式一致")
+
+
+def test_track_memory_per_point():
+    """Track每点内存占用远低于字典列表"""
+    print("🧪 测试每点内存占用...")
+    count = 20000
+    points = _sample_points(count)
+    
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    track = Track.from_points(points)
+    track.cumulative_distance = track.offsets[:]
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    track_bytes = (after - before) / count
+    
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    dict_points = _sample_points(count)
+    for point in dict_points:
+        point['cumulative_distance'] = 0.0
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    dict_bytes = (after - before) / count
+    
+    print(f"   Track: {track_bytes:.1f} 字节/点, dict: {dict_bytes:.1f} 字节/点")
+    assert track_bytes * 5 <= dict_bytes
+    print("✅ 列式存储显著降低内存")
+
+
+def test_convert_with_string_start_time():
+    """字符串形式的开始时间在解析时生效，生成TCX不再出错"""
+    print("🧪 测试字符串开始时间...")
+    converter = GPXToTCXConverter({'start_time': '2025-01-15 09:00:00'})
+    track = converter.load_track("测试轨迹.gpx")
+    metrics = converter.calculate_metrics(track)
+    content = converter.generate_tcx_content(track, metrics)
+    assert '<Id>2025-01-15T09:00:00.000Z</Id>' in content
+    print("✅ 开始时间已应用")
+
+
+if __name__ == '__main__':
+    test_round_trip_adapter()
+    test_metrics_same_for_track_and_list()
+    test_track_memory_per_point()
+    test_convert_with_string_start_time()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试轨迹简化
+"""
+
+import math
+import os
+import random
+import tempfile
+from gpx_to_tcx import GPXToTCXConverter, Track, simplify_track, haversine_segments
+
+
+def _track(coords):
+    track = Track(None)
+    for i, (lat, lon) in enumerate(coords):
+        track.append(lat, lon, float(i), float(i))
+    return track
+
+
+def _noisy_track(count, noise=2e-7, seed=1):
+    """约3 m/s、航向缓慢变化并带GPS抖动的轨迹"""
+    rng = random.Random(seed)
+    lat, lon, heading = 30.0, 120.0, 0.0
+    coords = []
+    for _ in range(count):
+        heading += rng.gauss(0, 0.02)
+        lat += math.cos(heading) * 2.7e-5 + rng.gauss(0, noise)
+        lon += math.sin(heading) * 3.1e-5 + rng.gauss(0, noise)
+        coords.append((lat, lon))
+    return _track(coords)
+
+
+def _length(track):
+    return haversine_segments(track.lat, track.lon)[1][-1]
+
+
+def test_collinear_points_removed():
+    """共线的中间点全部删除，端点保留"""
+    print("🧪 测试共线点简化...")
+    track = _track([(30 + i * 1e-5, 120.0) for i in range(100)])
+    simplified = simplify_track(track, 1.0)
+    assert list(simplified.lat) == [track.lat[0], track.lat[-1]]
+    assert list(simplified.ele) == [0.0, 99.0]
+    assert list(simplified.offsets) == [0.0, 99.0]
+    print("✅ 100 -> 2 个点")
+
+
+def test_corners_beyond_tolerance_kept():
+    """偏离超过容差的拐点保留，折返点不会被当作共线点删除"""
+    print("🧪 测试拐点保留...")
+    out_and_back = _track([(30.0, 120.0), (30.001, 120.0), (30.002, 120.0), (30.001, 120.0), (30.0, 120.0)])
+    simplified = simplify_track(out_and_back, 5.0)
+    assert 30.002 in simplified.lat
+    assert len(simplified) == 3
+
+    assert simplify_track(out_and_back, 0) is out_and_back
+    print("✅ 拐点保留正确")
+
+
+def test_distance_error_is_bounded():
+    """简化后的总距离误差不超过设定的上限"""
+    print("🧪 测试距离误差上限...")
+    track = _noisy_track(5000, noise=1e-6)
+    original = _length(track)
+    for max_error in (0.005, 0.001):
+        simplified = simplify_track(track, 20.0, max_error)
+        error = (original - _length(simplified)) / original
+        print(f"   上限 {max_error:.1%}: {len(track)} -> {len(simplified)} 个点, 误差 {error:.3%}")
+        assert len(simplified) < len(track) / 2
+        assert 0 <= error <= max_error * 1.01
+    print("✅ 距离误差在上限内")
+
+
+def test_convert_with_simplification():
+    """convert在解析后执行简化阶段"""
+    print("🧪 测试转换流程中的简化...")
+    converter = GPXToTCXConverter({'simplify_tolerance': 2.0, 'quiet': True})
+    with tempfile.TemporaryDirectory() as tmpdir:
+        assert converter.convert("测试轨迹.gpx", os.path.join(tmpdir, 'out.tcx'))
+    assert list(converter.profile) == ['parse', 'simplify', 'metrics', 'simulate', 'serialize']
+    assert converter.profile['metrics']['points'] <= converter.profile['parse']['points']
+    print("✅ 简化阶段已执行")
+
+
+def test_web_config_is_clamped():
+    """上传表单的简化容差限制在0到50米之间"""
+    import web_app
+    assert web_app.sanitize_config({'simplify_tolerance': '2.5'})['simplify_tolerance'] == 2.5
+    assert web_app.sanitize_config({'simplify_tolerance': '-3'})['simplify_tolerance'] == 0.0
+    assert web_app.sanitize_config({'simplify_tolerance': '500'})['simplify_tolerance'] == 50.0
+    assert web_app.sanitize_config({'simplify_tolerance': 'abc'})['simplify_tolerance'] == 0.0
+
+
+if __name__ == '__main__':
+    test_collinear_points_removed()
+    test_corners_beyond_tolerance_kept()
+    test_distance_error_is_bounded()
+    test_convert_with_simplification()
+    test_web_config_is_clamped()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试单次扫描的轨迹点解析
+"""
+
+import os
+import tempfile
+import time
+from datetime import datetime
+from gpx_to_tcx import GPXToTCXConverter
+
+
+def _write_gpx(trkpts):
+    """写入临时GPX文件并返回路径"""
+    content = '''<?xml version="1.0" encoding="UTF-8"?>
+<gpx version="1.1" creator="test">
+  <trk>
+    <trkseg>
+''' + '\n'.join(trkpts) + '''
+    </trkseg>
+  </trk>
+</gpx>'''
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.gpx', delete=False, encoding='utf-8') as f:
+        f.write(content)
+        return f.name
+
+
+def test_duplicate_coordinates():
+    """重复坐标的点应该各自取到自己的海拔"""
+    print("🧪 测试重复坐标...")
+    gpx_file = _write_gpx([
+        '<trkpt lat="31.2304" lon="121.4737"><ele>10</ele><time>2024-12-25T06:00:00Z</time></trkpt>',
+        '<trkpt lat="31.2305" lon="121.4738"><ele>20</ele><time>2024-12-25T06:00:01Z</time></trkpt>',
+        '<trkpt lat="31.2304" lon="121.4737"><ele>30</ele><time>2024-12-25T06:00:02Z</time></trkpt>',
+    ])
+    try:
+        points = GPXToTCXConverter().parse_gpx_file(gpx_file)
+        elevations = [p['ele'] for p in points]
+        print(f"   海拔: {elevations}")
+        assert elevations == [10.0, 20.0, 30.0]
+        print("✅ 重复坐标解析正确")
+    finally:
+        os.unlink(gpx_file)
+
+
+def test_self_closing_and_mixed_forms():
+    """自闭合和开闭标签混合出现时都能被解析"""
+    print("🧪 测试自闭合标签...")
+    gpx_file = _write_gpx([
+        '<trkpt lat="39.9042" lon="116.4074"/>',
+        '<trkpt lon="116.4084" lat="39.9052">\n  <ele>52.5</ele>\n</trkpt>',
+        '<trkpt lat="39.9062" lon="116.4094" />',
+    ])
+    try:
+        converter = GPXToTCXConverter({'start_time': datetime(2025, 1, 1, 8, 0, 0)})
+        points = converter.parse_gpx_file(gpx_file)
+        assert len(points) == 3
+        assert points[1]['lat'] == 39.9052 and points[1]['lon'] == 116.4084
+        assert [p['ele'] for p in points] == [0.0, 52.5, 0.0]
+        assert points[2]['time'] == datetime(2025, 1, 1, 8, 0, 2)
+        print("✅ 混合标签格式解析正确")
+    finally:
+        os.unlink(gpx_file)
+
+
+def test_large_track_parses_quickly():
+    """大轨迹的解析耗时应随点数线性增长"""
+    print("🧪 测试大轨迹解析耗时...")
+    count = 20000
+    gpx_file = _write_gpx([
+        f'<trkpt lat="{30 + i * 1e-5:.6f}" lon="{120 + i * 1e-5:.6f}"><ele>{i % 100}</ele>'
+        f'<time>2024-12-25T06:00:00Z</time></trkpt>'
+        for i in range(count)
+    ])
+    try:
+        started = time.perf_counter()
+        points = GPXToTCXConverter().parse_gpx_file(gpx_file)
+        elapsed = time.perf_counter() - started
+        print(f"   {count} 个点耗时 {elapsed:.3f} 秒")
+        assert len(points) == count
+        assert points[-1]['ele'] == float((count - 1) % 100)
+        assert elapsed < 5
+        print("✅ 大轨迹解析完成")
+    finally:
+        os.unlink(gpx_file)
+
+
+if __name__ == '__main__':
+    test_duplicate_coordinates()
+    test_self_closing_and_mixed_forms()
+    test_large_track_parses_quickly()
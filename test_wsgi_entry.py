@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试WSGI入口和后台服务启动
+"""
+
+import os
+import runpy
+import subprocess
+import sys
+import tempfile
+import threading
+import web_app
+
+
+def _cleanup_threads():
+    return [t for t in threading.enumerate() if t.name == 'cleanup-scheduler']
+
+
+def test_background_services_start_once_per_process():
+    """导入模块不启动线程，应用工厂在同一进程中只启动一次后台服务"""
+    print("🧪 测试后台服务启动...")
+    import wsgi
+    assert wsgi.app is web_app.app
+    assert web_app._background_pid == os.getpid()
+    web_app.create_app()
+    web_app.start_background_services()
+    assert len(_cleanup_threads()) == 1
+
+    # 模拟fork后的子进程：进程ID不同时重新启动
+    saved = web_app._background_pid
+    web_app._background_pid = -1
+    try:
+        web_app.start_background_services()
+        assert web_app._background_pid == os.getpid()
+        assert len(_cleanup_threads()) == 2
+    finally:
+        web_app._background_pid = saved
+    print("✅ 每个进程只启动一次")
+
+
+def test_import_does_not_open_task_store():
+    """导入web_app不创建任务数据库，create_app时才打开"""
+    print("🧪 测试导入无副作用...")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_path = os.path.join(tmpdir, 'tasks.db')
+        script = (
+            "import os, sys, web_app\n"
+            "db_path = sys.argv[1]\n"
+            "assert not os.path.exists(db_path)\n"
+            "assert not web_app.conversion_tasks.is_open\n"
+            "web_app.create_app()\n"
+            "assert os.path.exists(db_path)\n"
+        )
+        env = dict(os.environ, TASK_STORE='sqlite', TASK_DB_PATH=db_path)
+        result = subprocess.run([sys.executable, '-c', script, db_path], env=env,
+                                capture_output=True, text=True, timeout=60)
+        assert result.returncode == 0, result.stderr
+    print("✅ 任务存储延迟打开")
+
+
+def test_gunicorn_config():
+    """Gunicorn配置按CPU核数设置进程数，可由环境变量覆盖"""
+    print("🧪 测试Gunicorn配置...")
+    config = runpy.run_path('gunicorn.conf.py')
+    assert config['workers'] == int(os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 1))
+    assert config['threads'] >= 1
+    assert config['worker_class'] == 'gthread'
+    assert config['bind'].startswith('0.0.0.0:')
+    # 后台服务由各工作进程中的create_app()启动，不在主进程中预加载
+    assert config['preload_app'] is False
+    assert 'post_fork' not in config
+    print(f"✅ {config['workers']} 个进程 x {config['threads']} 个线程")
+
+
+if __name__ == '__main__':
+    test_background_services_start_once_per_process()
+    test_import_does_not_open_task_store()
+    test_gunicorn_config()
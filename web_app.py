@@ -1,33 +1,65 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-from flask import Flask, render_template, request, jsonify, send_file, flash, redirect, url_for, abort
+from flask import Flask, Request, Response, g, stream_with_context, render_template, request, jsonify, send_file, flash, redirect, url_for, abort
+import gzip
+import heapq
+import io
+import zlib
 from werkzeug.utils import secure_filename
 import os
+import socket
 import tempfile
 import uuid
 import shutil
 from datetime import datetime, timedelta
 import json
-from gpx_to_tcx import GPXToTCXConverter
+from gpx_to_tcx import GPXToTCXConverter, run_conversion_job, GZIP_COMPRESS_LEVEL
+from task_store import LazyTaskStore
+from result_cache import ResultCache, gpx_digest
+from telemetry import Registry
 import threading
+import queue
 import time
 import logging
 from pathlib import Path
 import psutil
 import requests
 from collections import defaultdict
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
 # 应用配置常量
 APP_CONFIG = {
     'SECRET_KEY': 'gpx_to_tcx_converter_2025',
-    'MAX_CONTENT_LENGTH': 16 * 1024 * 1024,  # 16MB
+    'MAX_CONTENT_LENGTH': int(os.environ.get('MAX_CONTENT_LENGTH', 64 * 1024 * 1024)),  # 64MB，轨迹按列存储，内存占用不再随文件线性膨胀
     'UPLOAD_FOLDER': 'uploads',
     'OUTPUT_FOLDER': 'outputs',
     'ALLOWED_EXTENSIONS': {'gpx'},
     'DEFAULT_PORT': 8888,
     'CLEANUP_INTERVAL': 3600,  # 1小时
-    'FILE_RETENTION_HOURS': 24  # 24小时
+    'FILE_RETENTION_HOURS': 24,  # 24小时
+    'COMPRESS_OUTPUTS': os.environ.get('COMPRESS_OUTPUTS', '1') != '0',  # 输出文件以.tcx.gz压缩存储
+    'EXECUTION_MODE': os.environ.get('EXECUTION_MODE', 'thread'),  # thread: 线程内转换；process: 进程池转换
+    # 并发转换数；进程模式下默认使用全部CPU核
+    'WORKER_COUNT': int(os.environ.get('WORKER_COUNT',
+                                       (os.cpu_count() or 2) if os.environ.get('EXECUTION_MODE') == 'process' else 2)),
+    'QUEUE_SIZE': int(os.environ.get('QUEUE_SIZE', 32)),  # 排队等待的转换任务上限
+    'RETRY_AFTER_SECONDS': 10,  # 队列已满时建议客户端重试的间隔
+    'SSE_POLL_SECONDS': 2,  # 进度推送连接在没有本进程通知时重新读取任务存储的间隔
+    'SSE_HEARTBEAT_SECONDS': 15,  # 无状态变化时发送保活注释的间隔
+    'SSE_MAX_SECONDS': 30,  # 单个推送连接的最长时间，之后前端改为轮询，避免长期占用工作线程
+    # 每个进程同时打开的推送连接上限，需明显小于Gunicorn线程数，为上传和下载请求保留线程
+    'SSE_MAX_STREAMS': int(os.environ.get('SSE_MAX_STREAMS',
+                                          max(1, int(os.environ.get('GUNICORN_THREADS', 4)) // 2))),
+    'TASK_STORE': os.environ.get('TASK_STORE', 'sqlite'),  # sqlite: 多进程共享、重启后保留；memory: 仅当前进程
+    'TASK_DB_PATH': os.environ.get('TASK_DB_PATH', 'tasks.db'),
+    'TASK_HEARTBEAT_SECONDS': 10,  # 工作进程心跳间隔，同时检查其他进程遗留的任务
+    'TASK_STALE_SECONDS': 60,  # 超过该时间没有心跳的进程视为已退出，其未完成任务由其他进程接管
+    'HEALTH_SAMPLE_SECONDS': 5,  # 后台采集系统资源和任务计数的间隔
+    'CACHE_FOLDER': os.environ.get('CACHE_FOLDER', 'cache'),
+    'CACHE_MAX_BYTES': int(os.environ.get('CACHE_MAX_BYTES', 256 * 1024 * 1024))  # 结果缓存总大小上限，0表示禁用
 }
 
 # HTTP状态码常量
@@ -35,7 +67,9 @@ HTTP_STATUS = {
     'OK': 200,
     'BAD_REQUEST': 400,
     'NOT_FOUND': 404,
-    'INTERNAL_SERVER_ERROR': 500
+    'TOO_MANY_REQUESTS': 429,
+    'INTERNAL_SERVER_ERROR': 500,
+    'SERVICE_UNAVAILABLE': 503
 }
 
 # 错误消息常量
@@ -47,7 +81,8 @@ ERROR_MESSAGES = {
     'UPLOAD_FAILED': '上传失败',
     'CONVERSION_FAILED': '转换失败',
     'FILE_NOT_FOUND': '文件不存在或已被删除',
-    'CONVERSION_NOT_COMPLETED': '转换尚未完成'
+    'CONVERSION_NOT_COMPLETED': '转换尚未完成',
+    'QUEUE_FULL': '服务器繁忙，转换队列已满，请稍后重试'
 }
 
 # 默认转换器配置
@@ -64,10 +99,19 @@ DEFAULT_CONVERTER_CONFIG = {
     'max_power': 300,
     'calories_per_km': 60,
     'weight': 70,
-    'target_pace': '5:30'
+    'target_pace': '5:30',
+    'simplify_tolerance': 0.0  # 轨迹简化容差 (米)，0表示不简化
 }
 
+class ConverterRequest(Request):
+    """/convert的上传内容保存在内存中，不使用临时文件（大小受MAX_CONTENT_LENGTH限制）"""
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if self.endpoint == 'convert_file':
+            return io.BytesIO()
+        return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+
 app = Flask(__name__)
+app.request_class = ConverterRequest
 app.secret_key = APP_CONFIG['SECRET_KEY']
 app.config['MAX_CONTENT_LENGTH'] = APP_CONFIG['MAX_CONTENT_LENGTH']
 
@@ -76,18 +120,46 @@ UPLOAD_FOLDER = APP_CONFIG['UPLOAD_FOLDER']
 OUTPUT_FOLDER = APP_CONFIG['OUTPUT_FOLDER']
 MAX_FILE_SIZE = APP_CONFIG['MAX_CONTENT_LENGTH']
 ALLOWED_EXTENSIONS = APP_CONFIG['ALLOWED_EXTENSIONS']
+COMPRESS_OUTPUTS = APP_CONFIG['COMPRESS_OUTPUTS']
+CACHE_FOLDER = APP_CONFIG['CACHE_FOLDER']
+
+# 相同GPX和配置的转换结果缓存
+result_cache = ResultCache(CACHE_FOLDER, APP_CONFIG['CACHE_MAX_BYTES'], '.tcx.gz' if COMPRESS_OUTPUTS else '.tcx')
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# 确保文件夹存在
-for folder in [UPLOAD_FOLDER, OUTPUT_FOLDER]:
-    if not os.path.exists(folder):
-        os.makedirs(folder)
+# 监控指标（/metrics）
+metrics = Registry()
+STAGE_SECONDS = metrics.histogram('gpx_conversion_stage_seconds', '转换各阶段耗时（秒）', ['stage'])
+CONVERSION_POINTS_PER_SECOND = metrics.histogram(
+    'gpx_conversion_points_per_second', '每次转换的轨迹点吞吐量（点/秒）',
+    buckets=(1e3, 5e3, 1e4, 5e4, 1e5, 2.5e5, 5e5, 1e6, 2.5e6))
+CONVERSION_POINTS = metrics.counter('gpx_conversion_points_total', '已转换的轨迹点总数')
+CONVERSIONS = metrics.counter('gpx_conversions_total', '按结果统计的转换任务数', ['result'])
+QUEUE_DEPTH = metrics.gauge('gpx_conversion_queue_depth', '排队等待的转换任务数',
+                            function=lambda: conversion_queue.depth())
+ACTIVE_WORKERS = metrics.gauge('gpx_conversion_active_workers', '正在执行转换的工作线程数',
+                               function=lambda: conversion_queue.active)
+CACHE_REQUESTS = metrics.counter('gpx_cache_requests_total', '缓存查询次数', ['cache', 'result'])
+UPLOAD_SIZE = metrics.histogram('gpx_upload_size_bytes', '上传请求大小（字节）', ['route'],
+                                buckets=(10 * 1024, 100 * 1024, 512 * 1024, 1024 ** 2, 5 * 1024 ** 2,
+                                         10 * 1024 ** 2, 25 * 1024 ** 2, 64 * 1024 ** 2))
+REQUEST_SECONDS = metrics.histogram('gpx_http_request_duration_seconds', '请求处理耗时（秒，流式响应为首字节前）',
+                                    ['route', 'method'])
+REQUESTS = metrics.counter('gpx_http_requests_total', '按路由和状态码统计的请求数', ['route', 'method', 'status'])
 
-# 存储转换任务状态
-conversion_tasks = {}
+def record_conversion_metrics(profile):
+    """记录一次转换的分阶段耗时和吞吐量"""
+    total_time = 0.0
+    for stage, record in profile.items():
+        STAGE_SECONDS.observe(record['wall_time'], stage=stage)
+        total_time += record['wall_time']
+    points = profile.get('parse', {}).get('points', 0)
+    CONVERSION_POINTS.inc(points)
+    if total_time > 0:
+        CONVERSION_POINTS_PER_SECOND.observe(points / total_time)
 
 # 存储埋点数据
 analytics_data = {
@@ -137,6 +209,46 @@ def validate_file_size(file):
     
     return True, None
 
+def build_output_path(task_id, output_filename):
+    """
+    生成输出文件路径，启用压缩时以.tcx.gz存储
+    
+    Args:
+        task_id (str): 任务ID
+        output_filename (str): 下载时使用的TCX文件名
+        
+    Returns:
+        str: 输出文件路径
+    """
+    suffix = '.gz' if COMPRESS_OUTPUTS else ''
+    return os.path.join(OUTPUT_FOLDER, f"{task_id}_{output_filename}{suffix}")
+
+def send_tcx_file(path, download_name):
+    """
+    发送TCX文件，压缩存储的文件按客户端能力选择传输方式
+    
+    客户端接受gzip时直接发送压缩文件并设置Content-Encoding，
+    否则边读边解压，以普通TCX流式返回。
+    
+    Args:
+        path (str): 输出文件路径（.tcx或.tcx.gz）
+        download_name (str): 下载文件名
+        
+    Returns:
+        Response: Flask响应
+    """
+    if not path.endswith('.gz'):
+        return send_file(path, as_attachment=True, download_name=download_name, mimetype='application/xml')
+    
+    if request.accept_encodings['gzip']:
+        response = send_file(path, as_attachment=True, download_name=download_name, mimetype='application/xml')
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = send_file(gzip.open(path, 'rb'), as_attachment=True,
+                             download_name=download_name, mimetype='application/xml')
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
 def sanitize_config(config):
     """清理和验证配置参数"""
     sanitized = DEFAULT_CONVERTER_CONFIG.copy()
@@ -157,6 +269,13 @@ def sanitize_config(config):
             except (ValueError, TypeError):
                 pass  # 使用默认值
     
+    # 轨迹简化容差允许为0（不简化），上限50米避免轨迹失真
+    if 'simplify_tolerance' in config:
+        try:
+            sanitized['simplify_tolerance'] = min(max(float(config['simplify_tolerance']), 0.0), 50.0)
+        except (ValueError, TypeError):
+            pass  # 使用默认值
+    
     # 验证字符串类型参数
     string_fields = ['activity_type', 'sub_sport', 'device_name', 'device_version', 'target_pace']
     
@@ -171,6 +290,68 @@ def sanitize_config(config):
     
     return sanitized
 
+class TaskEventBus:
+    """
+    进程内任务更新通知
+    
+    转换线程更新任务时publish，进度推送连接在wait中等待下一次更新。
+    任务可能在其他进程中转换，因此等待带超时，超时后由调用方重新读取任务存储。
+    """
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.versions = {}  # task_id -> 更新次数
+        self.stages = {}    # task_id -> 最近完成的转换阶段
+    
+    def publish(self, task_id, stage=None):
+        """通知任务已更新"""
+        with self.condition:
+            self.versions[task_id] = self.versions.get(task_id, 0) + 1
+            if stage is not None:
+                self.stages[task_id] = stage
+            self.condition.notify_all()
+    
+    def version(self, task_id):
+        with self.condition:
+            return self.versions.get(task_id, 0)
+    
+    def stage(self, task_id):
+        with self.condition:
+            return self.stages.get(task_id)
+    
+    def wait(self, task_id, version, timeout):
+        """
+        等待任务更新
+        
+        Args:
+            task_id (str): 任务ID
+            version (int): 调用方已看到的版本号
+            timeout (float): 最长等待秒数
+            
+        Returns:
+            int: 最新版本号，与version相同表示超时
+        """
+        with self.condition:
+            self.condition.wait_for(lambda: self.versions.get(task_id, 0) != version, timeout)
+            return self.versions.get(task_id, 0)
+    
+    def discard(self, task_id):
+        """任务删除后释放记录"""
+        with self.condition:
+            self.versions.pop(task_id, None)
+            self.stages.pop(task_id, None)
+
+task_events = TaskEventBus()
+
+# 各进程的工作进程标识（进程ID可能在重启后复用，附加随机启动ID区分）
+_worker_ids = {}
+
+def worker_id():
+    """返回当前进程的标识：主机名:进程ID:启动ID"""
+    pid = os.getpid()
+    if pid not in _worker_ids:
+        _worker_ids[pid] = f"{socket.gethostname()}:{pid}:{uuid.uuid4().hex[:8]}"
+    return _worker_ids[pid]
+
 class ConversionTask:
     """转换任务类"""
     def __init__(self, task_id, input_file, output_file, config):
@@ -184,6 +365,51 @@ class ConversionTask:
         self.error = None
         self.created_at = datetime.now()
         self.completed_at = None
+        self.profile = None  # 转换器的分阶段耗时数据
+        self.queue_seq = None  # 进入转换队列的序号
+        self.owner = worker_id()  # 负责执行任务的工作进程
+        self.store = None  # 所属任务存储，update()时写回
+        
+    def update(self, stage=None, **changes):
+        """
+        修改任务属性，只把修改的字段写回所属的任务存储，并通知进度推送连接
+        
+        Args:
+            stage (str): 刚完成的转换阶段，随本次通知一起推送
+            **changes: 要修改的任务属性
+        """
+        for name, value in changes.items():
+            setattr(self, name, value)
+        if self.store is not None:
+            self.store.update(self.task_id, changes)
+        task_events.publish(self.task_id, stage)
+    
+    def to_record(self):
+        """转换为任务存储使用的字段字典"""
+        return {
+            'task_id': self.task_id,
+            'input_file': self.input_file,
+            'output_file': self.output_file,
+            'config': self.config,
+            'status': self.status,
+            'progress': self.progress,
+            'message': self.message,
+            'error': self.error,
+            'created_at': self.created_at,
+            'completed_at': self.completed_at,
+            'profile': self.profile,
+            'queue_seq': self.queue_seq,
+            'owner': self.owner
+        }
+    
+    @classmethod
+    def from_record(cls, record):
+        """由任务存储中的字段字典恢复任务"""
+        task = cls(record['task_id'], record['input_file'], record['output_file'], record['config'])
+        for name in ('status', 'progress', 'message', 'error', 'created_at', 'completed_at', 'profile', 'queue_seq',
+                     'owner'):
+            setattr(task, name, record[name])
+        return task
         
     def to_dict(self):
         return {
@@ -193,93 +419,262 @@ class ConversionTask:
             'message': self.message,
             'error': self.error,
             'created_at': self.created_at.isoformat(),
-            'completed_at': self.completed_at.isoformat() if self.completed_at else None
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None,
+            'profile': self.profile
         }
 
+# 存储转换任务状态（首次使用时才打开数据库）
+conversion_tasks = LazyTaskStore(APP_CONFIG['TASK_STORE'], APP_CONFIG['TASK_DB_PATH'], ConversionTask)
+
+def build_converter_config(task_config):
+    """
+    由任务配置生成转换器配置
+    
+    Args:
+        task_config (dict): sanitize_config处理后的任务配置
+        
+    Returns:
+        dict: 可直接传给GPXToTCXConverter的配置（可序列化，可发送到工作进程）
+    """
+    # 应用配置，使用默认值作为后备
+    converter_config = {}
+    for key, default_value in DEFAULT_CONVERTER_CONFIG.items():
+        value = task_config.get(key, default_value)
+        # 对数值类型进行类型转换
+        if isinstance(default_value, int) and not isinstance(value, int):
+            try:
+                converter_config[key] = int(value)
+            except (ValueError, TypeError):
+                converter_config[key] = default_value
+                logger.warning(f"配置项 {key} 值无效: {value}，使用默认值: {default_value}")
+        else:
+            converter_config[key] = value
+    
+    # 缓存键派生的随机种子，保证相同输入的输出可复现
+    if task_config.get('random_seed') is not None:
+        converter_config['random_seed'] = task_config['random_seed']
+    
+    # 处理开始时间
+    start_time_str = task_config.get('start_time', '').strip()
+    if start_time_str:
+        try:
+            # 支持HTML datetime-local格式: 2024-01-01T10:30
+            if 'T' in start_time_str:
+                # HTML datetime-local 输入的是本地时间，直接解析为本地时间
+                # 移除可能的时区信息，确保按本地时间处理
+                clean_time_str = start_time_str.replace('Z', '').split('+')[0].split('-')[0] if '+' in start_time_str or 'Z' in start_time_str else start_time_str
+                start_time = datetime.fromisoformat(clean_time_str)
+            else:
+                start_time = datetime.strptime(start_time_str, '%Y-%m-%d %H:%M:%S')
+            
+            # 用户要求减去8小时来补偿时区差异
+            adjusted_time = start_time - timedelta(hours=8)
+            converter_config['start_time'] = adjusted_time
+            logger.info(f"设置自定义开始时间 (原始时间: {start_time}, 调整后: {adjusted_time})")
+        except (ValueError, TypeError) as e:
+            logger.warning(f"时间格式解析失败: {start_time_str}, 错误: {e}")
+            pass  # 使用GPX文件中的时间
+    
+    return converter_config
+
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+def get_process_pool():
+    """
+    获取进程池（首次使用时创建）
+    
+    使用spawn方式启动工作进程，避免在已有多个线程的进程中fork。
+    """
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(max_workers=APP_CONFIG['WORKER_COUNT'],
+                                                mp_context=multiprocessing.get_context('spawn'))
+            logger.info(f"进程池已启动，工作进程数: {APP_CONFIG['WORKER_COUNT']}")
+        return _process_pool
+
+def discard_process_pool(pool):
+    """
+    丢弃已损坏的进程池，下次转换时重新创建
+    
+    工作进程被杀死（如内存不足）后进程池不可再用，多个线程可能同时发现，
+    只有仍是当前进程池时才清除。
+    """
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is pool:
+            _process_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def run_in_thread(task, converter_config):
+    """在当前线程中转换，按阶段推进任务进度"""
+    converter = GPXToTCXConverter(converter_config)
+    
+    # 每个阶段结束时推进进度并记录耗时
+    stage_progress = {'parse': 70, 'metrics': 75, 'simulate': 80, 'serialize': 90}
+    
+    def on_stage(stage, record):
+        task.update(progress=stage_progress.get(stage, task.progress), stage=stage)
+        logger.info(f"任务 {task.task_id} 阶段 {stage}: {record['wall_time'] * 1000:.1f}ms, "
+                    f"CPU {record['cpu_time'] * 1000:.1f}ms, {record['points']} 个点")
+    
+    converter.stage_callback = on_stage
+    success = converter.convert(task.input_file, task.output_file)
+    return {
+        'success': success and os.path.exists(task.output_file),
+        'file_size': os.path.getsize(task.output_file) if os.path.exists(task.output_file) else 0,
+        'profile': converter.profile,
+        'uses_current_time': converter.uses_current_time,
+        'error': None
+    }
+
+def run_in_process(task, converter_config):
+    """在进程池中转换，当前线程等待结果"""
+    pool = get_process_pool()
+    try:
+        future = pool.submit(run_conversion_job, (task.input_file, task.output_file, converter_config))
+        result = future.result()
+    except BrokenProcessPool:
+        logger.error(f"任务 {task.task_id} 的转换进程异常退出，重建进程池")
+        discard_process_pool(pool)
+        return {'success': False, 'file_size': 0, 'profile': {}, 'uses_current_time': False,
+                'error': '转换进程异常退出（可能内存不足）'}
+    for stage, record in result['profile'].items():
+        logger.info(f"任务 {task.task_id} 阶段 {stage}: {record['wall_time'] * 1000:.1f}ms, "
+                    f"CPU {record['cpu_time'] * 1000:.1f}ms, {record['points']} 个点")
+    return result
+
 def perform_conversion(task):
     """执行转换任务"""
     try:
-        task.status = 'processing'
-        task.progress = 10
-        task.message = '正在初始化转换器...'
+        task.update(status='processing', progress=10, message='正在初始化转换器...')
         logger.info(f"开始转换任务 {task.task_id}")
         
-        # 创建转换器
-        converter = GPXToTCXConverter()
-        
         # 应用配置
-        task.progress = 20
-        task.message = '正在应用配置...'
-        
-        # 应用配置，使用默认值作为后备
-        config_updates = {}
-        for key, default_value in DEFAULT_CONVERTER_CONFIG.items():
-            value = task.config.get(key, default_value)
-            # 对数值类型进行类型转换
-            if isinstance(default_value, int) and not isinstance(value, int):
-                try:
-                    config_updates[key] = int(value)
-                except (ValueError, TypeError):
-                    config_updates[key] = default_value
-                    logger.warning(f"配置项 {key} 值无效: {value}，使用默认值: {default_value}")
-            else:
-                config_updates[key] = value
-        
-        converter.config.update(config_updates)
-        
-        # 处理开始时间
-        start_time_str = task.config.get('start_time', '').strip()
-        if start_time_str:
-            try:
-                # 支持HTML datetime-local格式: 2024-01-01T10:30
-                if 'T' in start_time_str:
-                    # HTML datetime-local 输入的是本地时间，直接解析为本地时间
-                    # 移除可能的时区信息，确保按本地时间处理
-                    clean_time_str = start_time_str.replace('Z', '').split('+')[0].split('-')[0] if '+' in start_time_str or 'Z' in start_time_str else start_time_str
-                    start_time = datetime.fromisoformat(clean_time_str)
-                else:
-                    start_time = datetime.strptime(start_time_str, '%Y-%m-%d %H:%M:%S')
-                
-                # 用户要求减去8小时来补偿时区差异
-                from datetime import timedelta
-                adjusted_time = start_time - timedelta(hours=8)
-                converter.config['start_time'] = adjusted_time
-                logger.info(f"设置自定义开始时间 (原始时间: {start_time}, 调整后: {adjusted_time})")
-            except (ValueError, TypeError) as e:
-                logger.warning(f"时间格式解析失败: {start_time_str}, 错误: {e}")
-                pass  # 使用GPX文件中的时间
+        task.update(progress=20, message='正在应用配置...')
+        converter_config = build_converter_config(task.config)
         
         logger.info(f"任务配置: {task.config}")
-        logger.info(f"转换器配置完成: {converter.config}")
-        
-        task.progress = 40
-        task.message = '正在解析GPX文件...'
+        logger.info(f"转换器配置完成: {converter_config}")
         
         # 执行转换
-        task.progress = 60
-        task.message = '转换中...'
+        task.update(progress=60, message='转换中...')
         
-        success = converter.convert(task.input_file, task.output_file)
-        
-        task.progress = 90
-        task.message = '保存文件...'
-        
-        if success and os.path.exists(task.output_file):
-            file_size = os.path.getsize(task.output_file)
-            task.progress = 100
-            task.status = 'completed'
-            task.message = f'转换完成！文件大小: {file_size/1024:.1f} KB'
-            task.completed_at = datetime.now()
+        if APP_CONFIG['EXECUTION_MODE'] == 'process':
+            result = run_in_process(task, converter_config)
+        else:
+            result = run_in_thread(task, converter_config)
+        task.update(profile=result['profile'], progress=90, message='保存文件...')
+        record_conversion_metrics(result['profile'])
+        
+        if result['success']:
+            file_size = result['file_size']
+            task.update(progress=100, status='completed',
+                        message=f'转换完成！文件大小: {file_size/1024:.1f} KB',
+                        completed_at=datetime.now())
             logger.info(f"转换任务 {task.task_id} 完成，输出文件: {task.output_file}")
+            CONVERSIONS.inc(result='completed')
+            # 没有配置开始时间且GPX中没有时间时，输出使用了转换时的当前时间，不能复用；
+            # 这类输入从不写入缓存，相同缓存键的查询也就不会命中
+            if task.config.get('cache_key') and not result['uses_current_time']:
+                try:
+                    result_cache.store(task.config['cache_key'], task.output_file)
+                except OSError as e:
+                    logger.warning(f"保存缓存结果失败: {str(e)}")
         else:
-            task.status = 'error'
-            task.error = '转换失败，请检查GPX文件格式'
+            if result['error']:
+                logger.warning(f"转换任务 {task.task_id} 失败: {result['error']}")
+            task.update(status='error', error='转换失败，请检查GPX文件格式')
+            CONVERSIONS.inc(result='error')
             
     except Exception as e:
         logger.error(f"转换任务 {task.task_id} 失败: {str(e)}")
-        task.status = 'error'
-        task.error = f'转换过程中出现错误: {str(e)}'
+        task.update(status='error', error=f'转换过程中出现错误: {str(e)}')
+        CONVERSIONS.inc(result='error')
         
+class ConversionQueue:
+    """
+    有界转换队列
+    
+    固定数量的工作线程从有界队列中取任务执行，避免突发上传时
+    启动大量CPU密集线程争抢GIL。队列已满时submit返回False。
+    """
+    def __init__(self, worker_count, max_size):
+        self.worker_count = max(1, worker_count)
+        self.jobs = queue.Queue(maxsize=max(1, max_size))
+        self.lock = threading.Lock()
+        self.submitted = 0  # 已入队的任务数
+        self.started = 0    # 已被工作线程取走的任务数
+        self.pending = {}  # 本进程中排队等待的任务ID -> 入队序号
+        self.active = 0  # 正在执行转换的工作线程数
+        self.workers = []
+    
+    def _ensure_workers(self):
+        """首次提交任务时启动工作线程"""
+        if self.workers:
+            return
+        for index in range(self.worker_count):
+            worker = threading.Thread(target=self._worker_loop, name=f'conversion-worker-{index}')
+            worker.daemon = True
+            worker.start()
+            self.workers.append(worker)
+    
+    def _worker_loop(self):
+        while True:
+            task = self.jobs.get()
+            with self.lock:
+                self.started += 1
+                self.active += 1
+                self.pending.pop(task.task_id, None)
+            try:
+                perform_conversion(task)
+            except Exception as e:
+                logger.error(f"转换任务 {task.task_id} 执行异常: {str(e)}")
+            finally:
+                with self.lock:
+                    self.active -= 1
+                self.jobs.task_done()
+    
+    def submit(self, task):
+        """
+        提交任务
+        
+        Returns:
+            bool: 是否成功入队，队列已满时为False
+        """
+        with self.lock:
+            self._ensure_workers()
+            try:
+                self.jobs.put_nowait(task)
+            except queue.Full:
+                return False
+            self.submitted += 1
+            queue_seq = self.submitted
+            self.pending[task.task_id] = queue_seq
+        # 在锁外写回任务存储，供其他进程查询
+        task.update(queue_seq=queue_seq)
+        return True
+    
+    def position(self, task):
+        """
+        返回排队任务的位置（1表示下一个执行），不在本进程队列中时返回0
+        """
+        with self.lock:
+            queue_seq = self.pending.get(task.task_id)
+            if queue_seq is None:
+                return 0
+            return max(0, queue_seq - self.started)
+    
+    def depth(self):
+        """当前排队的任务数"""
+        return self.jobs.qsize()
+    
+    def is_full(self):
+        return self.jobs.full()
+
+conversion_queue = ConversionQueue(APP_CONFIG['WORKER_COUNT'], APP_CONFIG['QUEUE_SIZE'])
+
 @app.route('/')
 def index():
     """主页"""
@@ -290,6 +685,15 @@ def analytics_dashboard():
     """埋点统计页面"""
     return render_template('analytics.html')
 
+def queue_full_response():
+    """转换队列已满时返回429，并通过Retry-After提示重试时间"""
+    retry_after = APP_CONFIG['RETRY_AFTER_SECONDS']
+    logger.warning(f"转换队列已满 ({conversion_queue.depth()} 个任务排队)，拒绝上传")
+    response = jsonify({'error': ERROR_MESSAGES['QUEUE_FULL'], 'retry_after': retry_after})
+    response.status_code = HTTP_STATUS['TOO_MANY_REQUESTS']
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
 @app.route('/upload', methods=['POST'])
 def upload_file():
     """处理文件上传"""
@@ -311,17 +715,17 @@ def upload_file():
                 error_msg = f"{error_msg} ({MAX_FILE_SIZE // (1024*1024)}MB)"
             return jsonify({'error': error_msg}), HTTP_STATUS['BAD_REQUEST']
         
+        # 记录上传大小分布
+        UPLOAD_SIZE.observe(request.content_length or 0, route=request.url_rule.rule)
+        
         # 生成任务ID
         task_id = str(uuid.uuid4())
-        
-        # 保存上传的文件
         filename = secure_filename(file.filename)
         input_path = os.path.join(UPLOAD_FOLDER, f"{task_id}_{filename}")
-        file.save(input_path)
         
         # 生成输出文件路径
         output_filename = filename.rsplit('.', 1)[0] + '.tcx'
-        output_path = os.path.join(OUTPUT_FOLDER, f"{task_id}_{output_filename}")
+        output_path = build_output_path(task_id, output_filename)
         
         # 获取并验证配置
         raw_config = {
@@ -337,6 +741,7 @@ def upload_file():
             'calories_per_km': request.form.get('calories_per_km', '60'),
             'weight': request.form.get('weight', '70'),
             'target_pace': request.form.get('target_pace', '5:30'),
+            'simplify_tolerance': request.form.get('simplify_tolerance', '0'),
             'start_time': request.form.get('start_time', '')
         }
         
@@ -359,37 +764,156 @@ def upload_file():
             'original_activity_type': activity_type
         })
         
-        # 创建转换任务
+        # 相同GPX内容和配置直接复用缓存结果
+        if result_cache.enabled:
+            cache_key = result_cache.make_key(gpx_digest(file.stream), config)
+            config.update({'random_seed': result_cache.seed_for(cache_key), 'cache_key': cache_key})
+            cache_hit = result_cache.fetch(cache_key, output_path)
+            CACHE_REQUESTS.inc(cache='result', result='hit' if cache_hit else 'miss')
+            if cache_hit:
+                file_size = os.path.getsize(output_path)
+                # 命中时不保存上传文件，input_path只用于生成下载文件名
+                task = ConversionTask(task_id, input_path, output_path, config)
+                task.status = 'completed'
+                task.progress = 100
+                task.message = f'转换完成（缓存结果）！文件大小: {file_size/1024:.1f} KB'
+                task.completed_at = datetime.now()
+                conversion_tasks[task_id] = task
+                register_task_files(task)
+                CONVERSIONS.inc(result='cached')
+                logger.info(f"转换任务 {task_id} 命中缓存 {cache_key[:12]}")
+                return jsonify({
+                    'task_id': task_id,
+                    'message': '文件上传成功，已使用缓存结果',
+                    'filename': filename,
+                    'queue_position': 0,
+                    'cached': True
+                })
+        
+        # 队列已满时直接拒绝，不保存上传文件
+        if conversion_queue.is_full():
+            return queue_full_response()
+        
+        # 保存上传的文件
+        file.save(input_path)
+        
+        # 创建转换任务并加入转换队列
         task = ConversionTask(task_id, input_path, output_path, config)
         conversion_tasks[task_id] = task
+        register_task_files(task)
         
-        # 启动转换线程
-        thread = threading.Thread(target=perform_conversion, args=(task,))
-        thread.daemon = True
-        thread.start()
+        if not conversion_queue.submit(task):
+            conversion_tasks.pop(task_id, None)
+            if os.path.exists(input_path):
+                os.remove(input_path)
+            return queue_full_response()
         
         return jsonify({
             'task_id': task_id,
             'message': '文件上传成功，开始转换...',
-            'filename': filename
+            'filename': filename,
+            'queue_position': conversion_queue.position(task)
         })
         
     except Exception as e:
         logger.error(f"文件上传失败: {str(e)}")
         return jsonify({'error': f"{ERROR_MESSAGES['UPLOAD_FAILED']}: {str(e)}"}), HTTP_STATUS['INTERNAL_SERVER_ERROR']
 
+def task_status(task):
+    """任务状态字典，排队中的任务附带排队位置"""
+    status = task.to_dict()
+    if task.status == 'pending':
+        position = conversion_queue.position(task)
+        status['queue_position'] = position
+        if position > 0:
+            status['message'] = f'排队中，前面还有 {position - 1} 个任务...'
+    return status
+
+# 推送连接占用一个工作线程，按进程限制同时打开的连接数
+sse_streams = threading.BoundedSemaphore(APP_CONFIG['SSE_MAX_STREAMS'])
+
+def format_sse(event, data):
+    """格式化一条Server-Sent Events消息"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
 @app.route('/status/<task_id>')
 def get_status(task_id):
-    """获取转换状态"""
+    """获取转换状态（轮询接口，作为推送不可用时的后备）"""
     task = conversion_tasks.get(task_id)
     if not task:
         return jsonify({'error': ERROR_MESSAGES['TASK_NOT_FOUND']}), HTTP_STATUS['NOT_FOUND']
     
-    return jsonify(task.to_dict())
+    return jsonify(task_status(task))
+
+@app.route('/status/<task_id>/stream')
+def stream_status(task_id):
+    """
+    推送转换状态（Server-Sent Events）
+    
+    状态变化时发送progress事件（data中含最近完成的阶段stage），
+    完成时发送completed、失败时发送failed并结束连接。
+    连接数达到SSE_MAX_STREAMS时返回503，前端回退到轮询。
+    """
+    if task_id not in conversion_tasks:
+        return jsonify({'error': ERROR_MESSAGES['TASK_NOT_FOUND']}), HTTP_STATUS['NOT_FOUND']
+    
+    if not sse_streams.acquire(blocking=False):
+        retry_after = APP_CONFIG['RETRY_AFTER_SECONDS']
+        logger.warning(f"推送连接已达上限 ({APP_CONFIG['SSE_MAX_STREAMS']})，拒绝任务 {task_id} 的推送请求")
+        return Response(f"retry: {retry_after * 1000}\n\n", status=HTTP_STATUS['SERVICE_UNAVAILABLE'],
+                        mimetype='text/event-stream',
+                        headers={'Retry-After': str(retry_after), 'Cache-Control': 'no-cache'})
+    
+    released = threading.Event()
+    
+    def release():
+        # 生成器结束和响应关闭都会调用，只释放一次
+        if not released.is_set():
+            released.set()
+            sse_streams.release()
+    
+    def generate():
+        try:
+            yield from stream_events()
+        finally:
+            release()
+    
+    def stream_events():
+        deadline = time.time() + APP_CONFIG['SSE_MAX_SECONDS']
+        last_status = None
+        last_sent = time.time()
+        # 先取版本号再读任务，读取之后的更新一定会唤醒wait
+        version = task_events.version(task_id)
+        while time.time() < deadline:
+            task = conversion_tasks.get(task_id)
+            if task is None:
+                yield format_sse('failed', {'error': ERROR_MESSAGES['TASK_NOT_FOUND']})
+                return
+            
+            status = task_status(task)
+            status['stage'] = task_events.stage(task_id)
+            if status != last_status:
+                event = {'completed': 'completed', 'error': 'failed'}.get(task.status, 'progress')
+                yield format_sse(event, status)
+                if event != 'progress':
+                    return
+                last_status = status
+                last_sent = time.time()
+            elif time.time() - last_sent >= APP_CONFIG['SSE_HEARTBEAT_SECONDS']:
+                yield ': keep-alive\n\n'
+                last_sent = time.time()
+            
+            version = task_events.wait(task_id, version, APP_CONFIG['SSE_POLL_SECONDS'])
+    
+    response = Response(generate(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # 客户端在第一条消息前断开时生成器不会执行，由响应关闭回调释放
+    response.call_on_close(release)
+    return response
 
 @app.route('/convert', methods=['POST'])
 def convert_file():
-    """直接转换文件（兼容性路由）"""
+    """直接转换文件（兼容性路由），上传内容在内存中解析，TCX边生成边返回，不落盘"""
     try:
         if 'file' not in request.files:
             return jsonify({'error': ERROR_MESSAGES['NO_FILE_SELECTED']}), HTTP_STATUS['BAD_REQUEST']
@@ -408,15 +932,11 @@ def convert_file():
                 error_msg = f"{error_msg} ({MAX_FILE_SIZE // (1024*1024)}MB)"
             return jsonify({'error': error_msg}), HTTP_STATUS['BAD_REQUEST']
         
-        # 生成临时文件名
-        task_id = str(uuid.uuid4())
-        filename = secure_filename(file.filename)
-        input_path = os.path.join(UPLOAD_FOLDER, f"{task_id}_{filename}")
-        file.save(input_path)
+        # 记录上传大小分布
+        UPLOAD_SIZE.observe(request.content_length or 0, route=request.url_rule.rule)
         
-        # 生成输出文件路径
+        filename = secure_filename(file.filename)
         output_filename = filename.rsplit('.', 1)[0] + '.tcx'
-        output_path = os.path.join(OUTPUT_FOLDER, f"{task_id}_{output_filename}")
         
         # 创建转换器并执行转换
         converter = GPXToTCXConverter()
@@ -437,33 +957,33 @@ def convert_file():
             'target_pace': '5:30'
         })
         
-        # 执行转换
-        success = converter.convert(input_path, output_path)
-        
-        if success and os.path.exists(output_path):
-            # 返回转换后的文件
-            return send_file(
-                output_path,
-                as_attachment=True,
-                download_name=output_filename,
-                mimetype='application/xml'
-            )
-        else:
+        # 直接从上传流解析，解析失败时还能返回错误状态码
+        prepared = converter.prepare(file.stream)
+        if prepared is None:
             return jsonify({'error': '转换失败'}), 500
+        
+        # TCX边生成边发送，不写入输出文件
+        chunks = (chunk.encode('utf-8') for chunk in converter.iter_tcx_chunks(*prepared))
+        headers = {'Content-Disposition': f'attachment; filename="{output_filename}"'}
+        if COMPRESS_OUTPUTS:
+            headers['Vary'] = 'Accept-Encoding'
+            if request.accept_encodings['gzip']:
+                headers['Content-Encoding'] = 'gzip'
+                chunks = gzip_chunks(chunks)
+        return Response(stream_with_context(chunks), mimetype='application/xml', headers=headers)
             
     except Exception as e:
         logger.error(f"转换失败: {str(e)}")
         return jsonify({'error': f'转换失败: {str(e)}'}), 500
-    finally:
-        # 清理临时文件
-        try:
-            if 'input_path' in locals() and os.path.exists(input_path):
-                os.remove(input_path)
-            if 'output_path' in locals() and os.path.exists(output_path):
-                # 延迟删除输出文件，给下载一些时间
-                threading.Timer(30.0, lambda: os.path.exists(output_path) and os.remove(output_path)).start()
-        except Exception as e:
-            logger.warning(f"清理临时文件失败: {str(e)}")
+
+def gzip_chunks(chunks):
+    """将字节块流式压缩为gzip格式"""
+    compressor = zlib.compressobj(GZIP_COMPRESS_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
 
 @app.route('/download/<task_id>')
 def download_file(task_id):
@@ -489,75 +1009,134 @@ def download_file(task_id):
     logger.info(f"开始下载文件: {task.output_file} -> {download_filename}")
     
     try:
-        return send_file(
-            task.output_file,
-            as_attachment=True,
-            download_name=download_filename,
-            mimetype='application/xml'
-        )
+        return send_tcx_file(task.output_file, download_filename)
     except Exception as e:
         logger.error(f"文件下载失败: {str(e)}")
         return jsonify({'error': '文件下载失败'}), 500
 
+class ExpiryIndex:
+    """
+    按过期时间排序的文件清理索引（最小堆）
+    
+    任务创建时登记其文件和过期时间，清理时只弹出已到期的条目，
+    开销与到期数量成正比，与已保存的任务和文件总数无关。
+    """
+    def __init__(self):
+        self.heap = []
+        self.lock = threading.Lock()
+        self.counter = 0  # 过期时间相同时按登记顺序弹出
+    
+    def add(self, expires_at, paths, task_id=None):
+        """
+        登记到期后需要删除的文件
+        
+        Args:
+            expires_at (float): 过期时间（Unix时间戳）
+            paths (list): 文件路径
+            task_id (str): 关联的任务ID，到期时一并删除任务记录
+        """
+        with self.lock:
+            self.counter += 1
+            heapq.heappush(self.heap, (expires_at, self.counter, task_id, tuple(paths)))
+    
+    def pop_due(self, now):
+        """
+        弹出所有已到期的条目
+        
+        Returns:
+            list: (任务ID, 文件路径元组) 列表
+        """
+        due = []
+        with self.lock:
+            while self.heap and self.heap[0][0] <= now:
+                _, _, task_id, paths = heapq.heappop(self.heap)
+                due.append((task_id, paths))
+        return due
+    
+    def __len__(self):
+        with self.lock:
+            return len(self.heap)
+
+# 上传和输出文件的过期索引
+file_expiry = ExpiryIndex()
+
+def retention_seconds():
+    return APP_CONFIG['FILE_RETENTION_HOURS'] * 3600
+
+def register_task_files(task):
+    """登记任务的上传和输出文件，保留时间到期后由清理线程删除"""
+    expires_at = task.created_at.timestamp() + retention_seconds()
+    file_expiry.add(expires_at, [task.input_file, task.output_file], task.task_id)
+
+def index_existing_files():
+    """
+    进程启动时扫描一次上传和输出目录，把已有文件按修改时间登记到过期索引
+    
+    Returns:
+        int: 登记的文件数
+    """
+    indexed = 0
+    for folder in [UPLOAD_FOLDER, OUTPUT_FOLDER]:
+        if not os.path.isdir(folder):
+            continue
+        try:
+            with os.scandir(folder) as scanner:
+                for entry in scanner:
+                    if entry.is_file():
+                        file_expiry.add(entry.stat().st_mtime + retention_seconds(), [entry.path])
+                        indexed += 1
+        except OSError as e:
+            logger.warning(f"访问文件夹失败 {folder}: {str(e)}")
+    return indexed
+
+def remove_expired_file(file_path):
+    """
+    删除过期文件
+    
+    Returns:
+        bool: 是否删除了文件
+    """
+    if not file_path:
+        return False
+    try:
+        os.remove(file_path)
+        logger.debug(f"删除过期文件: {file_path}")
+        return True
+    except FileNotFoundError:
+        # 已被其他进程或之前的清理删除
+        return False
+    except OSError as e:
+        logger.warning(f"删除文件失败 {file_path}: {str(e)}")
+        return False
+
 def cleanup_old_files():
-    """清理旧文件和任务记录"""
+    """清理到期的文件和任务记录"""
     try:
         current_time = datetime.now()
         cutoff_time = current_time - timedelta(hours=APP_CONFIG['FILE_RETENTION_HOURS'])
         
         cleaned_files = 0
+        expired_tasks = set()
+        
+        # 本进程登记的到期文件（包括启动时扫描到的已有文件）
+        for task_id, paths in file_expiry.pop_due(current_time.timestamp()):
+            cleaned_files += sum(remove_expired_file(path) for path in paths)
+            if task_id:
+                expired_tasks.add(task_id)
+        
+        # 其他进程或重启前创建的过期任务记录（按created_at索引查询）；
+        # 内存存储中的任务都已登记在过期索引中，不需要扫描
+        if conversion_tasks.shared:
+            for task in conversion_tasks.created_before(cutoff_time):
+                cleaned_files += sum(remove_expired_file(path) for path in (task.input_file, task.output_file))
+                expired_tasks.add(task.task_id)
+        
+        # 从任务存储中移除任务
         cleaned_tasks = 0
-        
-        # 清理超过保留时间的任务和文件
-        tasks_to_remove = []
-        for task_id, task in list(conversion_tasks.items()):
-            if task.created_at < cutoff_time:
-                # 删除相关文件
-                for file_path in [task.input_file, task.output_file]:
-                    if file_path and os.path.exists(file_path):
-                        try:
-                            os.remove(file_path)
-                            cleaned_files += 1
-                            logger.debug(f"删除过期文件: {file_path}")
-                        except (OSError, IOError) as e:
-                            logger.warning(f"删除文件失败 {file_path}: {str(e)}")
-                        except Exception as e:
-                            logger.error(f"处理文件时出错 {file_path}: {str(e)}")
-                tasks_to_remove.append(task_id)
-        
-        # 从内存中移除任务
-        for task_id in tasks_to_remove:
-            try:
-                del conversion_tasks[task_id]
+        for task_id in expired_tasks:
+            if conversion_tasks.pop(task_id) is not None:
                 cleaned_tasks += 1
-            except KeyError:
-                logger.warning(f"任务 {task_id} 已被删除")
-        
-        # 清理文件夹中的孤立文件
-        folders_to_clean = [UPLOAD_FOLDER, OUTPUT_FOLDER]
-        for folder in folders_to_clean:
-            if not os.path.exists(folder):
-                continue
-                
-            try:
-                for filename in os.listdir(folder):
-                    file_path = os.path.join(folder, filename)
-                    if not os.path.isfile(file_path):
-                        continue
-                        
-                    try:
-                        file_mtime = datetime.fromtimestamp(os.path.getmtime(file_path))
-                        if file_mtime < cutoff_time:
-                            os.remove(file_path)
-                            cleaned_files += 1
-                            logger.debug(f"删除孤立文件: {file_path}")
-                    except (OSError, IOError) as e:
-                        logger.warning(f"删除孤立文件失败 {file_path}: {str(e)}")
-                    except Exception as e:
-                        logger.error(f"处理孤立文件时出错 {file_path}: {str(e)}")
-                        
-            except (OSError, IOError) as e:
-                logger.warning(f"访问文件夹失败 {folder}: {str(e)}")
+            task_events.discard(task_id)
         
         if cleaned_files > 0 or cleaned_tasks > 0:
             logger.info(f"清理完成: {cleaned_files} 个文件, {cleaned_tasks} 个任务")
@@ -581,21 +1160,49 @@ def cleanup_endpoint():
     except Exception as e:
         return jsonify({'error': f'清理过程中出现错误: {str(e)}'}), 500
 
-@app.route('/health')
-def health_check():
-    """健康检查端点"""
-    try:
-        # 检查系统资源
-        cpu_percent = psutil.cpu_percent(interval=1)
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    """按路由模板（而非实际URL）记录请求耗时和状态码"""
+    started = g.pop('request_started', None)
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    if started is not None:
+        REQUEST_SECONDS.observe(time.perf_counter() - started, route=route, method=request.method)
+    REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+    return response
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus文本格式的监控指标（当前工作进程）"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+class HealthSampler:
+    """
+    后台资源采样器
+    
+    定时采集CPU、内存、磁盘和任务计数，健康检查端点直接返回最近一次的快照，
+    不在请求线程中等待CPU采样或统计任务。
+    """
+    def __init__(self, interval):
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.snapshot = None
+        self.sampled_at = None  # 最近一次采样的time.monotonic()
+        # 非阻塞的cpu_percent以上一次调用为基准，首次调用只用于建立基准
+        psutil.cpu_percent(interval=None)
+    
+    def sample(self):
+        """采集一次并更新快照"""
+        cpu_percent = psutil.cpu_percent(interval=None)
         memory = psutil.virtual_memory()
         disk = psutil.disk_usage('/')
         
         # 检查必要目录
         directories_ok = all(os.path.exists(folder) for folder in [UPLOAD_FOLDER, OUTPUT_FOLDER])
         
-        # 检查活跃任务数量
-        active_tasks = len([task for task in conversion_tasks.values() if task.status in ['pending', 'processing']])
-        
         health_status = {
             'status': 'healthy',
             'timestamp': datetime.now().isoformat(),
@@ -608,8 +1215,9 @@ def health_check():
             },
             'application': {
                 'directories_ok': directories_ok,
-                'active_tasks': active_tasks,
-                'total_tasks': len(conversion_tasks)
+                'active_tasks': conversion_tasks.count_by_status(['pending', 'processing']),
+                'total_tasks': len(conversion_tasks),
+                'queue_depth': conversion_queue.depth()
             }
         }
         
@@ -627,8 +1235,47 @@ def health_check():
         if not directories_ok:
             health_status['status'] = 'unhealthy'
             health_status['error'] = 'Required directories not accessible'
-            return jsonify(health_status), 503
         
+        with self.lock:
+            self.snapshot = health_status
+            self.sampled_at = time.monotonic()
+        return health_status
+    
+    def latest(self):
+        """
+        返回最近一次的快照和距今秒数，尚未采样时立即采样一次
+        
+        Returns:
+            tuple: (快照字典, 快照年龄秒数)
+        """
+        with self.lock:
+            snapshot, sampled_at = self.snapshot, self.sampled_at
+        if snapshot is None:
+            return self.sample(), 0.0
+        return snapshot, time.monotonic() - sampled_at
+    
+    def is_stale(self, age):
+        """采样线程停止工作时快照会过期"""
+        return age > self.interval * 3
+    
+    def run(self):
+        while True:
+            try:
+                self.sample()
+            except Exception as e:
+                logger.error(f"资源采样出错: {str(e)}")
+            time.sleep(self.interval)
+
+health_sampler = HealthSampler(APP_CONFIG['HEALTH_SAMPLE_SECONDS'])
+
+@app.route('/health')
+def health_check():
+    """健康检查端点，返回后台采样的最近快照"""
+    try:
+        snapshot, age = health_sampler.latest()
+        health_status = dict(snapshot, sample_age_seconds=round(age, 3))
+        if health_status['status'] == 'unhealthy':
+            return jsonify(health_status), 503
         return jsonify(health_status)
         
     except Exception as e:
@@ -638,6 +1285,33 @@ def health_check():
             'error': f'Health check failed: {str(e)}'
         }), 503
 
+@app.route('/health/live')
+def liveness_check():
+    """存活检查：进程能够处理请求即返回200"""
+    return jsonify({'status': 'alive', 'timestamp': datetime.now().isoformat()})
+
+@app.route('/health/ready')
+def readiness_check():
+    """就绪检查：目录可用、采样正常且转换队列未满时返回200，否则返回503"""
+    snapshot, age = health_sampler.latest()
+    reasons = []
+    if not snapshot['application']['directories_ok']:
+        reasons.append('Required directories not accessible')
+    if health_sampler.is_stale(age):
+        reasons.append('Health sampler stalled')
+    if conversion_queue.is_full():
+        reasons.append('Conversion queue full')
+    
+    ready_status = {
+        'status': 'not_ready' if reasons else 'ready',
+        'timestamp': datetime.now().isoformat(),
+        'sample_age_seconds': round(age, 3)
+    }
+    if reasons:
+        ready_status['reasons'] = reasons
+        return jsonify(ready_status), 503
+    return jsonify(ready_status)
+
 @app.route('/1.jpg')
 def serve_background_image():
     """提供背景图片"""
@@ -804,7 +1478,9 @@ def get_weather_data(lat=None, lon=None, city=None, lang='zh'):
         cached_data, cached_time = weather_cache[cache_key]
         if current_time - cached_time < CACHE_DURATION:
             logger.info("✅ 使用缓存的天气数据")
+            CACHE_REQUESTS.inc(cache='weather', result='hit')
             return cached_data
+    CACHE_REQUESTS.inc(cache='weather', result='miss')
     
     # 多语言天气描述翻译映射
     weather_translations = {
@@ -1677,7 +2353,10 @@ def get_analytics_stats():
 
 # 定时清理任务
 def schedule_cleanup():
-    """定时清理任务"""
+    """定时清理任务，启动时扫描一次已有文件，之后只处理到期条目"""
+    indexed = index_existing_files()
+    if indexed:
+        logger.info(f"已登记 {indexed} 个已有文件到清理索引")
     while True:
         try:
             time.sleep(1800)  # 每30分钟清理一次
@@ -1685,14 +2364,92 @@ def schedule_cleanup():
         except Exception as e:
             logger.error(f"定时清理任务出错: {str(e)}")
 
-# 启动定时清理线程
-cleanup_thread = threading.Thread(target=schedule_cleanup, daemon=True)
-cleanup_thread.start()
+def recover_orphaned_tasks():
+    """
+    接管所属进程已退出（重启、崩溃）的排队中和转换中任务
+    
+    输入文件仍在时重新加入本进程的转换队列，否则标记为失败，
+    避免任务一直停留在排队或转换状态。
+    
+    Returns:
+        tuple: (重新排队的任务数, 标记失败的任务数)
+    """
+    owner = worker_id()
+    conversion_tasks.heartbeat(owner)
+    requeued = failed = 0
+    for task in conversion_tasks.orphaned(['pending', 'processing'], APP_CONFIG['TASK_STALE_SECONDS']):
+        # 多个进程同时检查时只有一个能接管
+        if not conversion_tasks.claim(task.task_id, task.owner, owner):
+            continue
+        task.owner = owner
+        if task.input_file and os.path.exists(task.input_file) and not conversion_queue.is_full():
+            task.update(status='pending', progress=0, message='服务重启，任务重新排队...', error=None)
+            if conversion_queue.submit(task):
+                requeued += 1
+                continue
+        task.update(status='error', error='服务重启，任务已中断，请重新上传')
+        failed += 1
+    if requeued or failed:
+        logger.info(f"🔁 接管遗留任务: 重新排队 {requeued} 个，标记失败 {failed} 个")
+    return requeued, failed
+
+def schedule_task_recovery():
+    """定时发送心跳并接管其他进程遗留的任务，启动时立即执行一次"""
+    while True:
+        try:
+            recover_orphaned_tasks()
+        except Exception as e:
+            logger.error(f"接管遗留任务出错: {str(e)}")
+        time.sleep(APP_CONFIG['TASK_HEARTBEAT_SECONDS'])
+
+# 已启动后台服务的进程ID
+_background_pid = None
+_background_lock = threading.Lock()
+
+def start_background_services():
+    """
+    启动当前进程的后台线程（定时清理、资源采样、心跳和遗留任务接管）
+    
+    由create_app()在每个工作进程中调用。按进程ID判断，同一进程只启动一次；
+    线程不会随fork复制，fork出的子进程中再次调用会重新启动。
+    """
+    global _background_pid
+    with _background_lock:
+        if _background_pid == os.getpid():
+            return
+        _background_pid = os.getpid()
+        # 开始处理请求前先登记心跳，新创建的任务不会被其他进程当作遗留任务
+        conversion_tasks.heartbeat(worker_id())
+        recovery_thread = threading.Thread(target=schedule_task_recovery, name='task-recovery', daemon=True)
+        recovery_thread.start()
+        cleanup_thread = threading.Thread(target=schedule_cleanup, name='cleanup-scheduler', daemon=True)
+        cleanup_thread.start()
+        sampler_thread = threading.Thread(target=health_sampler.run, name='health-sampler', daemon=True)
+        sampler_thread.start()
+        logger.info(f"后台服务已启动，进程ID: {_background_pid}")
+
+def create_app():
+    """
+    应用工厂：创建必要目录、打开任务存储并启动后台服务
+    
+    供WSGI服务器（wsgi.py）和开发服务器使用。导入web_app不会创建目录、
+    任务数据库或后台线程；任务存储（TASK_STORE、TASK_DB_PATH）在这里或
+    首次访问时才打开。
+    
+    Returns:
+        Flask: 应用实例
+    """
+    for folder in [UPLOAD_FOLDER, OUTPUT_FOLDER, CACHE_FOLDER]:
+        os.makedirs(folder, exist_ok=True)
+    conversion_tasks.open()
+    start_background_services()
+    return app
 
 if __name__ == '__main__':
     # 创建必要的目录
     os.makedirs('templates', exist_ok=True)
     os.makedirs('static', exist_ok=True)
+    create_app()
     
     # 获取端口号，优先使用环境变量PORT，否则使用8888
     port = int(os.environ.get('PORT', 8888))
@@ -0,0 +1,13 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+WSGI入口
+
+生产环境使用多进程WSGI服务器启动：
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+from web_app import create_app
+
+app = create_app()